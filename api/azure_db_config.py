@@ -13,6 +13,8 @@ from urllib.parse import urlencode
 from urllib.parse import urlparse
 from urllib.parse import urlunparse
 
+from api.db_pool import get_connect_args
+
 
 def configure_azure_ssl_connection(db_url: str, db_type: str, is_async: bool = False) -> Tuple[str, Dict]:
     """
@@ -148,17 +150,27 @@ def apply_azure_db_config(db_url: str, is_async: bool = False) -> Tuple[str, Dic
     """
     環境変数を確認し、Azure環境の場合はSSL接続設定を適用する。
 
+    非同期エンジンの場合は、あわせてドライバーの設定（api.db_pool.get_connect_args）を適用する。
+    DB_POOL_MODE=external の場合、asyncpgはプリペアドステートメントをキャッシュせず一意な名前で作成するため、
+    Azure Database for PostgreSQLの組み込みのPgBouncer（トランザクションモード）を経由しても動作する。
+
     Args:
         db_url: データベース接続URL
         is_async: 非同期エンジンを使用するかどうか
 
     Returns:
         (修正されたデータベース接続URL, connect_args辞書)のタプル
+
+    Raises:
+        ValueError: 環境変数に不正な値が設定されている場合
     """
     cloud_provider = os.getenv("CLOUD_PROVIDER", "").lower()
     db_type = os.getenv("DB_TYPE", "").lower()
 
+    connect_args: Dict = {}
     if cloud_provider == "azure":
-        return configure_azure_ssl_connection(db_url, db_type, is_async)
+        db_url, connect_args = configure_azure_ssl_connection(db_url, db_type, is_async)
+    if is_async:
+        connect_args = {**connect_args, **get_connect_args(db_url)}
 
-    return db_url, {}
+    return db_url, connect_args
@@ -0,0 +1,243 @@
+"""
+IDによる1件取得の結果をキャッシュするモジュール。
+
+デフォルトではプロセス内のLRUキャッシュ（件数上限とTTL付き）を使い、
+CACHE_BACKEND=redis を指定した場合は複数プロセスで共有するRedisを使う。
+キャッシュの無効化は更新・削除を行うCRUD関数の中で行う。
+
+対応する環境変数:
+- CACHE_BACKEND: memory（デフォルト）、redis、none（キャッシュしない）
+- CACHE_MAX_SIZE: memoryの場合に名前空間ごとに保持する最大件数（デフォルト: 10000）
+- CACHE_TTL: キャッシュの有効期間（秒、デフォルト: 5）
+- CACHE_REDIS_URL: redisの場合の接続先URL（デフォルト: redis://localhost:6379/0）
+"""
+
+import json
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date
+from datetime import datetime
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from decouple import config
+
+from api.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS = Counter("cache_hits_total", "Number of cache hits.", ("cache",))
+CACHE_MISSES = Counter("cache_misses_total", "Number of cache misses.", ("cache",))
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Number of entries evicted by the size limit or TTL.", ("cache",))
+
+
+class NullCacheBackend:
+    """
+    何もキャッシュしないバックエンド（CACHE_BACKEND=none）。
+    """
+
+    async def get(self, key: str) -> Optional[Any]:
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class LRUCacheBackend:
+    """
+    プロセス内のLRUキャッシュ。件数の上限を超えた場合は最も古く参照されたエントリから追い出す。
+    """
+
+    def __init__(self, namespace: str, max_size: int, ttl: float):
+        self._namespace = (namespace,)
+        self._max_size = max_size
+        self._ttl = ttl
+        # キー -> (有効期限, 値)
+        self._entries: OrderedDict = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            CACHE_EVICTIONS.inc(labelvalues=self._namespace)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc(labelvalues=self._namespace)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+def _json_default(value: Any) -> Any:
+    # 日付・日時は型を復元できるよう、型名を付けたISO 8601形式の文字列にする（datetimeはdateのサブクラス）
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not cacheable")
+
+
+def _json_object_hook(value: Dict) -> Any:
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__date__" in value:
+        return date.fromisoformat(value["__date__"])
+    return value
+
+
+def _dumps(value: Any) -> bytes:
+    """
+    キャッシュする値をJSONのバイト列に変換する。
+
+    共有するRedisから読み出した値を実行しないよう、pickleではなくJSONを使う。
+    扱えるのはJSONの型（辞書、リスト、文字列、数値、真偽値、None）と日付・日時のみ。
+
+    Raises:
+        TypeError: 扱えない型の値が含まれている場合
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode()
+
+
+def _loads(raw: bytes) -> Any:
+    """
+    _dumps で変換したバイト列から値を復元する（日付・日時は date、datetime に戻す）。
+
+    Raises:
+        ValueError: JSONとして不正なバイト列の場合
+    """
+    return json.loads(raw, object_hook=_json_object_hook)
+
+
+class RedisCacheBackend:
+    """
+    複数プロセスで共有するRedisのキャッシュ。redisパッケージがインストールされている場合のみ使用できる。
+
+    Redisに接続できない場合はキャッシュがないものとして扱い、データベースから読み出す。
+    """
+
+    def __init__(self, namespace: str, url: str, ttl: float):
+        try:
+            import redis.asyncio as redis
+        except ImportError as error:
+            raise ValueError("CACHE_BACKEND=redis requires the redis package to be installed") from error
+
+        self._client = redis.from_url(url)
+        self._prefix = f"todo-api:{namespace}:"
+        self._ttl_ms = int(ttl * 1000)
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._client.get(self._prefix + key)
+        except Exception:
+            logger.warning("Failed to read from the cache", exc_info=True)
+            return None
+        if raw is None:
+            return None
+        try:
+            return _loads(raw)
+        except ValueError:
+            # 形式の異なる値（以前のバージョンが書き込んだ値等）はキャッシュがないものとして扱う
+            logger.warning("Failed to decode the cached value of %s", self._prefix + key, exc_info=True)
+            return None
+
+    async def set(self, key: str, value: Any) -> None:
+        try:
+            await self._client.set(self._prefix + key, _dumps(value), px=self._ttl_ms)
+        except Exception:
+            logger.warning("Failed to write to the cache", exc_info=True)
+
+    async def delete(self, key: str) -> None:
+        # 削除に失敗すると古い値が残るため、例外はそのまま送出する
+        await self._client.delete(self._prefix + key)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match=f"{self._prefix}*"):
+            await self._client.delete(key)
+
+
+def create_backend(namespace: str):
+    """
+    環境変数の設定に応じたキャッシュのバックエンドを作成する。
+
+    Args:
+        namespace: キャッシュの名前空間（例: task, user）
+
+    Returns:
+        キャッシュのバックエンド
+
+    Raises:
+        ValueError: CACHE_BACKENDに不正な値が設定されている場合
+    """
+    backend = config("CACHE_BACKEND", default="memory").lower()
+    ttl = config("CACHE_TTL", default=5, cast=float)
+
+    if backend == "memory":
+        return LRUCacheBackend(namespace, max_size=config("CACHE_MAX_SIZE", default=10000, cast=int), ttl=ttl)
+    if backend == "redis":
+        return RedisCacheBackend(namespace, url=config("CACHE_REDIS_URL", default="redis://localhost:6379/0"), ttl=ttl)
+    if backend == "none":
+        return NullCacheBackend()
+    raise ValueError(f"Invalid CACHE_BACKEND value: {backend}. Use 'memory', 'redis' or 'none'.")
+
+
+class Cache:
+    """
+    名前空間ごとのキャッシュ。ヒット・ミス・追い出しの件数をメトリクスに記録する。
+    """
+
+    def __init__(self, namespace: str, backend=None):
+        self.namespace = namespace
+        self.backend = backend if backend is not None else create_backend(namespace)
+        self._labelvalues = (namespace,)
+        # 作成したキャッシュを参照が残っている間だけ記録する（clear_caches を参照）
+        _caches.add(self)
+
+    async def get(self, key: Any) -> Optional[Dict]:
+        value = await self.backend.get(str(key))
+        if value is None:
+            CACHE_MISSES.inc(labelvalues=self._labelvalues)
+        else:
+            CACHE_HITS.inc(labelvalues=self._labelvalues)
+        return value
+
+    async def set(self, key: Any, value: Dict) -> None:
+        await self.backend.set(str(key), value)
+
+    async def delete(self, key: Any) -> None:
+        await self.backend.delete(str(key))
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+
+_caches: "weakref.WeakSet[Cache]" = weakref.WeakSet()
+
+
+async def clear_caches() -> None:
+    """
+    作成済みで参照が残っているすべてのキャッシュを空にする。
+    """
+    for cache in _caches:
+        await cache.clear()
@@ -210,10 +210,14 @@ def get_local_database_url() -> str | None:
     return None
 
 
-def _build_database_url_from_env() -> str:
+def _build_database_url_from_env(host: str | None = None, port: str | None = None) -> str:
     """
     環境変数からデータベース接続URLを構築する（内部関数）。
 
+    Args:
+        host: DB_HOSTの代わりに使うホスト名（レプリカ用）
+        port: DB_PORTの代わりに使うポート番号（レプリカ用）
+
     Returns:
         データベース接続URL
 
@@ -244,6 +248,9 @@ def _build_database_url_from_env() -> str:
     if DB_PASSWORD is None:
         raise ValueError("DB_PASSWORD environment variable is not set")
 
+    DB_HOST = host or DB_HOST
+    DB_PORT = port or DB_PORT
+
     if DB_TYPE == "mysql":
         return f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8"
     elif DB_TYPE == "postgresql":
@@ -328,3 +335,80 @@ def get_database_url() -> str:
         )
 
     return database_url
+
+
+# クラウド環境でレプリカの接続URL（カンマ区切りで複数指定可）を設定する環境変数
+REPLICA_URL_ENV_KEYS = {
+    "heroku": {"postgresql": "DATABASE_REPLICA_URLS", "mysql": "JAWSDB_REPLICA_URLS"},
+    "aws": {"postgresql": "POSTGRESQL_REPLICA_DATABASE_URLS", "mysql": "MYSQL_REPLICA_DATABASE_URLS"},
+    "gcp": {"postgresql": "POSTGRESQL_REPLICA_DATABASE_URLS", "mysql": "MYSQL_REPLICA_DATABASE_URLS"},
+    "azure": {"postgresql": "POSTGRESQL_REPLICA_DATABASE_URLS", "mysql": "MYSQL_REPLICA_DATABASE_URLS"},
+}
+
+
+def _split_env(key: str) -> list[str]:
+    """
+    カンマ区切りの環境変数を空白を除いたリストに変換する（内部関数）。
+    """
+    return [value.strip() for value in os.getenv(key, "").split(",") if value.strip()]
+
+
+def get_local_replica_database_urls() -> list[str]:
+    """
+    ローカル環境のレプリカの接続URLを取得する。
+
+    DB_REPLICA_HOSTS（host または host:port をカンマ区切りで指定）以外の接続情報はプライマリと同じ
+    個別の環境変数（DB_TYPE, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD）を使う。
+
+    Returns:
+        正規化されたレプリカの接続URLのリスト（DB_REPLICA_HOSTSが設定されていない場合は空のリスト）
+    """
+    urls = []
+    for replica_host in _split_env("DB_REPLICA_HOSTS"):
+        host, _, port = replica_host.partition(":")
+        urls.append(normalize_database_url(_build_database_url_from_env(host=host, port=port or None)))
+    return urls
+
+
+def get_replica_database_urls() -> list[str]:
+    """
+    環境変数から読み取り用のレプリカの接続URLを取得する。
+
+    プライマリと同じくCLOUD_PROVIDER環境変数に基づいて、次の環境変数から取得する。
+
+    - Heroku: DB_TYPE=postgresqlならDATABASE_REPLICA_URLS、DB_TYPE=mysqlならJAWSDB_REPLICA_URLS
+    - AWS、GCP、Azure: DB_TYPE=postgresqlならPOSTGRESQL_REPLICA_DATABASE_URLS、
+      DB_TYPE=mysqlならMYSQL_REPLICA_DATABASE_URLS（AzureのPostgreSQLではsslmode=requireを追加する）
+    - 環境変数が存在しない場合: ローカル環境（DB_REPLICA_HOSTS）
+
+    Returns:
+        正規化されたレプリカの接続URLのリスト（レプリカを使わない場合は空のリスト）
+
+    Raises:
+        ValueError: 無効なCLOUD_PROVIDER値が設定されている場合
+    """
+    cloud_provider = os.getenv("CLOUD_PROVIDER")
+    if cloud_provider is None:
+        return get_local_replica_database_urls()
+
+    cloud_provider_lower = cloud_provider.lower()
+    env_keys = REPLICA_URL_ENV_KEYS.get(cloud_provider_lower)
+    if env_keys is None:
+        valid_providers = ", ".join(REPLICA_URL_ENV_KEYS.keys())
+        raise ValueError(
+            f"Invalid CLOUD_PROVIDER value: {cloud_provider}. "
+            f"Valid values are: {valid_providers}, or leave unset for local environment."
+        )
+
+    db_type_lower = (os.getenv("DB_TYPE") or "").lower()
+    env_key = env_keys.get(db_type_lower)
+    if env_key is None:
+        return []
+
+    urls = [normalize_database_url(url) for url in _split_env(env_key)]
+    if cloud_provider_lower == "azure":
+        # Azure環境の特別対応: プライマリと同じくSSL接続の設定を追加する
+        from api.azure_db_config import apply_azure_ssl_to_url
+
+        urls = [apply_azure_ssl_to_url(url, db_type_lower) for url in urls]
+    return urls
@@ -0,0 +1,237 @@
+"""
+レスポンスを圧縮するミドルウェアを提供するモジュール。
+
+リクエストのAccept-Encodingに応じてbr（brotliパッケージがインストールされている場合）またはgzipで圧縮する。
+一定サイズ未満のレスポンスは圧縮せず、ストリーミングのレスポンスはチャンクごとに圧縮して即座に送信する。
+
+対応する環境変数:
+- COMPRESSION_ALGORITHMS: 優先する順に並べた圧縮方式（br, gzip）、空の場合は圧縮しない
+  （デフォルト: auto、brotliがインストールされていれば br,gzip、なければ gzip）
+- COMPRESSION_MINIMUM_SIZE: 圧縮する最小のバイト数（デフォルト: 1024）
+- COMPRESSION_GZIP_LEVEL: gzipの圧縮レベル、1〜9（デフォルト: 6）
+- COMPRESSION_BROTLI_QUALITY: brotliの圧縮品質、0〜11（デフォルト: 4）
+"""
+
+import zlib
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from decouple import config
+from starlette.datastructures import Headers
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+try:
+    import brotli
+except ImportError:
+    # brotliは任意の依存パッケージ
+    brotli = None
+
+SUPPORTED_ALGORITHMS = ("br", "gzip")
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31でgzip形式のヘッダーとフッターを付ける
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def select_encoding(accept_encoding: Optional[str], algorithms: Sequence[str]) -> Optional[str]:
+    """
+    Accept-Encodingヘッダーから使用する圧縮方式を選ぶ。
+
+    Args:
+        accept_encoding: リクエストのAccept-Encodingヘッダーの値
+        algorithms: サーバーが優先する順に並べた圧縮方式
+
+    Returns:
+        クライアントが受け入れる（q=0でない）圧縮方式のうち、サーバーが最も優先するもの。該当しない場合はNone
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    for algorithm in algorithms:
+        if qualities.get(algorithm, qualities.get("*", 0.0)) > 0:
+            return algorithm
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encodingに応じてレスポンスを圧縮するASGIミドルウェア。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        algorithms: Sequence[str] = SUPPORTED_ALGORITHMS,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.algorithms = tuple(algorithms)
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _create_compressor(self, encoding: str):
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.algorithms:
+            await self.app(scope, receive, send)
+            return
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding"), self.algorithms)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self.app, encoding, self._create_compressor, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    """
+    1つのレスポンスを圧縮する（内部クラス）。
+    """
+
+    def __init__(self, app: ASGIApp, encoding: str, create_compressor, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.create_compressor = create_compressor
+        self.minimum_size = minimum_size
+        self.send: Optional[Send] = None
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        # 圧縮しないことが決まった場合はTrue
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # 本文の最初のチャンクを見て圧縮するかを決めるまで、ヘッダーの送信を保留する
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or message["status"] in (204, 304)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self._flush_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                # 小さいレスポンスは圧縮しても転送量がほとんど減らないため、そのまま送信する
+                self.passthrough = True
+                await self._flush_start()
+                await self.send(message)
+                return
+            self.compressor = self.create_compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                # ストリーミングのレスポンスは長さが分からないため、チャンク転送にする
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._flush_start()
+                await self.send({**message, "body": body})
+                return
+            await self._flush_start()
+
+        if more_body:
+            # チャンクごとに圧縮器の中のデータを吐き出し、クライアントがすぐに展開できるようにする
+            chunk = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            chunk = self.compressor.compress(body) + self.compressor.finish()
+        await self.send({**message, "body": chunk})
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            await self.send(start_message)
+
+
+def get_compression_algorithms() -> List[str]:
+    """
+    環境変数から使用する圧縮方式を取得する。
+
+    Returns:
+        優先する順に並べた圧縮方式（autoの場合、brotliがインストールされていなければbrは使わない）
+
+    Raises:
+        ValueError: 未対応の圧縮方式が指定された場合、またはbrotliがインストールされていないのにbrが指定された場合
+    """
+    configured = config("COMPRESSION_ALGORITHMS", default="auto").lower()
+    if configured == "auto":
+        return [algorithm for algorithm in SUPPORTED_ALGORITHMS if algorithm != "br" or brotli is not None]
+
+    algorithms = [algorithm.strip() for algorithm in configured.split(",") if algorithm.strip()]
+    unsupported = [algorithm for algorithm in algorithms if algorithm not in SUPPORTED_ALGORITHMS]
+    if unsupported:
+        raise ValueError(f"Unsupported COMPRESSION_ALGORITHMS value: {', '.join(unsupported)}. Use 'br' or 'gzip'.")
+    if "br" in algorithms and brotli is None:
+        raise ValueError("COMPRESSION_ALGORITHMS=br requires the brotli package to be installed")
+    return algorithms
+
+
+def add_compression_middleware(app):
+    app.add_middleware(
+        CompressionMiddleware,
+        algorithms=get_compression_algorithms(),
+        minimum_size=config("COMPRESSION_MINIMUM_SIZE", default=1024, cast=int),
+        gzip_level=config("COMPRESSION_GZIP_LEVEL", default=6, cast=int),
+        brotli_quality=config("COMPRESSION_BROTLI_QUALITY", default=4, cast=int),
+    )
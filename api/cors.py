@@ -1,6 +1,10 @@
 from decouple import config
 from fastapi.middleware.cors import CORSMiddleware
 
+from api.etag import ETAG_HEADER
+from api.instrumentation import SERVER_TIMING_HEADER
+from api.pagination import NEXT_CURSOR_HEADER
+
 # 環境変数からORIGINSを取得し、カンマで区切られた文字列をリストに変換
 origins = config("CORS_ORIGINS", default="http://localhost:8000").split(",")
 
@@ -12,4 +16,5 @@ def add_cors_middleware(app):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[ETAG_HEADER, NEXT_CURSOR_HEADER, SERVER_TIMING_HEADER],
     )
@@ -1,59 +1,438 @@
+from datetime import date
+from datetime import datetime
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Date
+from sqlalchemy import and_
+from sqlalchemy import bindparam
 from sqlalchemy import case
+from sqlalchemy import delete as sql_delete
+from sqlalchemy import exists
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import or_
 from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy import update as sql_update
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.compiler import InsertmanyvaluesSentinelOpts
 
 import api.models.task_model as task_model
+import api.models.user_model as user_model
 import api.schemas.task_schema as task_schema
+from api.cache import Cache
+from api.replica import is_replica_session
+
+# 一覧の並び順キー: 未完了を先に、期限の近い順（期限なしは末尾）、作成日時の新しい順、最後にIDで一意に決める
+# 完了フラグと期限は生成列にしてあり、ix_tasks_list_order / ix_tasks_owner_list_order で並べ替えなしに読める
+IS_DONE_KEY = task_model.Task.is_done
+DUE_DATE_KEY = task_model.Task.due_date_key
+ORDER_BY = (
+    IS_DONE_KEY.asc(),
+    DUE_DATE_KEY.asc(),
+    task_model.Task.created_at.desc(),
+    task_model.Task.id.asc(),
+)
+
+# 並び順キーの計算（get_sort_key）に必要な列。項目を絞って読み出す場合も必ずSELECTする
+SORT_KEY_FIELDS = ("status", "due_date", "created_at", "id")
+
+# expand で埋め込める関連
+EXPANDABLE = ("owner",)
+
+# カーソルに保持する並び順キーの各値を元の型に戻す関数
+CURSOR_PARSERS = (int, date.fromisoformat, datetime.fromisoformat, int)
+
+# IDによる1件取得の結果のキャッシュ（更新・削除時に無効化する）
+task_cache = Cache("task")
+
+# 頻繁に実行するSQL文はモジュールの読み込み時に一度だけ組み立て、値はバインドパラメータで渡す
+# （リクエストごとの組み立てと、コンパイル済みSQLのキャッシュのキーの計算を省く）
+GET_BY_ID = select(task_model.Task).filter(task_model.Task.id == bindparam("id"))
+GET_VERSION_BY_ID = select(task_model.Task.version).filter(task_model.Task.id == bindparam("id"))
+DELETE_BY_ID = sql_delete(task_model.Task).filter(task_model.Task.id == bindparam("id"))
+# 絞り込みなし・所有者での絞り込みのみの一覧（項目の指定・関連の埋め込み・カーソルがない場合）
+LIST = select(task_model.Task).order_by(*ORDER_BY)
+LIST_PAGE = LIST.limit(bindparam("limit"))
+LIST_BY_OWNER = select(task_model.Task).filter(task_model.Task.owner_id == bindparam("owner_id")).order_by(*ORDER_BY)
+LIST_BY_OWNER_PAGE = LIST_BY_OWNER.limit(bindparam("limit"))
+FINGERPRINT = select(func.count(), func.max(task_model.Task.updated_at), func.sum(task_model.Task.version))
+
+
+def _to_cache_values(task) -> dict:
+    return {column.key: getattr(task, column.key) for column in task_model.Task.__table__.columns}
+
+
+def get_sort_key(task: task_model.Task) -> Tuple:
+    return (
+        1 if task.status == "Done" else 0,
+        task.due_date if task.due_date is not None else date.max,
+        task.created_at,
+        task.id,
+    )
+
+
+def _after(sort_key: Tuple):
+    # 並び順キーが指定した行より後ろにある行を絞り込む条件（作成日時のみ降順）
+    is_done, due_date, created_at, id = sort_key
+    return or_(
+        IS_DONE_KEY > is_done,
+        and_(
+            IS_DONE_KEY == is_done,
+            or_(
+                DUE_DATE_KEY > due_date,
+                and_(
+                    DUE_DATE_KEY == due_date,
+                    or_(
+                        task_model.Task.created_at < created_at,
+                        and_(task_model.Task.created_at == created_at, task_model.Task.id > id),
+                    ),
+                ),
+            ),
+        ),
+    )
+
+
+def _select(fields: Optional[Sequence[str]]):
+    if fields is None:
+        return select(task_model.Task)
+    # 指定された項目の列だけを読み出す（結果はエンティティではなく行になる）
+    columns = task_model.Task.__table__.c
+    return select(*(columns[name] for name in dict.fromkeys([*fields, *SORT_KEY_FIELDS])))
+
+
+def _expand(query, expand: Sequence[str]):
+    # 関連する行は一覧の件数によらず、IN句による1回の追加のSELECTでまとめて読み出す
+    if "owner" in expand:
+        query = query.options(selectinload(task_model.Task.owner))
+    return query
+
+
+def _rows(result: Result, fields: Optional[Sequence[str]]):
+    return result.scalars() if fields is None else result
+
+
+def _paginate(query, limit: Optional[int], after: Optional[Tuple]):
+    if after is not None:
+        query = query.filter(_after(after))
+    if limit is not None:
+        query = query.limit(limit)
+    return query
 
 
 async def create(db: AsyncSession, task_create: task_schema.TaskCreate):
     task = task_model.Task(**task_create.model_dump())
     db.add(task)
     await db.commit()
-    await db.refresh(task)
     return task
 
 
-async def get(db: AsyncSession, id: int):
-    result: Result = await db.execute(select(task_model.Task).filter(task_model.Task.id == id))
-    task = result.first()
-    return task[0] if task is not None else None
+# レプリケーション構成等で変更される採番の増分（MySQL）
+AUTO_INCREMENT_INCREMENT = text("SELECT @@auto_increment_increment")
 
 
-async def get_all(db: AsyncSession):
-    result: Result = await db.execute(
-        select(task_model.Task).order_by(
-            case((task_model.Task.status == "Done", 1), else_=0).asc(),
-            task_model.Task.due_date.asc(),
-            task_model.Task.created_at.desc(),
-        )
-    )
-    return result.scalars().all()
-
-
-async def get_all_by_owner(db: AsyncSession, owner_id: int):
-    result: Result = await db.execute(
-        select(task_model.Task)
-        .filter(task_model.Task.owner_id == owner_id)
-        .order_by(
-            case((task_model.Task.status == "Done", 1), else_=0).asc(),
-            task_model.Task.due_date.asc(),
-            task_model.Task.created_at.desc(),
-        )
+def _batches_sorted_returning(dialect) -> bool:
+    # executemanyのINSERT ... RETURNINGを要求した順序で返しつつ複数行にまとめられるのは、自動採番の主キーを
+    # 順序の判定に使えるデータベース（PostgreSQL）だけで、それ以外（SQLite）ではSQLAlchemyが1行ずつのINSERTに戻す
+    return dialect.insert_executemany_returning_sort_by_parameter_order and bool(
+        dialect.insertmanyvalues_implicit_sentinel & InsertmanyvaluesSentinelOpts.ANY_AUTOINCREMENT
     )
-    return result.scalars().all()
 
 
-async def update(db: AsyncSession, task_update: task_schema.TaskUpdate, task: task_model.Task):
-    for key, value in task_update.model_dump(exclude_unset=True).items():
-        setattr(task, key, value)
-    db.add(task)
+async def create_bulk(db: AsyncSession, task_creates: List[task_schema.TaskCreate], chunk_size: int):
+    table = task_model.Task.__table__
+    dialect = db.get_bind().dialect
+    batches_sorted_returning = _batches_sorted_returning(dialect)
+    increment = None
+    if not batches_sorted_returning:
+        # 複数行のVALUESはパラメータ数の上限を超えないようにチャンクを小さくする
+        max_rows = dialect.insertmanyvalues_max_parameters // len(task_schema.TaskCreate.model_fields)
+        chunk_size = max(1, min(chunk_size, max_rows))
+    tasks = []
+    for start in range(0, len(task_creates), chunk_size):
+        values = [task_create.model_dump() for task_create in task_creates[start : start + chunk_size]]
+        if batches_sorted_returning:
+            # 複数行のINSERT ... RETURNINGでチャンクごとに1回のラウンドトリップで作成する
+            result: Result = await db.execute(insert(table).returning(*table.c, sort_by_parameter_order=True), values)
+            tasks.extend(result.all())
+        elif dialect.insert_returning:
+            # 複数行のVALUESを持つ1つのINSERT ... RETURNINGで作成する
+            # RETURNINGの行の順序は保証されないため、VALUESの順に採番されたIDで並べ直す
+            result = await db.execute(insert(table).values(values).returning(*table.c))
+            tasks.extend(sorted(result.all(), key=lambda task: task.id))
+        else:
+            # RETURNINGに対応していないMySQLでは複数行のVALUESを持つ1つのINSERTで作成し、採番されたIDで読み直す
+            if increment is None:
+                increment = (await db.execute(AUTO_INCREMENT_INCREMENT)).scalar_one()
+            result = await db.execute(insert(table).values(values))
+            ids = _inserted_ids(result.lastrowid, len(values), increment)
+            result = await db.execute(select(table).filter(table.c.id.in_(ids)).order_by(table.c.id))
+            rows = result.all()
+            if not _matches_inserted(rows, values):
+                # 同時に実行された別のINSERTと採番が入り混じった場合は、作成したタスクを特定できないため取り消す
+                await db.rollback()
+                raise HTTPException(status_code=503, detail="Could not read back the created tasks, please retry")
+            tasks.extend(rows)
     await db.commit()
-    await db.refresh(task)
+    return tasks
+
+
+def _inserted_ids(first_id: int, count: int, increment: int) -> range:
+    # MySQLのlastrowidは複数行のINSERTの最初の行のID。InnoDBは行数が決まっているINSERTに
+    # auto_increment_incrementずつ連続した値を割り当てる（同時に実行された件数未定のINSERTがある場合を除く）
+    return range(first_id, first_id + count * increment, increment)
+
+
+def _matches_inserted(rows, values: List[dict]) -> bool:
+    # 読み直した行が、INSERTした値とすべて同じ順序で一致するか
+    return len(rows) == len(values) and all(
+        all(getattr(row, key) == value for key, value in inserted.items())
+        for row, inserted in zip(rows, values, strict=True)
+    )
+
+
+async def get(db: AsyncSession, id: int, expand: Sequence[str] = ()):
+    if expand:
+        # 関連を含めた結果はキャッシュしない
+        result: Result = await db.execute(_expand(select(task_model.Task), expand).filter(task_model.Task.id == id))
+        return result.scalars().first()
+
+    values = await task_cache.get(id)
+    if values is not None:
+        return task_model.Task(**values)
+
+    result: Result = await db.execute(GET_BY_ID, {"id": id})
+    task = result.first()
+    if task is None:
+        return None
+    if not is_replica_session(db):
+        # レプリカの値は遅延により古い可能性があるため、プライマリから読み出した値だけをキャッシュする
+        await task_cache.set(id, _to_cache_values(task[0]))
+    return task[0]
+
+
+async def get_version(db: AsyncSession, id: int) -> Optional[int]:
+    values = await task_cache.get(id)
+    if values is not None:
+        return values["version"]
+
+    result: Result = await db.execute(GET_VERSION_BY_ID, {"id": id})
+    return result.scalar_one_or_none()
+
+
+def _filter(query, task_filter: Optional[task_schema.TaskFilter]):
+    # 絞り込み条件を、一覧の並び順と同じインデックス（完了フラグ・期限の順）で範囲検索できる条件に変換する
+    if task_filter is None:
+        return query
+    if task_filter.owner_id is not None:
+        query = query.filter(task_model.Task.owner_id == task_filter.owner_id)
+    if task_filter.status:
+        statuses = {status.value for status in task_filter.status}
+        # すべての状態を指定した場合も、状態が未設定（NULL）のタスクを除外するため常にIN句で絞り込む
+        query = query.filter(task_model.Task.status.in_(statuses))
+        is_done_values = {1 if status == task_schema.Status.DONE.value else 0 for status in statuses}
+        if len(is_done_values) == 1:
+            # 並び順キーの先頭の完了フラグも条件に加え、インデックスの範囲を絞り込めるようにする
+            query = query.filter(IS_DONE_KEY == is_done_values.pop())
+    if task_filter.due_before is not None:
+        # 期限なしは9999-12-31として扱われるため、範囲の上限を指定すれば除外される
+        query = query.filter(DUE_DATE_KEY < task_filter.due_before)
+    if task_filter.due_after is not None:
+        query = query.filter(DUE_DATE_KEY > task_filter.due_after, task_model.Task.due_date.isnot(None))
+    if task_filter.overdue is True:
+        query = query.filter(IS_DONE_KEY == 0, DUE_DATE_KEY < date.today())
+    elif task_filter.overdue is False:
+        query = query.filter(or_(IS_DONE_KEY == 1, DUE_DATE_KEY >= date.today()))
+    if task_filter.updated_since is not None:
+        query = query.filter(task_model.Task.updated_at >= task_filter.updated_since)
+    return query
+
+
+async def get_fingerprint(db: AsyncSession, task_filter: Optional[task_schema.TaskFilter] = None):
+    # 一覧の内容が変わったかを行を読み出さずに判定するための件数・最大の更新日時・バージョンの合計
+    # （更新日時が秒精度のデータベースでも、同じ秒の更新をバージョンの合計で検知できる）
+    result: Result = await db.execute(_filter(FINGERPRINT, task_filter))
+    fingerprint = tuple(result.one())
+    if task_filter is not None and task_filter.overdue is not None:
+        # 期限切れかどうかは日付が変わるだけで変化する
+        fingerprint += (date.today(),)
+    return fingerprint
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _stats_columns():
+    # 状態ごとの件数と期限切れの件数（生成列ではなく状態と期限で判定することで、ix_tasks_owner_statsだけで集計できる）
+    # 期限切れの判定に使う今日の日付は実行時にtodayパラメータで渡す
+    status = task_model.Task.status
+    return (
+        func.count().label("total"),
+        _count_if(status == task_schema.Status.TODO.value).label("todo"),
+        _count_if(status == task_schema.Status.DOING.value).label("doing"),
+        _count_if(status == task_schema.Status.DONE.value).label("done"),
+        _count_if(
+            and_(
+                or_(status.is_(None), status != task_schema.Status.DONE.value),
+                task_model.Task.due_date < bindparam("today", type_=Date),
+            )
+        ).label("overdue"),
+    )
+
+
+STATS = select(*_stats_columns())
+STATS_BY_OWNER = (
+    select(task_model.Task.owner_id, *_stats_columns())
+    .group_by(task_model.Task.owner_id)
+    .order_by(task_model.Task.owner_id)
+)
+
+# 所有者ごとの集計。所有者が存在するかも同じSQL文で判定する（存在しない所有者を件数0と区別する）
+STATS_FOR_OWNER = select(
+    exists().where(user_model.User.id == bindparam("owner_id")).label("owner_exists"), *_stats_columns()
+)
+
+
+async def get_stats(
+    db: AsyncSession,
+    task_filter: Optional[task_schema.TaskFilter] = None,
+    group_by: Optional[task_schema.TaskStatsGroupBy] = None,
+):
+    # 状態ごとの件数と期限切れの件数をGROUP BYで集計する
+    query = STATS_BY_OWNER if group_by == task_schema.TaskStatsGroupBy.OWNER else STATS
+    result: Result = await db.execute(_filter(query, task_filter), {"today": date.today()})
+    return [dict(row._mapping) for row in result]
+
+
+async def get_owner_stats(db: AsyncSession, task_filter: task_schema.TaskFilter) -> Optional[dict]:
+    # 所有者（task_filter.owner_id）のタスクの件数を集計する。所有者が存在しない場合はNone
+    params = {"today": date.today(), "owner_id": task_filter.owner_id}
+    result: Result = await db.execute(_filter(STATS_FOR_OWNER, task_filter), params)
+    stats = dict(result.one()._mapping)
+    if not stats.pop("owner_exists"):
+        return None
+    return stats
+
+
+def _prebuilt_list(
+    limit: Optional[int],
+    after: Optional[Tuple],
+    task_filter: Optional[task_schema.TaskFilter],
+    fields: Optional[Sequence[str]],
+    expand: Sequence[str],
+):
+    # 組み立て済みのSQL文を使える一覧の場合は (SQL文, パラメータ) を、使えない場合はNoneを返す
+    if fields is not None or expand or after is not None:
+        return None
+    owner_id = None
+    if task_filter is not None:
+        if any(value not in (None, []) for name, value in task_filter if name != "owner_id"):
+            return None
+        owner_id = task_filter.owner_id
+    if owner_id is None:
+        statement, params = (LIST, {}) if limit is None else (LIST_PAGE, {"limit": limit})
+    else:
+        statement = LIST_BY_OWNER if limit is None else LIST_BY_OWNER_PAGE
+        params = {"owner_id": owner_id} if limit is None else {"owner_id": owner_id, "limit": limit}
+    return statement, params
+
+
+async def get_all(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    after: Optional[Tuple] = None,
+    task_filter: Optional[task_schema.TaskFilter] = None,
+    fields: Optional[Sequence[str]] = None,
+    expand: Sequence[str] = (),
+):
+    prebuilt = _prebuilt_list(limit, after, task_filter, fields, expand)
+    if prebuilt is not None:
+        result: Result = await db.execute(*prebuilt)
+        return result.scalars().all()
+    query = _expand(_filter(_select(fields), task_filter), expand).order_by(*ORDER_BY)
+    result = await db.execute(_paginate(query, limit, after))
+    return _rows(result, fields).all()
+
+
+async def stream_all(
+    db: AsyncSession,
+    yield_per: int,
+    task_filter: Optional[task_schema.TaskFilter] = None,
+    fields: Optional[Sequence[str]] = None,
+    expand: Sequence[str] = (),
+):
+    query = _expand(_filter(_select(fields), task_filter), expand).order_by(*ORDER_BY)
+    result = await db.stream(query.execution_options(yield_per=yield_per))
+    async for task in _rows(result, fields):
+        yield task
+
+
+async def get_all_by_owner(
+    db: AsyncSession,
+    owner_id: int,
+    limit: Optional[int] = None,
+    after: Optional[Tuple] = None,
+    task_filter: Optional[task_schema.TaskFilter] = None,
+    fields: Optional[Sequence[str]] = None,
+    expand: Sequence[str] = (),
+):
+    task_filter = (task_filter or task_schema.TaskFilter()).model_copy(update={"owner_id": owner_id})
+    return await get_all(db=db, limit=limit, after=after, task_filter=task_filter, fields=fields, expand=expand)
+
+
+def _precondition_failed() -> HTTPException:
+    return HTTPException(status_code=412, detail="Task has been modified by another request")
+
+
+async def update(
+    db: AsyncSession,
+    id: int,
+    task_update: task_schema.TaskUpdate,
+    versions: Optional[Sequence[int]] = None,
+):
+    values = task_update.model_dump(exclude_unset=True)
+    if not values:
+        # 更新する項目がない場合はupdated_at・versionも変更しない
+        task = await get(db=db, id=id)
+        if task is not None and versions is not None and task.version not in versions:
+            raise _precondition_failed()
+        return task
+
+    statement = sql_update(task_model.Task).filter(task_model.Task.id == id)
+    if versions is not None:
+        # ロックを取らずに、読み出した時点から変更されていない場合のみ更新する
+        statement = statement.filter(task_model.Task.version.in_(versions))
+    statement = statement.values(**values, version=task_model.Task.version + 1).execution_options(
+        synchronize_session=False
+    )
+    if db.get_bind().dialect.update_returning:
+        # 事前のSELECTなしに、UPDATE ... RETURNINGの1文で更新後の行を取得する
+        result: Result = await db.execute(statement.returning(task_model.Task))
+        task = result.scalars().first()
+        await db.commit()
+        await task_cache.delete(id)
+    else:
+        # RETURNINGに対応していないMySQLでは、更新した行がある場合のみ読み直す
+        result = await db.execute(statement)
+        await db.commit()
+        await task_cache.delete(id)
+        task = await get(db=db, id=id) if result.rowcount > 0 else None
+
+    if task is None and versions is not None and await get_version(db=db, id=id) is not None:
+        # 行は存在するがバージョンが一致しなかった
+        raise _precondition_failed()
     return task
 
 
-async def delete(db: AsyncSession, task: task_model.Task):
-    await db.delete(task)
+async def delete(db: AsyncSession, id: int) -> bool:
+    result: Result = await db.execute(DELETE_BY_ID, {"id": id})
     await db.commit()
+    await task_cache.delete(id)
+    return result.rowcount > 0
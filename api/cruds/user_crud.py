@@ -1,11 +1,46 @@
+from typing import Optional
+from typing import Sequence
+
 from fastapi import HTTPException
+from sqlalchemy import bindparam
+from sqlalchemy import delete as sql_delete
+from sqlalchemy import func
 from sqlalchemy import select
+from sqlalchemy import update as sql_update
 from sqlalchemy.engine import Result
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+import api.cruds.task_crud as task_crud
+import api.models.task_model as task_model
 import api.models.user_model as user_model
 import api.schemas.user_schema as user_schema
+from api.cache import Cache
+from api.replica import is_replica_session
+
+# expand で埋め込める関連
+EXPANDABLE = ("tasks",)
+
+# IDによる1件取得の結果のキャッシュ（更新・削除時に無効化する）
+user_cache = Cache("user")
+
+# 頻繁に実行するSQL文は組み立て済みのものを使う（task_crud を参照）
+GET_BY_ID = select(user_model.User).filter(user_model.User.id == bindparam("id"))
+GET_VERSION_BY_ID = select(user_model.User.version).filter(user_model.User.id == bindparam("id"))
+LIST = select(user_model.User)
+FINGERPRINT = select(func.count(), func.max(user_model.User.updated_at), func.sum(user_model.User.version))
+
+
+def _to_cache_values(user) -> dict:
+    return {column.key: getattr(user, column.key) for column in user_model.User.__table__.columns}
+
+
+def _expand(query, expand: Sequence[str]):
+    # 関連する行は一覧の件数によらず、IN句による1回の追加のSELECTでまとめて読み出す
+    if "tasks" in expand:
+        query = query.options(selectinload(user_model.User.tasks))
+    return query
 
 
 async def create(db: AsyncSession, user_create: user_schema.UserCreate):
@@ -13,43 +48,152 @@ async def create(db: AsyncSession, user_create: user_schema.UserCreate):
     db.add(user)
     try:
         await db.commit()
-        await db.refresh(user)
     except IntegrityError as error:
         await db.rollback()
         raise HTTPException(status_code=409, detail="Username or Email already exists") from error
     return user
 
 
-async def get(db: AsyncSession, id: int):
-    result: Result = await db.execute(select(user_model.User).filter(user_model.User.id == id))
+async def get(db: AsyncSession, id: int, expand: Sequence[str] = ()):
+    if expand:
+        # 関連を含めた結果はキャッシュしない
+        result: Result = await db.execute(_expand(select(user_model.User), expand).filter(user_model.User.id == id))
+        return result.scalars().first()
+
+    values = await user_cache.get(id)
+    if values is not None:
+        return user_model.User(**values)
+
+    result: Result = await db.execute(GET_BY_ID, {"id": id})
     user = result.first()
-    return user[0] if user is not None else None
+    if user is None:
+        return None
+    if not is_replica_session(db):
+        # レプリカの値は遅延により古い可能性があるため、プライマリから読み出した値だけをキャッシュする
+        await user_cache.set(id, _to_cache_values(user[0]))
+    return user[0]
+
+
+async def get_version(db: AsyncSession, id: int) -> Optional[int]:
+    values = await user_cache.get(id)
+    if values is not None:
+        return values["version"]
+
+    result: Result = await db.execute(GET_VERSION_BY_ID, {"id": id})
+    return result.scalar_one_or_none()
+
 
+async def get_fingerprint(db: AsyncSession):
+    # 一覧の内容が変わったかを行を読み出さずに判定するための件数・最大の更新日時・バージョンの合計
+    # （更新日時が秒精度のデータベースでも、同じ秒の更新をバージョンの合計で検知できる）
+    result: Result = await db.execute(FINGERPRINT)
+    return tuple(result.one())
 
-async def get_by_username(db: AsyncSession, username: str):
-    result: Result = await db.execute(select(user_model.User).filter(user_model.User.username == username))
+
+async def get_by_username(db: AsyncSession, username: str, expand: Sequence[str] = ()):
+    result: Result = await db.execute(
+        _expand(select(user_model.User), expand).filter(user_model.User.username == username)
+    )
     user = result.first()
     return user[0] if user is not None else None
 
 
-async def get_all(db: AsyncSession):
-    result: Result = await db.execute(select(user_model.User))
-    return result.scalars().all()
+def _select(fields: Optional[Sequence[str]]):
+    if fields is None:
+        return LIST
+    # 指定された項目の列だけを読み出す（結果はエンティティではなく行になる）
+    columns = user_model.User.__table__.c
+    return select(*(columns[name] for name in fields))
 
 
-async def update(db: AsyncSession, user_update: user_schema.UserUpdate, user: user_model.User):
-    for key, value in user_update.model_dump(exclude_unset=True).items():
-        setattr(user, key, value)
-    db.add(user)
+def _rows(result: Result, fields: Optional[Sequence[str]]):
+    return result.scalars() if fields is None else result
+
+
+async def get_all(db: AsyncSession, fields: Optional[Sequence[str]] = None, expand: Sequence[str] = ()):
+    result: Result = await db.execute(_expand(_select(fields), expand))
+    return _rows(result, fields).all()
+
+
+async def stream_all(
+    db: AsyncSession, yield_per: int, fields: Optional[Sequence[str]] = None, expand: Sequence[str] = ()
+):
+    result = await db.stream(_expand(_select(fields), expand).execution_options(yield_per=yield_per))
+    async for user in _rows(result, fields):
+        yield user
+
+
+def _precondition_failed() -> HTTPException:
+    return HTTPException(status_code=412, detail="User has been modified by another request")
+
+
+async def update(
+    db: AsyncSession,
+    id: int,
+    user_update: user_schema.UserUpdate,
+    versions: Optional[Sequence[int]] = None,
+):
+    values = user_update.model_dump(exclude_unset=True)
+    if not values:
+        # 更新する項目がない場合はupdated_at・versionも変更しない
+        user = await get(db=db, id=id)
+        if user is not None and versions is not None and user.version not in versions:
+            raise _precondition_failed()
+        return user
+
+    statement = sql_update(user_model.User).filter(user_model.User.id == id)
+    if versions is not None:
+        # ロックを取らずに、読み出した時点から変更されていない場合のみ更新する
+        statement = statement.filter(user_model.User.version.in_(versions))
+    statement = statement.values(**values, version=user_model.User.version + 1).execution_options(
+        synchronize_session=False
+    )
+    update_returning = db.get_bind().dialect.update_returning
     try:
+        if update_returning:
+            # 事前のSELECTなしに、UPDATE ... RETURNINGの1文で更新後の行を取得する
+            result: Result = await db.execute(statement.returning(user_model.User))
+            user = result.scalars().first()
+        else:
+            result = await db.execute(statement)
         await db.commit()
-        await db.refresh(user)
     except IntegrityError as error:
         await db.rollback()
         raise HTTPException(status_code=409, detail="Username or Email already exists") from error
+    await user_cache.delete(id)
+
+    if not update_returning:
+        # RETURNINGに対応していないMySQLでは、更新した行がある場合のみ読み直す
+        user = await get(db=db, id=id) if result.rowcount > 0 else None
+
+    if user is None and versions is not None and await get_version(db=db, id=id) is not None:
+        # 行は存在するがバージョンが一致しなかった
+        raise _precondition_failed()
     return user
 
 
-async def delete(db: AsyncSession, user: user_model.User):
-    await db.delete(user)
+async def delete(db: AsyncSession, id: int) -> bool:
+    # ユーザーのタスクは削除せず、所有者を外す（ORMのdeleteでリレーションを辿っていた時と同じ挙動）
+    # タスクの内容が変わるため、ETagと楽観的排他制御に使うバージョンも上げる
+    statement = (
+        sql_update(task_model.Task)
+        .filter(task_model.Task.owner_id == id)
+        .values(owner_id=None, version=task_model.Task.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    task_ids = None
+    if db.get_bind().dialect.update_returning:
+        result: Result = await db.execute(statement.returning(task_model.Task.id))
+        task_ids = result.scalars().all()
+    else:
+        await db.execute(statement)
+    result = await db.execute(sql_delete(user_model.User).filter(user_model.User.id == id))
     await db.commit()
+
+    await user_cache.delete(id)
+    if task_ids is None:
+        # 所有者を外したタスクのIDが分からない場合はタスクのキャッシュをすべて破棄する
+        await task_crud.task_cache.clear()
+    for task_id in task_ids or []:
+        await task_crud.task_cache.delete(task_id)
+    return result.rowcount > 0
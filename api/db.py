@@ -1,4 +1,9 @@
+from typing import Dict
+
 from dotenv import load_dotenv
+from fastapi import Depends
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import declarative_base
@@ -6,6 +11,14 @@ from sqlalchemy.orm import sessionmaker
 
 from api.azure_db_config import apply_azure_db_config
 from api.cloud_db_config import get_database_url
+from api.cloud_db_config import get_replica_database_urls
+from api.db_pool import get_engine_options
+from api.db_pool import register_pool_metrics
+from api.replica import REPLICA_INFO_KEY
+from api.replica import ReadTarget
+from api.replica import ReplicaSet
+from api.replica import get_replica_eject_seconds
+from api.replica import prefers_primary
 
 load_dotenv()
 
@@ -14,10 +27,45 @@ load_dotenv()
 ASYNC_DB_URL = get_database_url()
 
 # Azure環境の場合、SSL接続設定を適用（非同期エンジン用）
+# プリペアドステートメントのキャッシュ等のドライバーの設定もあわせて適用（api.db_pool.get_connect_args を参照）
 ASYNC_DB_URL, connect_args = apply_azure_db_config(ASYNC_DB_URL, is_async=True)
 
-async_engine = create_async_engine(ASYNC_DB_URL, echo=True, connect_args=connect_args)
-async_session = sessionmaker(autocommit=False, autoflush=False, bind=async_engine, class_=AsyncSession)
+# 接続プールのサイズ等は環境変数で設定（api.db_pool.get_engine_options を参照）
+# DB_POOL_MODE=external の場合は接続を保持せず、PgBouncer等の外部の接続プーラーに任せる
+async_engine = create_async_engine(ASYNC_DB_URL, connect_args=connect_args, **get_engine_options())
+register_pool_metrics("primary", async_engine.pool)
+# 起動時のウォームアップと終了時の接続プールの破棄の対象（名前 -> エンジン、api.lifespan を参照）
+engines: Dict[str, AsyncEngine] = {"primary": async_engine}
+# コミット後に属性を読み直すSELECTを発行しないよう、コミット時に属性を期限切れにしない
+async_session = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=async_engine, class_=AsyncSession
+)
+
+
+def _create_replica_session_factory(name: str, url: str):
+    # レプリカにもプライマリと同じ接続プールの設定とAzure環境のSSL接続設定を適用する
+    url, replica_connect_args = apply_azure_db_config(url, is_async=True)
+    engine = create_async_engine(url, connect_args=replica_connect_args, **get_engine_options())
+    register_pool_metrics(name, engine.pool)
+    engines[name] = engine
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=engine,
+        class_=AsyncSession,
+        info={REPLICA_INFO_KEY: True},
+    )
+
+
+# 読み取り用のレプリカ（設定されていない場合は空で、読み取りもプライマリから行う）
+replica_set = ReplicaSet(
+    [
+        (f"replica{i}", _create_replica_session_factory(f"replica{i}", url))
+        for i, url in enumerate(get_replica_database_urls(), 1)
+    ],
+    eject_seconds=get_replica_eject_seconds(),
+)
 
 Base = declarative_base()
 
@@ -25,3 +73,19 @@ Base = declarative_base()
 async def get_db():
     async with async_session() as session:
         yield session
+
+
+async def get_read_target(request: Request) -> ReadTarget:
+    # GETのエンドポイント用。読み取り先（レプリカがある場合はレプリカ）をリクエストごとに一度だけ選ぶ
+    # （同期関数にするとスレッドプールで実行されるため、非同期関数にしている）
+    # ストリーミングのレスポンスでは依存関係の終了処理がレスポンスの送信前に実行されるため、
+    # ReadTarget.session_factory() から生成したセッションを呼び出し側でクローズする
+    if not replica_set:
+        return ReadTarget(async_session)
+    return replica_set.read_target(async_session, prefer_primary=prefers_primary(request))
+
+
+async def get_read_db(target: ReadTarget = Depends(get_read_target)):
+    # GETのエンドポイント用のセッション
+    async with target.session() as session:
+        yield session
@@ -0,0 +1,199 @@
+"""
+データベースエンジンの接続プール設定を提供するモジュール。
+
+デプロイ先ごとにデータベースのプランで上限接続数が異なるため、
+接続プールのサイズやタイムアウトを環境変数から設定できるようにする。
+
+PgBouncer等のトランザクション単位の接続プーラーを経由する場合は DB_POOL_MODE=external を指定する。
+アプリケーション側では接続を保持せず（NullPool）、接続の共有はプーラーに任せるため、
+多数のワーカーが少ないデータベースの接続数を共有できる。
+"""
+
+import time
+from typing import Callable
+from typing import Dict
+from typing import Tuple
+from uuid import uuid4
+
+from decouple import Choices
+from decouple import config
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import Pool
+from sqlalchemy.pool import QueuePool
+
+from api.metrics import Counter
+from api.metrics import Gauge
+from api.metrics import Histogram
+
+# 接続プールから接続を取得するまでの待ち時間
+POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the database pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+# 待ち時間がpool_timeoutを超えて接続を取得できなかった回数
+POOL_CHECKOUT_FAILURES = Counter(
+    "db_pool_checkout_failures_total",
+    "Number of failed attempts to get a connection from the database pool.",
+)
+
+
+# 使用状況をメトリクスとして出力する接続プール（名前 -> 接続プール）
+_pools: Dict[str, Pool] = {}
+
+
+def _pool_values(read: Callable[[QueuePool], int]) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    # /metrics の出力時に接続プールから値を読み出す（サイズの上限がないNullPool等は対象外）
+    return lambda: {(name,): read(pool) for name, pool in _pools.items() if isinstance(pool, QueuePool)}
+
+
+POOL_SIZE = Gauge(
+    "db_pool_size", "Number of connections the pool keeps open.", ("pool",), function=_pool_values(QueuePool.size)
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Number of connections currently checked out from the pool.",
+    ("pool",),
+    function=_pool_values(QueuePool.checkedout),
+)
+# QueuePool.overflow() は接続数がpool_sizeに満たない間は負の値になるため、0以上に丸める
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Number of connections opened beyond the pool size.",
+    ("pool",),
+    function=_pool_values(lambda pool: max(pool.overflow(), 0)),
+)
+
+
+def register_pool_metrics(name: str, pool: Pool) -> None:
+    """
+    接続プールの使用状況（サイズ・使用中の接続数・pool_sizeを超えた接続数）をメトリクスとして出力する。
+
+    Args:
+        name: メトリクスのpoolラベルの値（例: primary）
+        pool: 接続プール
+    """
+    _pools[name] = pool
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    接続の取得待ち時間をメトリクスに記録する接続プール。
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            POOL_CHECKOUT_FAILURES.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+# アプリケーション側で接続プールを持つ（internal）か、外部の接続プーラーに任せる（external）か
+POOL_MODES = ("internal", "external")
+# 返却された接続を再利用する順序
+POOL_ORDERS = ("fifo", "lifo")
+
+
+def get_pool_mode() -> str:
+    """
+    環境変数 DB_POOL_MODE から接続プールのモードを取得する。
+
+    Returns:
+        internal（デフォルト）または external
+
+    Raises:
+        ValueError: DB_POOL_MODEに不正な値が設定されている場合
+    """
+    return config("DB_POOL_MODE", default="internal", cast=Choices(POOL_MODES, cast=str.lower))
+
+
+def get_engine_options() -> Dict:
+    """
+    環境変数から create_async_engine に渡すエンジン・接続プールの設定を取得する。
+
+    DB_POOL_MODE=external の場合は接続を保持しないNullPoolを使い、
+    接続プールの設定（DB_POOL_*, DB_MAX_OVERFLOW）は無視する。
+
+    対応する環境変数:
+    - DB_POOL_MODE: internalまたはexternal（デフォルト: internal）
+    - DB_ECHO: 実行するSQLをログに出力するかどうか（デフォルト: false）
+    - DB_POOL_SIZE: プールに保持する接続数（デフォルト: 5）
+    - DB_MAX_OVERFLOW: DB_POOL_SIZEを超えて一時的に作成できる接続数（デフォルト: 10）
+    - DB_POOL_TIMEOUT: 接続の取得を待つ最大秒数（デフォルト: 30）
+    - DB_POOL_RECYCLE: 接続を作り直すまでの秒数、-1の場合は作り直さない（デフォルト: -1）
+    - DB_POOL_PRE_PING: 接続の取得時に死活確認を行うかどうか（デフォルト: false）
+    - DB_POOL_ORDER: 返却された接続を再利用する順序、lifoまたはfifo（デフォルト: fifo）
+    - DB_QUERY_CACHE_SIZE: SQLAlchemyがエンジンごとに保持するコンパイル済みSQLの数（デフォルト: 500）
+
+    Returns:
+        create_async_engine のキーワード引数の辞書
+
+    Raises:
+        ValueError: 環境変数に不正な値が設定されている場合
+    """
+    if get_pool_mode() == "external":
+        # 接続は使い終わるたびに閉じてプーラーに返す（プーラーへの接続はサーバーへの接続より軽い）
+        return {
+            "echo": config("DB_ECHO", default=False, cast=bool),
+            "poolclass": NullPool,
+            "query_cache_size": config("DB_QUERY_CACHE_SIZE", default=500, cast=int),
+        }
+
+    pool_order = config("DB_POOL_ORDER", default="fifo", cast=Choices(POOL_ORDERS, cast=str.lower))
+    return {
+        "echo": config("DB_ECHO", default=False, cast=bool),
+        "poolclass": InstrumentedAsyncAdaptedQueuePool,
+        "pool_size": config("DB_POOL_SIZE", default=5, cast=int),
+        "max_overflow": config("DB_MAX_OVERFLOW", default=10, cast=int),
+        "pool_timeout": config("DB_POOL_TIMEOUT", default=30, cast=int),
+        "pool_recycle": config("DB_POOL_RECYCLE", default=-1, cast=int),
+        "pool_pre_ping": config("DB_POOL_PRE_PING", default=False, cast=bool),
+        "pool_use_lifo": pool_order == "lifo",
+        "query_cache_size": config("DB_QUERY_CACHE_SIZE", default=500, cast=int),
+    }
+
+
+def _unique_prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def get_connect_args(db_url: str) -> Dict:
+    """
+    環境変数からドライバーに渡す接続の設定（create_async_engine の connect_args）を取得する。
+
+    asyncpgの場合のみ、接続ごとに保持するプリペアドステートメントの数を設定する。
+    DB_POOL_MODE=external の場合は、トランザクションごとに別のサーバー接続が割り当てられ、
+    同じ名前のプリペアドステートメントが衝突・消失するため、キャッシュせずに一意な名前を付ける
+    （この場合、下記の環境変数は無視する）。
+
+    対応する環境変数:
+    - DB_PREPARED_STATEMENT_CACHE_SIZE: SQLAlchemyのasyncpgドライバーが保持する数（デフォルト: 100）
+    - DB_STATEMENT_CACHE_SIZE: asyncpg自身が保持する数（デフォルト: 100）
+
+    Args:
+        db_url: データベース接続URL
+
+    Returns:
+        connect_args に追加する辞書（asyncpg以外の場合は空）
+
+    Raises:
+        ValueError: 環境変数に不正な値が設定されている場合
+    """
+    if make_url(db_url).get_driver_name() != "asyncpg":
+        return {}
+    if get_pool_mode() == "external":
+        return {
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": _unique_prepared_statement_name,
+        }
+    return {
+        "prepared_statement_cache_size": config("DB_PREPARED_STATEMENT_CACHE_SIZE", default=100, cast=int),
+        "statement_cache_size": config("DB_STATEMENT_CACHE_SIZE", default=100, cast=int),
+    }
@@ -0,0 +1,96 @@
+"""
+ETagによる条件付きリクエスト（If-None-Match, If-Match）を扱うモジュール。
+
+1件取得ではIDとバージョン、一覧取得では件数・最大の更新日時・バージョンの合計（および検索条件）から弱いETagを生成する。
+クライアントが保持しているETagと一致する場合は、行を読み出したりシリアライズしたりせずに304を返す。
+更新時はIf-MatchのETagからバージョンを取り出し、UPDATE文の条件にすることで楽観的排他制御を行う。
+"""
+
+import hashlib
+from typing import Any
+from typing import List
+from typing import Optional
+
+from fastapi import Response
+
+ETAG_HEADER = "ETag"
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    値の組み合わせから弱いETagを生成する。
+
+    Args:
+        parts: ETagの元にする値（日付・日時はISO 8601形式に変換する）
+
+    Returns:
+        W/"..." 形式のETag
+    """
+    source = "|".join(part.isoformat() if hasattr(part, "isoformat") else str(part) for part in parts)
+    return f'W/"{hashlib.blake2b(source.encode(), digest_size=12).hexdigest()}"'
+
+
+def make_resource_etag(id: int, version: int) -> str:
+    """
+    1件のリソースのETagを生成する。If-Matchで受け取った際にバージョンを取り出せるよう、ハッシュ化しない。
+
+    Args:
+        id: リソースのID
+        version: リソースのバージョン
+
+    Returns:
+        W/"<ID>-<バージョン>" 形式のETag
+    """
+    return f'W/"{id}-{version}"'
+
+
+def parse_if_match(if_match: Optional[str], id: int) -> Optional[List[int]]:
+    """
+    If-Matchヘッダーから、指定したIDのリソースのバージョンを取り出す。
+
+    Args:
+        if_match: リクエストのIf-Matchヘッダーの値
+        id: 更新するリソースのID
+
+    Returns:
+        ヘッダーがない場合、または * の場合はNone（バージョンを確認しない）。
+        それ以外の場合はヘッダーに含まれるバージョンのリスト（該当するものがなければ空のリスト）
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    prefix = f"{id}-"
+    for candidate in if_match.split(","):
+        # 弱いETagのみを発行しているため、If-Matchでも弱い比較を行う
+        opaque = candidate.strip().removeprefix("W/").strip('"')
+        if opaque.startswith(prefix) and opaque[len(prefix) :].isdigit():
+            versions.append(int(opaque[len(prefix) :]))
+    return versions
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-MatchヘッダーにETagが含まれているかを弱い比較で判定する。
+
+    Args:
+        if_none_match: リクエストのIf-None-Matchヘッダーの値
+        etag: 現在のリソースのETag
+
+    Returns:
+        一致するETag（または * ）が含まれている場合はTrue
+    """
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """
+    本文なしの304レスポンスを作成する。
+    """
+    return Response(status_code=304, headers={ETAG_HEADER: etag})
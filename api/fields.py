@@ -0,0 +1,116 @@
+"""
+レスポンスに含める項目を fields クエリパラメータ（例: fields=id,title,status）で、
+埋め込む関連を expand クエリパラメータ（例: expand=owner）で指定するためのモジュール。
+
+一覧取得では指定された項目の列だけをSELECTし、レスポンスモデルによる検証を経由せずにJSONへ変換して返すため、
+データベースから読み出す量・転送量・シリアライズのコストがいずれも指定した項目の分だけになる。
+fields を指定しない場合も、レスポンスモデルの全項目を同じ方法でJSONへ変換する（serialize_fields）。
+"""
+
+from typing import Any
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from api.responses import dumps
+
+
+def response_fields(model: Type[BaseModel]) -> Tuple[str, ...]:
+    """
+    レスポンスモデルの全項目名を、model_dump_json と同じ順序で返す。
+    """
+    return tuple(model.model_fields)
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """
+    fields クエリパラメータを項目名のリストに変換する。
+
+    Args:
+        fields: カンマ区切りの項目名
+        model: 指定できる項目を定義したレスポンスモデル
+
+    Returns:
+        重複を除いた項目名のリスト（指定されていない場合はNone）
+
+    Raises:
+        ValueError: 空の場合、またはレスポンスモデルにない項目が含まれている場合
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise ValueError("fields must not be empty")
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def parse_expand(expand: Optional[str], expandable: Sequence[str]) -> Tuple[str, ...]:
+    """
+    expand クエリパラメータを関連名のタプルに変換する。
+
+    Args:
+        expand: カンマ区切りの関連名
+        expandable: 埋め込める関連名
+
+    Returns:
+        重複を除いた関連名のタプル（指定されていない場合は空のタプル）
+
+    Raises:
+        ValueError: 埋め込めない関連が含まれている場合
+    """
+    if expand is None:
+        return ()
+    names = tuple(dict.fromkeys(name.strip() for name in expand.split(",") if name.strip()))
+    unknown = [name for name in names if name not in expandable]
+    if unknown:
+        raise ValueError(f"Unknown expand: {', '.join(unknown)}")
+    return names
+
+
+def serialize_fields(row: Any, fields: Sequence[str]) -> bytes:
+    """
+    行（ORMのエンティティまたは列を選択した結果の行）の指定した項目だけをJSONに変換する。
+
+    データベースから読み出した値をそのまま出力するため、レスポンスモデルの検証（max_length等）は行わない。
+    日付・日時・Enumの出力形式はレスポンスモデルの model_dump_json と同じになる。
+    """
+    return dumps({name: getattr(row, name) for name in fields})
+
+
+def fields_response(row: Any, fields: Sequence[str], headers: Optional[Mapping[str, str]] = None) -> Response:
+    """
+    1件の行を指定した項目だけのJSONで返すレスポンスを作成する。
+
+    Args:
+        row: 行
+        fields: レスポンスに含める項目名
+        headers: レスポンスに設定するヘッダー（ETag等）
+
+    Returns:
+        Response
+    """
+    return json_response(serialize_fields(row, fields), headers=headers)
+
+
+def json_response(content: bytes, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """
+    JSONに変換済みのバイト列をそのまま返すレスポンスを作成する。
+    """
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def json_list_response(items: Iterable[bytes], headers: Optional[Mapping[str, str]] = None) -> Response:
+    """
+    要素ごとにJSONに変換済みのバイト列をJSON配列にまとめて返すレスポンスを作成する。
+    """
+    return json_response(b"[" + b",".join(items) + b"]", headers=headers)
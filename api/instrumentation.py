@@ -0,0 +1,255 @@
+"""
+リクエストごとに実行したSQL文の数と所要時間を計測するモジュール。
+
+SQLAlchemyのエンジンのイベント（before_cursor_execute / after_cursor_execute）で各SQL文の所要時間を計測し、
+contextvarsで保持している実行中のリクエストの集計に加算する。
+集計はServer-Timingヘッダーとリクエストごとの構造化ログ（extraに各値を設定）で出力し、
+閾値を超えたSQL文は個別に警告としてログに出力する。
+
+ストリーミングのレスポンスではヘッダーの送信後もSQL文を実行するため、
+Server-Timingヘッダーにはヘッダー送信までの値を、ログにはレスポンス全体の値を出力する。
+
+あわせて、ルートのテンプレート（例: /tasks/{id}）ごとのレイテンシ・DBの所要時間・SQL文の数のヒストグラムと
+処理中のリクエスト数を /metrics に出力する。ラベルの値に対応する記録先はルートごとに一度だけ作成して使い回す。
+
+対応する環境変数:
+- DB_SLOW_QUERY_THRESHOLD: 遅いSQL文として警告を出力する所要時間（ミリ秒、デフォルト: 200、0以下の場合は出力しない）
+- SERVER_TIMING_ENABLED: Server-Timingヘッダーを付けるかどうか（デフォルト: true）
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict
+from typing import Optional
+
+from decouple import config
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from api.metrics import Counter
+from api.metrics import Gauge
+from api.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "Number of SQL statements slower than DB_SLOW_QUERY_THRESHOLD.")
+HTTP_REQUESTS = Counter("http_requests_total", "Number of HTTP requests.", ("method", "route", "status"))
+HTTP_REQUEST_DURATION_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL statements per HTTP request.",
+    ("method", "route"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+HTTP_REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "Number of SQL statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Number of HTTP requests currently being processed.")
+
+# どのルートにも一致しなかったリクエストのrouteラベルの値（存在しないパスごとに系列が増えないようにする）
+UNMATCHED_ROUTE = "unmatched"
+
+# 遅いSQL文として警告を出力する所要時間（秒、Noneの場合は出力しない）
+_slow_query_threshold: Optional[float] = None
+
+
+class RequestStats:
+    """
+    1つのリクエストで実行したSQL文の集計。
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def add(self, statement: str, duration: float) -> None:
+        self.statements += 1
+        self.db_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+
+# 実行中のリクエストの集計（リクエストの外で実行したSQL文はNone）
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def get_request_stats() -> Optional[RequestStats]:
+    """
+    実行中のリクエストの集計を返す。リクエストの外で呼び出した場合はNone。
+    """
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(statement, duration)
+    if _slow_query_threshold is not None and duration >= _slow_query_threshold:
+        DB_SLOW_QUERIES.inc()
+        logger.warning(
+            "Slow SQL statement",
+            extra={"duration_ms": round(duration * 1000, 3), "statement": statement, "executemany": executemany},
+        )
+
+
+def _handle_error(exception_context):
+    # 失敗したSQL文は after_cursor_execute が呼ばれないため、開始時刻を捨てる
+    start_times = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+    if start_times:
+        start_times.pop()
+
+
+def instrument_engines(slow_query_threshold: Optional[float]) -> None:
+    """
+    すべてのエンジン（読み取り用のエンジンやテスト用のエンジンを含む）のSQL文を計測する。
+
+    Args:
+        slow_query_threshold: 遅いSQL文として警告を出力する所要時間（秒、Noneの場合は出力しない）
+    """
+    global _slow_query_threshold
+    _slow_query_threshold = slow_query_threshold
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def format_server_timing(stats: RequestStats, total: float) -> str:
+    """
+    集計をServer-Timingヘッダーの値に変換する。
+
+    Args:
+        stats: リクエストの集計
+        total: リクエストの開始からの経過時間（秒）
+
+    Returns:
+        例: db;desc="3 queries";dur=1.234, db-slowest;dur=0.567, app;dur=5.678
+    """
+    return (
+        f'db;desc="{stats.statements} queries";dur={stats.db_time * 1000:.3f}, '
+        f"db-slowest;dur={stats.slowest_time * 1000:.3f}, "
+        f"app;dur={total * 1000:.3f}"
+    )
+
+
+class _RouteMetrics:
+    """
+    1つのルートとメソッドの組み合わせの記録先（内部クラス）。
+    """
+
+    __slots__ = ("method", "route", "duration", "db_time", "db_statements", "requests")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.duration = HTTP_REQUEST_DURATION_SECONDS.labels(method, route)
+        self.db_time = HTTP_REQUEST_DB_SECONDS.labels(method, route)
+        self.db_statements = HTTP_REQUEST_DB_STATEMENTS.labels(method, route)
+        # ステータスコード -> 記録先
+        self.requests: Dict[int, object] = {}
+
+    def record(self, status_code: int, duration: float, stats: RequestStats) -> None:
+        self.duration.observe(duration)
+        self.db_time.observe(stats.db_time)
+        self.db_statements.observe(stats.statements)
+        requests = self.requests.get(status_code)
+        if requests is None:
+            requests = self.requests[status_code] = HTTP_REQUESTS.labels(self.method, self.route, str(status_code))
+        requests.inc()
+
+
+# ルートのテンプレート -> メソッド -> 記録先
+_route_metrics: Dict[str, Dict[str, _RouteMetrics]] = {}
+
+
+def _get_route_metrics(method: str, route: str) -> _RouteMetrics:
+    by_method = _route_metrics.get(route)
+    if by_method is None:
+        by_method = _route_metrics[route] = {}
+    metrics = by_method.get(method)
+    if metrics is None:
+        metrics = by_method[method] = _RouteMetrics(method, route)
+    return metrics
+
+
+class InstrumentationMiddleware:
+    """
+    リクエストごとにSQL文の集計を開始し、Server-Timingヘッダー・構造化ログ・メトリクスに出力するASGIミドルウェア。
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_server_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append(SERVER_TIMING_HEADER, format_server_timing(stats, time.perf_counter() - start))
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            _request_stats.reset(token)
+            duration = time.perf_counter() - start
+            # ルーティング後のscopeには一致したルートが設定されている
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            _get_route_metrics(scope["method"], route_path).record(status_code, duration, stats)
+            logger.info(
+                "Request completed",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_path,
+                    "status_code": status_code,
+                    "duration_ms": round(duration * 1000, 3),
+                    "db_statements": stats.statements,
+                    "db_time_ms": round(stats.db_time * 1000, 3),
+                    "db_slowest_ms": round(stats.slowest_time * 1000, 3),
+                    "db_slowest_statement": stats.slowest_statement,
+                },
+            )
+
+
+def add_instrumentation_middleware(app):
+    threshold = config("DB_SLOW_QUERY_THRESHOLD", default=200, cast=float)
+    instrument_engines(threshold / 1000 if threshold > 0 else None)
+    app.add_middleware(
+        InstrumentationMiddleware, server_timing=config("SERVER_TIMING_ENABLED", default=True, cast=bool)
+    )
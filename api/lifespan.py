@@ -0,0 +1,167 @@
+"""
+アプリケーションの起動時と終了時の処理（FastAPIのlifespan）を提供するモジュール。
+
+起動時は各エンジンの接続プールに接続を開いておき、TCP・TLSのハンドシェイク（Azure環境のSSL接続を含む）を
+最初のリクエストの前に済ませる。あわせて各接続で頻繁に実行するSQL文を一度実行し、
+SQLAlchemyのコンパイル済みSQLのキャッシュとドライバーのプリペアドステートメントのキャッシュに載せる。
+ウォームアップに失敗した場合やタイムアウトした場合は警告をログに出力して起動を続ける（接続は最初のリクエストで開く）。
+
+終了時は処理中のリクエストが完了した後に、すべてのエンジンの接続プールを閉じる。
+
+対応する環境変数:
+- DB_WARMUP_CONNECTIONS: 起動時にエンジンごとに開く接続数、0の場合はウォームアップしない
+  （デフォルト: auto、接続プールのサイズ。サイズを超える分は返却時に閉じられるため、サイズまでに抑える）
+- DB_WARMUP_TIMEOUT: ウォームアップを待つ最大秒数（デフォルト: 10）
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+
+from decouple import config
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import QueuePool
+
+import api.cruds.task_crud as task_crud
+import api.cruds.user_crud as user_crud
+
+logger = logging.getLogger(__name__)
+
+# 各接続で一度実行する、頻繁に実行するSQL文（存在しないIDや1件の上限を指定し、ほとんど行を読み出さない）
+WARMUP_QUERIES: Sequence[Callable[[AsyncSession], Awaitable]] = (
+    lambda db: task_crud.get(db=db, id=0),
+    lambda db: task_crud.get_all(db=db, limit=1),
+    lambda db: user_crud.get(db=db, id=0),
+)
+
+
+async def _run_queries(connection: AsyncConnection, queries: Sequence[Callable[[AsyncSession], Awaitable]]) -> None:
+    async with AsyncSession(bind=connection) as session:
+        for query in queries:
+            await query(session)
+
+
+async def warm_up_engine(
+    engine: AsyncEngine,
+    connections: Optional[int] = None,
+    queries: Sequence[Callable[[AsyncSession], Awaitable]] = WARMUP_QUERIES,
+) -> int:
+    """
+    エンジンの接続プールに接続を開き、各接続で頻繁に実行するSQL文を一度実行しておく。
+
+    Args:
+        engine: 対象のエンジン
+        connections: 開く接続数（Noneの場合は接続プールのサイズ）
+        queries: 各接続で実行する関数
+
+    Returns:
+        開いた接続数
+    """
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        connections = pool.size() if connections is None else min(connections, pool.size())
+    elif connections is None:
+        # サイズの上限がない接続プール（NullPool等）は返却時に接続を閉じるため、開いておく意味がない
+        connections = 0
+    if connections <= 0:
+        return 0
+
+    # 同時に取得して別々の接続を開かせる（1つずつ取得して返すと同じ接続が使い回される）
+    tasks = [asyncio.ensure_future(engine.connect().start()) for _ in range(connections)]
+    try:
+        opened = await asyncio.gather(*tasks)
+        await asyncio.gather(*(_run_queries(connection, queries) for connection in opened))
+    finally:
+        # 失敗やタイムアウトで中断された場合も、開き終えた接続を返却する（接続は閉じずに接続プールに返却される）
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for task in tasks:
+            if not task.cancelled() and task.exception() is None:
+                await task.result().close()
+    return connections
+
+
+async def warm_up_engines(engines: Dict[str, AsyncEngine], connections: Optional[int], timeout: float) -> None:
+    """
+    すべてのエンジンを並行してウォームアップする。失敗したエンジンは警告をログに出力して続行する。
+
+    Args:
+        engines: 名前 -> エンジン
+        connections: エンジンごとに開く接続数（Noneの場合は接続プールのサイズ）
+        timeout: エンジンごとにウォームアップを待つ最大秒数
+    """
+
+    async def warm_up(name: str, engine: AsyncEngine) -> None:
+        start = time.perf_counter()
+        try:
+            opened = await asyncio.wait_for(warm_up_engine(engine, connections), timeout)
+        except Exception:
+            logger.warning("Failed to warm up database connections", extra={"engine": name}, exc_info=True)
+            return
+        logger.info(
+            "Warmed up database connections",
+            extra={
+                "engine": name,
+                "connections": opened,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            },
+        )
+
+    await asyncio.gather(*(warm_up(name, engine) for name, engine in engines.items()))
+
+
+async def dispose_engines(engines: Dict[str, AsyncEngine]) -> None:
+    """
+    すべてのエンジンの接続プールを閉じる。
+    """
+    await asyncio.gather(*(engine.dispose() for engine in engines.values()))
+
+
+def get_warmup_connections() -> Optional[int]:
+    """
+    環境変数から起動時にエンジンごとに開く接続数を取得する。
+
+    Returns:
+        接続数（autoの場合はNoneで、接続プールのサイズ）
+
+    Raises:
+        ValueError: DB_WARMUP_CONNECTIONSに0以上の整数またはauto以外が設定されている場合
+    """
+    value = config("DB_WARMUP_CONNECTIONS", default="auto").lower()
+    if value == "auto":
+        return None
+    if not value.isdigit():
+        raise ValueError(f"Invalid DB_WARMUP_CONNECTIONS value: {value}. Use a non-negative integer or 'auto'.")
+    return int(value)
+
+
+def create_lifespan(engines: Dict[str, AsyncEngine]):
+    """
+    起動時にエンジンをウォームアップし、終了時に接続プールを閉じるlifespanを作成する。
+
+    Args:
+        engines: 名前 -> エンジン（api.db.engines）
+
+    Raises:
+        ValueError: 環境変数に不正な値が設定されている場合
+    """
+    connections = get_warmup_connections()
+    timeout = config("DB_WARMUP_TIMEOUT", default=10, cast=float)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if connections != 0:
+            await warm_up_engines(engines, connections, timeout)
+        yield
+        await dispose_engines(engines)
+
+    return lifespan
@@ -1,10 +1,22 @@
 from fastapi import FastAPI
 
+from api.compression import add_compression_middleware
 from api.cors import add_cors_middleware
+from api.db import engines
+from api.db import replica_set
+from api.instrumentation import add_instrumentation_middleware
+from api.lifespan import create_lifespan
+from api.replica import add_read_your_writes_middleware
+from api.responses import FastJSONResponse
+from api.routers import metrics_router
 from api.routers import task_router
 from api.routers import user_router
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=create_lifespan(engines))
 app.include_router(task_router.router)
 app.include_router(user_router.router)
+app.include_router(metrics_router.router)
+add_compression_middleware(app=app)
+add_instrumentation_middleware(app=app)
+add_read_your_writes_middleware(app=app, replica_set=replica_set)
 add_cors_middleware(app=app)
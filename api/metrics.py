@@ -0,0 +1,251 @@
+"""
+Prometheusのテキスト形式で公開するメトリクスを提供するモジュール。
+
+値の更新はイベントループ上の単一スレッドから行われる前提で、ロックを取らずに数値を加算するだけにしている。
+ラベルの組み合わせごとの値とその出力用文字列は初回の記録時に一度だけ作成する。
+
+レジストリはプロセスごとに持ち、プロセス間で集計しない。api.server で複数のワーカーを起動した場合、
+/metrics はリクエストを受けたワーカーの値だけを返し、取得のたびに別のワーカーの値になりうる
+（カウンターが減ったように見えるため、rate() 等の結果が正しくならない）。
+正確な値が必要な場合は WEB_CONCURRENCY=1 のコンテナを並べて、コンテナごとに収集する。
+"""
+
+import abc
+import bisect
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+# /metrics のレスポンスのContent-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# レイテンシ計測用のデフォルトのバケット（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str]) -> str:
+    """
+    ラベルをPrometheusのテキスト形式に変換する（内部関数）。
+    """
+    pairs = []
+    for name, value in zip(labelnames, labelvalues, strict=True):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return ",".join(pairs)
+
+
+def _format_value(value: float) -> str:
+    """
+    数値をPrometheusのテキスト形式に変換する（内部関数）。
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Registry:
+    """
+    メトリクスを登録し、まとめてテキスト形式で出力するレジストリ。
+    """
+
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+
+    def register(self, metric: "Metric") -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric(abc.ABC):
+    """
+    メトリクスの基底クラス。ラベルの値の組み合わせごとに値を保持する。
+
+    サブクラスは値の作成（_new_value）とテキスト形式の出力（samples）を実装する。
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # ラベルの値のタプル -> (出力用のラベル文字列, 値)
+        self._children: Dict[Tuple[str, ...], Tuple[str, object]] = {}
+        if not self.labelnames:
+            # ラベルなしのメトリクスは記録前でも0として出力する
+            self._child(())
+        registry.register(self)
+
+    @abc.abstractmethod
+    def _new_value(self):
+        """
+        ラベルの値の組み合わせごとの値を作成する。
+        """
+
+    def _child(self, labelvalues: Tuple[str, ...]):
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = (_format_labels(self.labelnames, labelvalues), self._new_value())
+            self._children[labelvalues] = child
+        return child[1]
+
+    def labels(self, *labelvalues: str):
+        """
+        ラベルの値の組み合わせに対応する値を返す。
+
+        頻繁に記録する箇所では、戻り値を保持しておいて直接 inc / observe することで、記録のたびの検索を省ける。
+        """
+        return self._child(labelvalues)
+
+    def _series(self, labels: str, suffix: str = "") -> str:
+        return f"{self.name}{suffix}{{{labels}}}" if labels else f"{self.name}{suffix}"
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """
+        テキスト形式の行を返す（HELPとTYPEの行を除く）。
+        """
+
+
+class _NumberValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    """
+    単調増加するカウンター。
+    """
+
+    type = "counter"
+
+    def _new_value(self):
+        return _NumberValue()
+
+    def inc(self, amount: float = 1, labelvalues: Tuple[str, ...] = ()) -> None:
+        self._child(labelvalues).inc(amount)
+
+    def samples(self) -> List[str]:
+        return [f"{self._series(labels)} {_format_value(value.value)}" for labels, value in self._children.values()]
+
+
+class Gauge(Metric):
+    """
+    増減する値。functionを指定した場合は出力時にその戻り値を使う（ラベル付きの場合はラベルの値ごとの辞書）。
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Registry = REGISTRY,
+        function: Optional[Callable[[], Union[float, Dict[Tuple[str, ...], float]]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self._function = function
+
+    def _new_value(self):
+        return _NumberValue()
+
+    def set(self, value: float, labelvalues: Tuple[str, ...] = ()) -> None:
+        self._child(labelvalues).set(value)
+
+    def inc(self, amount: float = 1, labelvalues: Tuple[str, ...] = ()) -> None:
+        self._child(labelvalues).inc(amount)
+
+    def dec(self, amount: float = 1, labelvalues: Tuple[str, ...] = ()) -> None:
+        self._child(labelvalues).dec(amount)
+
+    def samples(self) -> List[str]:
+        if self._function is not None and self.labelnames:
+            # ラベル付きの場合、functionはラベルの値のタプル -> 値 の辞書を返す
+            return [
+                f"{self._series(_format_labels(self.labelnames, labelvalues))} {_format_value(value)}"
+                for labelvalues, value in self._function().items()
+            ]
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return [f"{self._series(labels)} {_format_value(value.value)}" for labels, value in self._children.values()]
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "bucket_counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # 最後の要素は+Infバケット
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, amount: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, amount)] += 1
+        self.count += 1
+        self.sum += amount
+
+
+class Histogram(Metric):
+    """
+    値の分布をバケットごとに数えるヒストグラム。
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Registry = REGISTRY,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, amount: float, labelvalues: Tuple[str, ...] = ()) -> None:
+        self._child(labelvalues).observe(amount)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, value in self._children.values():
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), value.bucket_counts, strict=True):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_value(bound)}"}} {cumulative}')
+            lines.append(f"{self._series(labels, '_sum')} {_format_value(value.sum)}")
+            lines.append(f"{self._series(labels, '_count')} {value.count}")
+        return lines
@@ -1,25 +1,56 @@
 from sqlalchemy import Column
+from sqlalchemy import Computed
 from sqlalchemy import Date
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import func
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 
 from api.db import Base
 
+# SQLiteではCURRENT_TIMESTAMPと同じ秒精度の書式で保存・比較する
+# （マイクロ秒付きの書式だと、キーセットページネーションで同じ日時の行を比較できないため）
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
 
 class Task(Base):
     __tablename__ = "tasks"
 
+    # INSERT/UPDATE時にサーバー側で設定される列（id, created_at, updated_at等）を
+    # RETURNINGで同じ文から取得する（RETURNING非対応のMySQLでは直後のSELECTで取得する）
+    __mapper_args__ = {"eager_defaults": True}
+
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(30), index=True, nullable=False)
     description = Column(String(255))
     due_date = Column(Date)
     status = Column(String(10))
     owner_id = Column(Integer, ForeignKey("users.id"))
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
+    # 楽観的排他制御用のバージョン。更新のたびに1増やし、If-Matchで指定されたバージョンと一致する場合のみ更新する
+    version = Column(Integer, server_default="1", nullable=False)
+
+    # 一覧の並び順キー（完了フラグ・期限なしを末尾にした期限）をインデックスで使えるよう永続化した生成列
+    is_done = Column(Integer, Computed("CASE WHEN status = 'Done' THEN 1 ELSE 0 END", persisted=True), nullable=False)
+    due_date_key = Column(Date, Computed("COALESCE(due_date, '9999-12-31')", persisted=True), nullable=False)
 
     owner = relationship("User", back_populates="tasks")
+
+    __table_args__ = (
+        # GET /tasks の並び順（ORDER BY is_done, due_date_key, created_at DESC, id）
+        Index("ix_tasks_list_order", is_done, due_date_key, created_at.desc(), id),
+        # GET /users/{owner_id}/tasks の絞り込みと並び順
+        Index("ix_tasks_owner_list_order", owner_id, is_done, due_date_key, created_at.desc(), id),
+        # GET /tasks/stats, GET /users/{id}/tasks/stats の集計（テーブルを読まずにインデックスだけで集計できる）
+        Index("ix_tasks_owner_stats", owner_id, status, due_date),
+        # GET /tasks?updated_since=... による差分の取得
+        Index("ix_tasks_updated_at", updated_at),
+    )
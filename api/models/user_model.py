@@ -11,6 +11,10 @@ from api.db import Base
 class User(Base):
     __tablename__ = "users"
 
+    # INSERT/UPDATE時にサーバー側で設定される列（id, created_at, updated_at等）を
+    # RETURNINGで同じ文から取得する（RETURNING非対応のMySQLでは直後のSELECTで取得する）
+    __mapper_args__ = {"eager_defaults": True}
+
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(30), unique=True, index=True, nullable=False)
     email = Column(String(80), unique=True, index=True, nullable=False)
@@ -18,5 +22,7 @@ class User(Base):
     last_name = Column(String(40))
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    # 楽観的排他制御用のバージョン。更新のたびに1増やし、If-Matchで指定されたバージョンと一致する場合のみ更新する
+    version = Column(Integer, server_default="1", nullable=False)
 
     tasks = relationship("Task", back_populates="owner")
@@ -0,0 +1,67 @@
+"""
+一覧APIのキーセット（カーソル）ページネーションを提供するモジュール。
+
+カーソルは最後に返した行の並び順キーをJSON配列にし、URLセーフなBase64でエンコードした
+不透明な文字列として扱う。OFFSETと異なり、どれだけ深いページでも取得コストは一定になる。
+"""
+
+import base64
+import json
+from datetime import date
+from typing import Any
+from typing import Callable
+from typing import Sequence
+from typing import Tuple
+
+# 1ページあたりの最大件数
+MAX_PAGE_SIZE = 1000
+
+# 次ページのカーソルを返すレスポンスヘッダー
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    """
+    JSONに変換できない値（日付・日時）をISO 8601形式の文字列に変換する（内部関数）。
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    並び順キーの値をカーソル文字列にエンコードする。
+
+    Args:
+        values: 並び順キーの値（日付・日時はISO 8601形式で保持する）
+
+    Returns:
+        URLセーフなBase64でエンコードしたカーソル文字列
+    """
+    raw = json.dumps(list(values), default=_encode_value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, parsers: Sequence[Callable[[Any], Any]]) -> Tuple[Any, ...]:
+    """
+    カーソル文字列をデコードし、並び順キーの値に復元する。
+
+    Args:
+        cursor: encode_cursorで生成したカーソル文字列
+        parsers: 並び順キーの各値を元の型に変換する関数のシーケンス
+
+    Returns:
+        並び順キーの値のタプル
+
+    Raises:
+        ValueError: カーソルの形式が不正な場合
+    """
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("Invalid cursor")
+        return tuple(parse(value) for parse, value in zip(parsers, values, strict=True))
+    except (TypeError, ValueError) as error:
+        raise ValueError("Invalid cursor") from error
@@ -0,0 +1,252 @@
+"""
+読み取り専用のリクエストをレプリカに振り分けるモジュール。
+
+GETのエンドポイントは get_read_db / get_read_target（api.db）からレプリカのセッションを受け取り、
+更新系のエンドポイントは従来どおりプライマリのセッションを使う。
+読み取り先はリクエストごとに一度だけ選び（ReadTarget）、同じリクエストの中では同じレプリカから読み出す。
+
+- 読み取り後の書き込みの一貫性（read-your-writes）: 更新に成功したクライアントにはCookieを発行し、
+  有効期間中はそのクライアントの読み取りをプライマリに向ける（レプリカの遅延で更新前の値が返らないようにする）
+- 障害のあるレプリカの切り離し: 接続エラーが発生したレプリカは一定時間振り分け先から外し、
+  その間はほかのレプリカまたはプライマリから読み出す
+- レプリカから読み出した値はキャッシュに保存しない（キャッシュがプライマリより古い値にならないようにする）
+
+対応する環境変数:
+- DB_REPLICA_STICKY_SECONDS: 更新後にプライマリから読み出す秒数（デフォルト: 5）
+- DB_REPLICA_EJECT_SECONDS: 接続エラーが発生したレプリカを振り分け先から外す秒数（デフォルト: 30）
+"""
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from decouple import config
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import InterfaceError
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from api.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# 更新後にプライマリから読み出す期限（UNIX時刻）を保持するCookie
+STICKY_COOKIE = "db_primary_until"
+
+# レプリカのセッションの Session.info に設定するキー
+REPLICA_INFO_KEY = "replica"
+
+# 更新系のHTTPメソッド
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+
+REPLICA_EJECTIONS = Counter(
+    "db_replica_ejections_total", "Number of times a replica was ejected after a connection error.", ("replica",)
+)
+REPLICA_READS = Counter("db_replica_reads_total", "Number of read sessions by target.", ("target",))
+
+
+def is_replica_session(db: AsyncSession) -> bool:
+    """
+    レプリカのセッションかを判定する。
+    """
+    return db.info.get(REPLICA_INFO_KEY, False)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    レプリカを切り離すべき接続エラーかを判定する。
+    """
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+    # ドライバーによっては接続の失敗がOSError（ConnectionRefusedError, TimeoutError等）のまま送出される
+    return isinstance(error, OSError)
+
+
+def prefers_primary(connection: HTTPConnection) -> bool:
+    """
+    直前に更新したクライアントのリクエストで、プライマリから読み出すべきかを判定する。
+    """
+    value = connection.cookies.get(STICKY_COOKIE)
+    if value is None:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+class Replica:
+    """
+    1つのレプリカ。切り離されている場合は ejected_until に再び振り分ける時刻を保持する。
+    """
+
+    __slots__ = ("name", "session_factory", "ejected_until")
+
+    def __init__(self, name: str, session_factory):
+        self.name = name
+        self.session_factory = session_factory
+        self.ejected_until = 0.0
+
+
+class ReplicaSet:
+    """
+    レプリカの集合。切り離されていないレプリカにラウンドロビンで振り分ける。
+    """
+
+    def __init__(self, replicas: Sequence[Tuple[str, object]], eject_seconds: float):
+        self.replicas: List[Replica] = [Replica(name, session_factory) for name, session_factory in replicas]
+        self.eject_seconds = eject_seconds
+        self._next = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """
+        次に使うレプリカを返す。すべて切り離されている場合はNone。
+        """
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.ejected_until <= now:
+                return replica
+        return None
+
+    def eject(self, replica: Replica, error: BaseException) -> None:
+        """
+        レプリカを eject_seconds 秒間、振り分け先から外す。
+        """
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        REPLICA_EJECTIONS.inc(labelvalues=(replica.name,))
+        logger.warning(
+            "Ejected database replica after a connection error",
+            extra={"replica": replica.name, "eject_seconds": self.eject_seconds, "error": repr(error)},
+        )
+
+    def read_target(self, primary_session_factory, prefer_primary: bool = False) -> "ReadTarget":
+        """
+        1つのリクエストの読み取り先を選ぶ。
+
+        Args:
+            primary_session_factory: プライマリのセッションファクトリ
+            prefer_primary: プライマリから読み出す場合はTrue
+
+        Returns:
+            読み取り先（使えるレプリカがない場合はプライマリ）
+        """
+        replica = None if prefer_primary or not self.replicas else self.choose()
+        return ReadTarget(primary_session_factory, replica=replica, replica_set=self)
+
+
+class ReadTarget:
+    """
+    1つのリクエストの読み取り先。
+
+    セッションは session() で必要になった時点で開くため、ストリーミングのレスポンスのように
+    session_factory() だけを使うリクエストでは余分な接続を開かない。
+    読み取りの件数（REPLICA_READS）は、どちらを使った場合も1リクエストにつき1回だけ記録する。
+    """
+
+    def __init__(self, primary_session_factory, replica: Optional[Replica] = None, replica_set=None):
+        self.primary_session_factory = primary_session_factory
+        self.replica = replica
+        # レプリカが設定されていない場合はNone（読み取りの件数も記録しない）
+        self.replica_set: Optional[ReplicaSet] = replica_set
+        self._recorded = False
+
+    def _record(self) -> None:
+        if self.replica_set and not self._recorded:
+            self._recorded = True
+            REPLICA_READS.inc(labelvalues=(self.replica.name if self.replica is not None else "primary",))
+
+    def session_factory(self):
+        """
+        読み取り用のセッションファクトリを返す（ストリーミング用、セッションは呼び出し側でクローズする）。
+        """
+        self._record()
+        return self.replica.session_factory if self.replica is not None else self.primary_session_factory
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """
+        読み取り用のセッションを開く。
+
+        レプリカに接続できない場合は、そのレプリカを切り離してプライマリのセッションを返す。
+        セッションの使用中に接続エラーが発生した場合も、そのレプリカを切り離してから例外を送出する。
+        """
+        session = None
+        if self.replica is not None:
+            session = self.replica.session_factory()
+            try:
+                # 接続できないレプリカは、リクエストの処理を始める前に検出してプライマリに切り替える
+                await session.connection()
+            except Exception as error:
+                await session.close()
+                if not is_connection_error(error):
+                    raise
+                self.replica_set.eject(self.replica, error)
+                self.replica = session = None
+        if session is None:
+            session = self.primary_session_factory()
+        self._record()
+
+        replica = self.replica
+        try:
+            yield session
+        except Exception as error:
+            if replica is not None and is_connection_error(error):
+                self.replica_set.eject(replica, error)
+            raise
+        finally:
+            await session.close()
+
+
+class ReadYourWritesMiddleware:
+    """
+    更新系のリクエストが成功した場合に、一定時間プライマリから読み出すためのCookieを発行するASGIミドルウェア。
+    """
+
+    def __init__(self, app: ASGIApp, sticky_seconds: float):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{STICKY_COOKIE}={time.time() + self.sticky_seconds:.3f}; "
+                    f"Max-Age={int(self.sticky_seconds) or 1}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def get_replica_eject_seconds() -> float:
+    return config("DB_REPLICA_EJECT_SECONDS", default=30, cast=float)
+
+
+def add_read_your_writes_middleware(app, replica_set: ReplicaSet):
+    # レプリカがない場合はすべてプライマリから読み出すため、Cookieは発行しない
+    sticky_seconds = config("DB_REPLICA_STICKY_SECONDS", default=5, cast=float)
+    if replica_set and sticky_seconds > 0:
+        app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=sticky_seconds)
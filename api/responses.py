@@ -0,0 +1,81 @@
+"""
+アプリケーション全体で使うJSONのエンコーダーとレスポンスクラスを提供するモジュール。
+
+標準ライブラリのjsonの代わりに、orjson（インストールされている場合）またはpydantic_coreでJSONに変換する。
+どちらも日付・日時・Enumをそのまま変換でき、出力は標準のJSONResponseと同じバイト列になる。
+
+対応する環境変数:
+- JSON_ENCODER: auto（デフォルト、orjsonがあればorjson、なければpydantic）、orjson、pydantic、json（標準ライブラリ）
+"""
+
+import json
+from typing import Any
+from typing import Callable
+
+from decouple import config
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:
+    # orjsonは任意の依存パッケージ
+    orjson = None
+
+
+def _json_default(value: Any) -> Any:
+    # 日付・日時・Enumはpydanticと同じ形式に変換する
+    return json.loads(to_json(value))
+
+
+def _dumps_json(content: Any) -> bytes:
+    # starlette.responses.JSONResponse.render と同じ設定
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_json_default
+    ).encode()
+
+
+def _dumps_orjson(content: Any) -> bytes:
+    # UTCの日時はpydanticと同じく末尾をZにする
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def _dumps_pydantic(content: Any) -> bytes:
+    return to_json(content)
+
+
+def get_encoder() -> Callable[[Any], bytes]:
+    """
+    環境変数の設定に応じたJSONのエンコーダーを取得する。
+
+    Returns:
+        値をJSONのバイト列に変換する関数
+
+    Raises:
+        ValueError: JSON_ENCODERに不正な値が設定されている場合、またはorjsonがインストールされていない場合
+    """
+    encoder = config("JSON_ENCODER", default="auto").lower()
+    if encoder == "auto":
+        return _dumps_orjson if orjson is not None else _dumps_pydantic
+    if encoder == "orjson":
+        if orjson is None:
+            raise ValueError("JSON_ENCODER=orjson requires the orjson package to be installed")
+        return _dumps_orjson
+    if encoder == "pydantic":
+        return _dumps_pydantic
+    if encoder == "json":
+        return _dumps_json
+    raise ValueError(f"Invalid JSON_ENCODER value: {encoder}. Use 'auto', 'orjson', 'pydantic' or 'json'.")
+
+
+# アプリケーション全体で使うJSONのエンコーダー
+dumps = get_encoder()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    設定されたエンコーダーでJSONに変換するレスポンスクラス。FastAPIの default_response_class に指定する。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi import Response
+
+from api.metrics import CONTENT_TYPE
+from api.metrics import REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # リクエストを受けたワーカーのプロセスの値だけを返す（api.metrics を参照）
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
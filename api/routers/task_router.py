@@ -1,17 +1,147 @@
+from datetime import date
+from datetime import datetime
+from typing import Any
 from typing import List
 from typing import Optional
 
 from fastapi import APIRouter
+from fastapi import Body
 from fastapi import Depends
+from fastapi import Header
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Request
+from fastapi import Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import api.cruds.task_crud as task_crud
+import api.cruds.user_crud as user_crud
 import api.schemas.task_schema as task_schema
 from api.db import get_db
+from api.db import get_read_db
+from api.db import get_read_target
+from api.etag import ETAG_HEADER
+from api.etag import etag_matches
+from api.etag import make_etag
+from api.etag import make_resource_etag
+from api.etag import not_modified
+from api.etag import parse_if_match
+from api.fields import fields_response
+from api.fields import json_list_response
+from api.fields import json_response
+from api.fields import parse_expand
+from api.fields import parse_fields
+from api.fields import response_fields
+from api.fields import serialize_fields
+from api.pagination import MAX_PAGE_SIZE
+from api.pagination import NEXT_CURSOR_HEADER
+from api.pagination import decode_cursor
+from api.pagination import encode_cursor
+from api.replica import ReadTarget
+from api.streaming import STREAM_BATCH_SIZE
+from api.streaming import accepts_ndjson
+from api.streaming import stream_rows
 
 router = APIRouter()
 
+# 一覧のレスポンスに含める項目（response_modelはOpenAPIのスキーマにのみ使い、出力時の検証は行わない）
+TASK_RESPONSE_FIELDS = response_fields(task_schema.TaskResponse)
+
+# 一括作成で1リクエストに指定できる最大件数と、1回のINSERTにまとめる件数
+MAX_BULK_SIZE = 5000
+BULK_CHUNK_SIZE = 500
+
+
+def _parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, task_crud.CURSOR_PARSERS)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from error
+
+
+def _parse_fields(fields: Optional[str]):
+    try:
+        return parse_fields(fields, task_schema.TaskResponse)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+
+
+def _parse_expand(expand: Optional[str], field_names):
+    try:
+        names = parse_expand(expand, task_crud.EXPANDABLE)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+    if names and field_names is not None:
+        raise HTTPException(status_code=400, detail="fields cannot be combined with expand")
+    return names
+
+
+def _fetch_limit(limit: Optional[int]):
+    # 次ページの有無を判定するため1件多く取得する
+    return limit + 1 if limit is not None else None
+
+
+def _get_task_filter(
+    status: Optional[List[task_schema.Status]] = Query(None),
+    due_before: Optional[date] = Query(None),
+    due_after: Optional[date] = Query(None),
+    overdue: Optional[bool] = Query(None),
+    updated_since: Optional[datetime] = Query(None),
+) -> task_schema.TaskFilter:
+    # 一覧APIに共通の絞り込み条件（statusは複数指定可）
+    return task_schema.TaskFilter(
+        status=status, due_before=due_before, due_after=due_after, overdue=overdue, updated_since=updated_since
+    )
+
+
+def _serialize_task(task) -> bytes:
+    # レスポンスモデルでの検証を経由せずに、全項目をそのままJSONへ変換する
+    return serialize_fields(task, TASK_RESPONSE_FIELDS)
+
+
+def _serialize_task_with_owner(task) -> bytes:
+    return task_schema.TaskWithOwnerResponse.model_validate(task, from_attributes=True).model_dump_json().encode()
+
+
+def _serializer(field_names, expand):
+    if field_names is not None:
+        return lambda row: serialize_fields(row, field_names)
+    if expand:
+        return _serialize_task_with_owner
+    return _serialize_task
+
+
+def _list_response(response: Response, tasks, field_names, expand):
+    # FastAPIによるresponse_modelへの変換と検証を経由せずに、行から直接JSONへ変換する
+    return json_list_response(map(_serializer(field_names, expand), tasks), headers=response.headers)
+
+
+async def _list_etag(
+    db: AsyncSession, request: Request, task_filter: task_schema.TaskFilter, expand, paged: bool
+) -> Optional[str]:
+    # 件数と最大の更新日時が変わっていなければ、行を読み出さずに304を返せる
+    if paged:
+        # ページ単位の一覧にはETagを付けない
+        # （集計は条件に合う全件を走査するため、ページの読み出しが一定のコストでなくなる）
+        return None
+    fingerprint = await task_crud.get_fingerprint(db=db, task_filter=task_filter)
+    if expand:
+        # 埋め込んだ所有者の変更も一覧の変更として扱う
+        fingerprint += await user_crud.get_fingerprint(db=db)
+    return make_etag(*fingerprint, request.url.query)
+
+
+def _set_next_cursor(response: Response, tasks, limit: Optional[int]):
+    if limit is None or len(tasks) <= limit:
+        return tasks
+    tasks = tasks[:limit]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(task_crud.get_sort_key(tasks[-1]))
+    return tasks
+
 
 @router.post("/tasks", response_model=task_schema.TaskResponse, status_code=201)
 async def create_task(body: task_schema.TaskCreate, db: AsyncSession = Depends(get_db)):
@@ -19,40 +149,204 @@ async def create_task(body: task_schema.TaskCreate, db: AsyncSession = Depends(g
     return task
 
 
+@router.post(
+    "/tasks/bulk",
+    response_model=task_schema.TaskBulkResponse,
+    status_code=201,
+    # 要素はエンドポイント内で1件ずつ検証するため、OpenAPIの要素の型はTaskCreateとして明示する
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": {"items": {"$ref": "#/components/schemas/TaskCreate"}}}}
+        }
+    },
+)
+async def create_tasks_bulk(
+    body: List[Any] = Body(..., min_length=1, max_length=MAX_BULK_SIZE),
+    partial: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+):
+    # 要素ごとに検証し、partial=true の場合は不正な要素を除いて作成する
+    task_creates = []
+    errors = []
+    for index, item in enumerate(body):
+        try:
+            task_creates.append(task_schema.TaskCreate.model_validate(item))
+        except ValidationError as error:
+            errors.append(task_schema.TaskBulkError(index=index, detail=error.errors(include_url=False)))
+    if errors and not partial:
+        raise RequestValidationError(
+            [{**detail, "loc": ("body", error.index, *detail["loc"])} for error in errors for detail in error.detail]
+        )
+
+    tasks = await task_crud.create_bulk(db=db, task_creates=task_creates, chunk_size=BULK_CHUNK_SIZE)
+    return task_schema.TaskBulkResponse(
+        created=[task_schema.TaskResponse.model_validate(task, from_attributes=True) for task in tasks],
+        errors=errors,
+    )
+
+
+@router.get("/tasks/stats", response_model=List[task_schema.TaskStats], response_model_exclude_unset=True)
+async def get_task_stats(
+    owner_id: Optional[int] = Query(None),
+    task_filter: task_schema.TaskFilter = Depends(_get_task_filter),
+    group_by: Optional[task_schema.TaskStatsGroupBy] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # 行を返さずに件数だけを返す（group_by=owner の場合は所有者ごと）
+    task_filter.owner_id = owner_id
+    stats = await task_crud.get_stats(db=db, task_filter=task_filter, group_by=group_by)
+    return [task_schema.TaskStats(**values) for values in stats]
+
+
 @router.get("/tasks/{id}", response_model=Optional[task_schema.TaskResponse])
-async def get_task_by_id(id: int, db: AsyncSession = Depends(get_db)):
-    task = await task_crud.get(db=db, id=id)
+async def get_task_by_id(
+    id: int,
+    response: Response,
+    fields: Optional[str] = Query(None),
+    expand: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    field_names = _parse_fields(fields)
+    expand_names = _parse_expand(expand, field_names)
+    if if_none_match is not None and not expand_names:
+        # 行全体を読み出さずにバージョンだけでETagを比較する
+        version = await task_crud.get_version(db=db, id=id)
+        if version is not None and etag_matches(if_none_match, make_resource_etag(id, version)):
+            return not_modified(make_resource_etag(id, version))
+
+    task = await task_crud.get(db=db, id=id, expand=expand_names)
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    etag = make_resource_etag(task.id, task.version)
+    if expand_names:
+        # 埋め込んだ所有者が更新された場合もETagを変える
+        owner = task.owner
+        etag = make_etag(etag, *((owner.id, owner.version) if owner is not None else ()))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    response.headers[ETAG_HEADER] = etag
+
+    if field_names is not None:
+        return fields_response(task, field_names, headers=response.headers)
+    if expand_names:
+        return json_response(_serialize_task_with_owner(task), headers=response.headers)
     return task
 
 
 @router.get("/tasks", response_model=List[task_schema.TaskResponse], response_model_exclude_unset=True)
-async def get_all_tasks(db: AsyncSession = Depends(get_db)):
-    tasks = await task_crud.get_all(db=db)
-    return tasks
+async def get_all_tasks(
+    request: Request,
+    response: Response,
+    owner_id: Optional[int] = Query(None),
+    task_filter: task_schema.TaskFilter = Depends(_get_task_filter),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    expand: Optional[str] = Query(None),
+    stream: bool = Query(False),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    target: ReadTarget = Depends(get_read_target),
+):
+    task_filter.owner_id = owner_id
+    field_names = _parse_fields(fields)
+    expand_names = _parse_expand(expand, field_names)
+    if stream:
+        # 全件をサーバーサイドカーソルから読み出しながら返す（Accept: application/x-ndjson ならNDJSON）
+        if limit is not None or cursor is not None:
+            raise HTTPException(status_code=400, detail="stream cannot be combined with limit or cursor")
+        return stream_rows(
+            target.session_factory(),
+            lambda db: task_crud.stream_all(
+                db=db, yield_per=STREAM_BATCH_SIZE, task_filter=task_filter, fields=field_names, expand=expand_names
+            ),
+            _serializer(field_names, expand_names),
+            ndjson=accepts_ndjson(accept),
+        )
+
+    async with target.session() as db:
+        etag = await _list_etag(db, request, task_filter, expand_names, paged=limit is not None or cursor is not None)
+        if etag is not None:
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+            response.headers[ETAG_HEADER] = etag
+
+        tasks = await task_crud.get_all(
+            db=db,
+            limit=_fetch_limit(limit),
+            after=_parse_cursor(cursor),
+            task_filter=task_filter,
+            fields=field_names,
+            expand=expand_names,
+        )
+    return _list_response(response, _set_next_cursor(response, tasks, limit), field_names, expand_names)
 
 
 @router.get("/users/{owner_id}/tasks", response_model=List[task_schema.TaskResponse], response_model_exclude_unset=True)
-async def get_all_tasks_by_owner(owner_id: int, db: AsyncSession = Depends(get_db)):
-    tasks = await task_crud.get_all_by_owner(db=db, owner_id=owner_id)
-    return tasks
+async def get_all_tasks_by_owner(
+    owner_id: int,
+    request: Request,
+    response: Response,
+    task_filter: task_schema.TaskFilter = Depends(_get_task_filter),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    expand: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    task_filter.owner_id = owner_id
+    field_names = _parse_fields(fields)
+    expand_names = _parse_expand(expand, field_names)
+    etag = await _list_etag(db, request, task_filter, expand_names, paged=limit is not None or cursor is not None)
+    if etag is not None:
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers[ETAG_HEADER] = etag
+
+    tasks = await task_crud.get_all(
+        db=db,
+        limit=_fetch_limit(limit),
+        after=_parse_cursor(cursor),
+        task_filter=task_filter,
+        fields=field_names,
+        expand=expand_names,
+    )
+    return _list_response(response, _set_next_cursor(response, tasks, limit), field_names, expand_names)
+
+
+@router.get("/users/{owner_id}/tasks/stats", response_model=task_schema.TaskStats)
+async def get_task_stats_by_owner(
+    owner_id: int,
+    task_filter: task_schema.TaskFilter = Depends(_get_task_filter),
+    db: AsyncSession = Depends(get_read_db),
+):
+    task_filter.owner_id = owner_id
+    stats = await task_crud.get_owner_stats(db=db, task_filter=task_filter)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return task_schema.TaskStats(owner_id=owner_id, **stats)
 
 
 @router.patch("/tasks/{id}", response_model=task_schema.TaskResponse)
-async def update_task(id: int, body: task_schema.TaskUpdate, db: AsyncSession = Depends(get_db)):
-    task = await task_crud.get(db=db, id=id)
+async def update_task(
+    id: int,
+    body: task_schema.TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    # If-Matchが指定された場合は、そのETagのバージョンから変更されていない場合のみ更新する（不一致は412）
+    task = await task_crud.update(db=db, id=id, task_update=body, versions=parse_if_match(if_match, id))
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    updated_task = await task_crud.update(db=db, task_update=body, task=task)
-    return updated_task
+    response.headers[ETAG_HEADER] = make_resource_etag(task.id, task.version)
+    return task
 
 
 @router.delete("/tasks/{id}", status_code=204)
 async def delete_task(id: int, db: AsyncSession = Depends(get_db)):
-    task = await task_crud.get(db=db, id=id)
-    if task is None:
+    deleted = await task_crud.delete(db=db, id=id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    await task_crud.delete(db=db, task=task)
@@ -3,15 +3,88 @@ from typing import Optional
 
 from fastapi import APIRouter
 from fastapi import Depends
+from fastapi import Header
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Request
+from fastapi import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import api.cruds.task_crud as task_crud
 import api.cruds.user_crud as user_crud
 import api.schemas.user_schema as user_schema
 from api.db import get_db
+from api.db import get_read_db
+from api.db import get_read_target
+from api.etag import ETAG_HEADER
+from api.etag import etag_matches
+from api.etag import make_etag
+from api.etag import make_resource_etag
+from api.etag import not_modified
+from api.etag import parse_if_match
+from api.fields import json_list_response
+from api.fields import json_response
+from api.fields import parse_expand
+from api.fields import parse_fields
+from api.fields import response_fields
+from api.fields import serialize_fields
+from api.replica import ReadTarget
+from api.streaming import STREAM_BATCH_SIZE
+from api.streaming import accepts_ndjson
+from api.streaming import stream_rows
 
 router = APIRouter()
 
+# 一覧のレスポンスに含める項目（response_modelはOpenAPIのスキーマにのみ使い、出力時の検証は行わない）
+USER_RESPONSE_FIELDS = response_fields(user_schema.UserResponse)
+
+
+def _parse_fields(fields: Optional[str]):
+    try:
+        return parse_fields(fields, user_schema.UserResponse)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+
+
+def _parse_expand(expand: Optional[str], field_names):
+    try:
+        names = parse_expand(expand, user_crud.EXPANDABLE)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+    if names and field_names is not None:
+        raise HTTPException(status_code=400, detail="fields cannot be combined with expand")
+    return names
+
+
+def _serialize_user(user) -> bytes:
+    # レスポンスモデルでの検証を経由せずに、全項目をそのままJSONへ変換する
+    return serialize_fields(user, USER_RESPONSE_FIELDS)
+
+
+def _serialize_user_with_tasks(user) -> bytes:
+    return user_schema.UserWithTasksResponse.model_validate(user, from_attributes=True).model_dump_json().encode()
+
+
+def _serializer(field_names, expand):
+    if field_names is not None:
+        return lambda row: serialize_fields(row, field_names)
+    if expand:
+        return _serialize_user_with_tasks
+    return _serialize_user
+
+
+def _expanded_etag(user) -> str:
+    # 埋め込んだタスクが追加・更新・削除された場合もETagを変える
+    return make_etag(
+        make_resource_etag(user.id, user.version), *(make_resource_etag(task.id, task.version) for task in user.tasks)
+    )
+
+
+def _user_response(response: Response, user, field_names, expand):
+    if field_names is None and not expand:
+        return user
+    return json_response(_serializer(field_names, expand)(user), headers=response.headers)
+
 
 @router.post("/users", response_model=user_schema.UserResponse, status_code=201)
 async def create_user(body: user_schema.UserCreate, db: AsyncSession = Depends(get_db)):
@@ -20,41 +93,112 @@ async def create_user(body: user_schema.UserCreate, db: AsyncSession = Depends(g
 
 
 @router.get("/users/{id}", response_model=Optional[user_schema.UserResponse])
-async def get_user_by_id(id: int, db: AsyncSession = Depends(get_db)):
-    user = await user_crud.get(db=db, id=id)
+async def get_user_by_id(
+    id: int,
+    response: Response,
+    fields: Optional[str] = Query(None),
+    expand: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    field_names = _parse_fields(fields)
+    expand_names = _parse_expand(expand, field_names)
+    if if_none_match is not None and not expand_names:
+        # 行全体を読み出さずにバージョンだけでETagを比較する
+        version = await user_crud.get_version(db=db, id=id)
+        if version is not None and etag_matches(if_none_match, make_resource_etag(id, version)):
+            return not_modified(make_resource_etag(id, version))
+
+    user = await user_crud.get(db=db, id=id, expand=expand_names)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    etag = _expanded_etag(user) if expand_names else make_resource_etag(user.id, user.version)
+    if expand_names and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers[ETAG_HEADER] = etag
+    return _user_response(response, user, field_names, expand_names)
 
 
 @router.get("/users/username/{username}", response_model=Optional[user_schema.UserResponse])
-async def get_user_by_username(username: str, db: AsyncSession = Depends(get_db)):
-    user = await user_crud.get_by_username(db=db, username=username)
+async def get_user_by_username(
+    username: str,
+    response: Response,
+    fields: Optional[str] = Query(None),
+    expand: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    field_names = _parse_fields(fields)
+    expand_names = _parse_expand(expand, field_names)
+    user = await user_crud.get_by_username(db=db, username=username, expand=expand_names)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    etag = _expanded_etag(user) if expand_names else make_resource_etag(user.id, user.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers[ETAG_HEADER] = etag
+    return _user_response(response, user, field_names, expand_names)
 
 
 @router.get("/users", response_model=List[user_schema.UserResponse], response_model_exclude_unset=True)
-async def get_all_users(db: AsyncSession = Depends(get_db)):
-    users = await user_crud.get_all(db=db)
-    return users
+async def get_all_users(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None),
+    expand: Optional[str] = Query(None),
+    stream: bool = Query(False),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    target: ReadTarget = Depends(get_read_target),
+):
+    field_names = _parse_fields(fields)
+    expand_names = _parse_expand(expand, field_names)
+    if stream:
+        # 全件をサーバーサイドカーソルから読み出しながら返す（Accept: application/x-ndjson ならNDJSON）
+        return stream_rows(
+            target.session_factory(),
+            lambda db: user_crud.stream_all(
+                db=db, yield_per=STREAM_BATCH_SIZE, fields=field_names, expand=expand_names
+            ),
+            _serializer(field_names, expand_names),
+            ndjson=accepts_ndjson(accept),
+        )
+
+    async with target.session() as db:
+        # 件数と最大の更新日時が変わっていなければ、行を読み出さずに304を返す
+        # （ページ分割のない一覧で、応答自体が全件を読み出すため、集計を常に実行しても読み出しのコストの桁は変わらない）
+        fingerprint = await user_crud.get_fingerprint(db=db)
+        if expand_names:
+            # 埋め込んだタスクの変更も一覧の変更として扱う
+            fingerprint += await task_crud.get_fingerprint(db=db)
+        etag = make_etag(*fingerprint, request.url.query)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers[ETAG_HEADER] = etag
+
+        users = await user_crud.get_all(db=db, fields=field_names, expand=expand_names)
+    # FastAPIによるresponse_modelへの変換と検証を経由せずに、行から直接JSONへ変換する
+    return json_list_response(map(_serializer(field_names, expand_names), users), headers=response.headers)
 
 
 @router.patch("/users/{id}", response_model=user_schema.UserResponse)
-async def update_user(id: int, body: user_schema.UserUpdate, db: AsyncSession = Depends(get_db)):
-    user = await user_crud.get(db=db, id=id)
+async def update_user(
+    id: int,
+    body: user_schema.UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    # If-Matchが指定された場合は、そのETagのバージョンから変更されていない場合のみ更新する（不一致は412）
+    user = await user_crud.update(db=db, id=id, user_update=body, versions=parse_if_match(if_match, id))
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-
-    updated_user = await user_crud.update(db=db, user_update=body, user=user)
-    return updated_user
+    response.headers[ETAG_HEADER] = make_resource_etag(user.id, user.version)
+    return user
 
 
 @router.delete("/users/{id}", status_code=204)
 async def delete_user(id: int, db: AsyncSession = Depends(get_db)):
-    user = await user_crud.get(db=db, id=id)
-    if user is None:
+    deleted = await user_crud.delete(db=db, id=id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="User not found")
-
-    await user_crud.delete(db=db, user=user)
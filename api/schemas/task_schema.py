@@ -1,6 +1,9 @@
 from datetime import date
 from datetime import datetime
 from enum import Enum
+from typing import Any
+from typing import Dict
+from typing import List
 from typing import Optional
 
 from pydantic import BaseModel
@@ -38,6 +41,54 @@ class TaskResponse(TaskBase):
     id: Optional[int] = Field(None)
     created_at: Optional[datetime] = Field(None)
     updated_at: Optional[datetime] = Field(None)
+    version: Optional[int] = Field(None)
+
+
+class TaskOwnerResponse(BaseModel):
+    # expand=owner で埋め込む所有者（user_schemaがtask_schemaを参照するため、ここで定義する）
+    id: int
+    username: str
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+
+
+class TaskWithOwnerResponse(TaskResponse):
+    owner: Optional[TaskOwnerResponse] = Field(None)
+
+
+class TaskFilter(BaseModel):
+    # 一覧の絞り込み条件（指定されていない条件は絞り込まない）
+    status: Optional[List[Status]] = None
+    due_before: Optional[date] = None
+    due_after: Optional[date] = None
+    owner_id: Optional[int] = None
+    overdue: Optional[bool] = None
+    updated_since: Optional[datetime] = None
+
+
+class TaskStatsGroupBy(str, Enum):
+    OWNER = "owner"
+
+
+class TaskStats(BaseModel):
+    # 集計単位（group_by=owner の場合の所有者ID）
+    owner_id: Optional[int] = Field(None)
+    total: int
+    todo: int
+    doing: int
+    done: int
+    overdue: int
+
+
+class TaskBulkError(BaseModel):
+    index: int
+    detail: List[Dict[str, Any]]
+
+
+class TaskBulkResponse(BaseModel):
+    created: List[TaskResponse]
+    errors: List[TaskBulkError] = Field([])
 
 
 class Task(TaskBase):
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List
 from typing import Optional
 
 from pydantic import BaseModel
@@ -6,6 +7,8 @@ from pydantic import ConfigDict
 from pydantic import EmailStr
 from pydantic import Field
 
+import api.schemas.task_schema as task_schema
+
 
 class UserBase(BaseModel):
     username: str = Field(..., max_length=30, min_length=3)
@@ -29,6 +32,11 @@ class UserResponse(UserBase):
     id: Optional[int] = Field(None)
     created_at: Optional[datetime] = Field(None)
     updated_at: Optional[datetime] = Field(None)
+    version: Optional[int] = Field(None)
+
+
+class UserWithTasksResponse(UserResponse):
+    tasks: List[task_schema.TaskResponse] = Field([])
 
 
 class User(UserBase):
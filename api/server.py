@@ -0,0 +1,320 @@
+"""
+本番環境用のサーバーを起動するモジュール。
+
+uvicornのワーカーを複数プロセス起動し、1つのソケットを共有して接続を受け付ける。
+uvloopとhttptoolsがインストールされていれば、イベントループとHTTPパーサーにそれらを使う。
+
+シグナル:
+- SIGTERM / SIGINT: 各ワーカーが新しい接続の受け付けを止め、処理中のリクエストの完了を待ってから終了する
+- SIGHUP: ワーカーを1つずつ入れ替える（新しいワーカーを起動してから古いワーカーを同じ手順で終了する）。
+  ソケットは親プロセスが保持し続けるため、入れ替え中に届いた接続は起動済みのワーカーが受け付ける
+
+対応する環境変数:
+- PORT: 待ち受けるポート番号（デフォルト: 8000）
+- SERVER_HOST: 待ち受けるアドレス（デフォルト: 0.0.0.0）
+- WEB_CONCURRENCY: ワーカー数（デフォルト: auto、利用できるCPUコア数。cgroupのCPUクォータがあればその値までに抑える）
+- SERVER_LOOP: イベントループ、auto（uvloopがあればuvloop）、uvloop、asyncio（デフォルト: auto）
+- SERVER_HTTP: HTTPパーサー、auto（httptoolsがあればhttptools）、httptools、h11（デフォルト: auto）
+- SERVER_KEEP_ALIVE: Keep-Aliveの接続を維持する秒数（デフォルト: 5）
+- SERVER_BACKLOG: 受け付け待ちの接続のキューの長さ（デフォルト: 2048）
+- SERVER_LIMIT_CONCURRENCY: ワーカーごとの同時接続数の上限、超えた場合は503を返す（デフォルト: 上限なし）
+- SERVER_GRACEFUL_TIMEOUT: 終了時に処理中のリクエストの完了を待つ最大秒数（デフォルト: 30）
+- SERVER_MAX_WORKER_RESTARTS: SERVER_WORKER_RESTART_WINDOW 秒の間に異常終了したワーカーを起動し直す回数の上限。
+  超えた場合は起動に失敗し続けているとみなし、親プロセスも終了する（デフォルト: 5）
+- SERVER_WORKER_RESTART_WINDOW: 異常終了の回数を数える期間の秒数（デフォルト: 60）
+
+異常終了したワーカーは、直近の異常終了の回数に応じて待つ時間を延ばしてから起動し直す（0.5秒から倍々で最大30秒）。
+環境変数の不足やimportの失敗のように起動時に必ず失敗する場合は、再起動を繰り返さずに終了コード1で終了する。
+
+ワーカーはそれぞれ独立したプロセスのため、プロセス内の状態はワーカーごとに持つ:
+- 接続プール: プライマリとレプリカのそれぞれに、ワーカー数 ×（DB_POOL_SIZE + DB_MAX_OVERFLOW）まで接続する
+  （合計は ワーカー数 ×（DB_POOL_SIZE + DB_MAX_OVERFLOW）×（1 + レプリカ数））。
+  PgBouncer等の接続プーラーを経由する場合（DB_POOL_MODE=external）は、プーラーの設定で上限が決まる
+- キャッシュ: CACHE_BACKEND=memory のLRUキャッシュはワーカーごとで、ほかのワーカーの更新では無効化されない
+  （TTLの間は古い値を返しうる。ワーカー間で共有する場合は CACHE_BACKEND=redis を使う）
+- メトリクス: /metrics はリクエストを受けたワーカーの値だけを返す（api.metrics を参照）
+
+スーパーバイザーはuvicornの Multiprocess を拡張しており、公開されていない uvicorn._subprocess.get_subprocess を使う。
+uvicorn 0.29 の Multiprocess にはSIGHUPでの入れ替えと異常終了したワーカーの再起動がないためで、
+パッチバージョンでも内部の実装が変わると動かなくなるため、pyproject.toml でuvicornのバージョンを完全に固定している。
+
+実行方法:
+    $ python -m api.server
+"""
+
+import logging
+import math
+import os
+import signal
+import sys
+import time
+from collections import deque
+from typing import Deque
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+import uvicorn
+from decouple import config
+
+# 公開されていないAPI（uvicornのバージョンを固定している理由はモジュールのdocstringを参照）
+from uvicorn._subprocess import get_subprocess
+from uvicorn.supervisors.multiprocess import Multiprocess
+
+try:
+    import uvloop
+except ImportError:
+    # uvloopは任意の依存パッケージ（uvicorn[standard]に含まれる）
+    uvloop = None
+
+try:
+    import httptools
+except ImportError:
+    # httptoolsは任意の依存パッケージ（uvicorn[standard]に含まれる）
+    httptools = None
+
+logger = logging.getLogger("uvicorn.error")
+
+APP = "api.main:app"
+
+# cgroupのCPUクォータ（v2: "<quota> <period>"、v1: クォータと期間が別のファイル、制限なしは max / -1）
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+# 異常終了したワーカーを起動し直すまでに待つ秒数（直近の異常終了のたびに倍にする）
+WORKER_RESTART_BACKOFF = 0.5
+WORKER_RESTART_BACKOFF_MAX = 30.0
+
+
+def _optional_int(value: str) -> Optional[int]:
+    return int(value) if value else None
+
+
+def _read_cgroup_cpu_quota() -> Optional[Tuple[int, int]]:
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()
+    except OSError:
+        try:
+            with open(CGROUP_V1_CPU_QUOTA) as f:
+                quota = f.read().strip()
+            with open(CGROUP_V1_CPU_PERIOD) as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    return int(quota), int(period)
+
+
+def get_cpu_limit() -> int:
+    """
+    このプロセスが利用できるCPUコア数を取得する。
+
+    CPUアフィニティ（taskset、cpuset）だけでなく、cgroupのCPUクォータ（docker run --cpus、
+    Kubernetesのresources.limits.cpu）も考慮する。クォータはコア数に切り上げる。
+
+    Returns:
+        利用できるCPUコア数（1以上）
+    """
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = _read_cgroup_cpu_quota()
+    if quota is not None:
+        cores = min(cores, math.ceil(quota[0] / quota[1]))
+    return max(cores, 1)
+
+
+def get_worker_count() -> int:
+    """
+    環境変数からワーカー数を取得する。
+
+    Returns:
+        ワーカー数（autoの場合はこのプロセスが利用できるCPUコア数、get_cpu_limit を参照）
+
+    Raises:
+        ValueError: WEB_CONCURRENCYに1以上の整数またはauto以外が設定されている場合
+    """
+    value = config("WEB_CONCURRENCY", default="auto").lower()
+    if value == "auto":
+        # コンテナでCPUが制限されている場合は、ホストの全コア数ではなく制限されたコア数だけ起動する
+        return get_cpu_limit()
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"Invalid WEB_CONCURRENCY value: {value}. Use a positive integer or 'auto'.")
+    return int(value)
+
+
+def get_loop() -> str:
+    """
+    環境変数から使用するイベントループを取得する。
+
+    Raises:
+        ValueError: SERVER_LOOPに不正な値が設定されている場合、またはuvloopがインストールされていない場合
+    """
+    loop = config("SERVER_LOOP", default="auto").lower()
+    if loop == "auto":
+        return "uvloop" if uvloop is not None else "asyncio"
+    if loop == "uvloop" and uvloop is None:
+        raise ValueError("SERVER_LOOP=uvloop requires the uvloop package to be installed")
+    if loop not in ("uvloop", "asyncio"):
+        raise ValueError(f"Invalid SERVER_LOOP value: {loop}. Use 'auto', 'uvloop' or 'asyncio'.")
+    return loop
+
+
+def get_http() -> str:
+    """
+    環境変数から使用するHTTPパーサーを取得する。
+
+    Raises:
+        ValueError: SERVER_HTTPに不正な値が設定されている場合、またはhttptoolsがインストールされていない場合
+    """
+    http = config("SERVER_HTTP", default="auto").lower()
+    if http == "auto":
+        return "httptools" if httptools is not None else "h11"
+    if http == "httptools" and httptools is None:
+        raise ValueError("SERVER_HTTP=httptools requires the httptools package to be installed")
+    if http not in ("httptools", "h11"):
+        raise ValueError(f"Invalid SERVER_HTTP value: {http}. Use 'auto', 'httptools' or 'h11'.")
+    return http
+
+
+def get_server_options() -> Dict:
+    """
+    環境変数から uvicorn.Config に渡すサーバーの設定を取得する。
+
+    Returns:
+        uvicorn.Config のキーワード引数の辞書
+
+    Raises:
+        ValueError: 環境変数に不正な値が設定されている場合
+    """
+    return {
+        "host": config("SERVER_HOST", default="0.0.0.0"),
+        "port": config("PORT", default=8000, cast=int),
+        "workers": get_worker_count(),
+        "loop": get_loop(),
+        "http": get_http(),
+        "timeout_keep_alive": config("SERVER_KEEP_ALIVE", default=5, cast=int),
+        "backlog": config("SERVER_BACKLOG", default=2048, cast=int),
+        "limit_concurrency": config("SERVER_LIMIT_CONCURRENCY", default="", cast=_optional_int),
+        "timeout_graceful_shutdown": config("SERVER_GRACEFUL_TIMEOUT", default=30, cast=int),
+    }
+
+
+class GracefulMultiprocess(Multiprocess):
+    """
+    SIGHUPでワーカーを1つずつ入れ替え、異常終了したワーカーを起動し直すマルチプロセスのスーパーバイザー。
+    """
+
+    def __init__(self, config, target, sockets, max_restarts: int = 5, restart_window: float = 60.0):
+        super().__init__(config, target, sockets)
+        self.should_restart = False
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        # 直近の異常終了の時刻と、起動し直すのを待っているワーカーの位置と起動する時刻
+        self.crashes: Deque[float] = deque()
+        self.respawn_at: Dict[int, float] = {}
+        self.failed = False
+
+    def handle_reload(self, sig, frame) -> None:
+        self.should_restart = True
+
+    def run(self) -> None:
+        self.startup()
+        signal.signal(signal.SIGHUP, self.handle_reload)
+        while not self.should_exit.wait(0.5):
+            if self.should_restart:
+                self.should_restart = False
+                self.restart_workers()
+            else:
+                self.replace_dead_workers()
+        self.shutdown()
+
+    def _spawn(self):
+        process = get_subprocess(config=self.config, target=self.target, sockets=self.sockets)
+        process.start()
+        return process
+
+    def _join(self, process) -> None:
+        # SIGTERMを受けたワーカーは新しい接続の受け付けを止め、処理中のリクエストの完了を待ってから終了する
+        process.join(self.config.timeout_graceful_shutdown)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def restart_workers(self) -> None:
+        """
+        ワーカーを1つずつ、新しいワーカーを起動してから古いワーカーを終了する。
+        """
+        logger.info("Restarting workers")
+        # 起動し直すのを待っているワーカーもここで起動する
+        self.respawn_at.clear()
+        for index, process in enumerate(self.processes):
+            self.processes[index] = self._spawn()
+            process.terminate()
+            self._join(process)
+
+    def replace_dead_workers(self) -> None:
+        """
+        異常終了したワーカーを、直近の異常終了の回数に応じて待ってから起動し直す。
+
+        restart_window 秒の間の異常終了が max_restarts 回を超えた場合は、起動に失敗し続けているとみなし、
+        ワーカーを起動し直さずにスーパーバイザーを終了させる（failed を True にする）。
+        """
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if index not in self.respawn_at:
+                self.crashes.append(now)
+                while self.crashes[0] < now - self.restart_window:
+                    self.crashes.popleft()
+                if len(self.crashes) > self.max_restarts:
+                    logger.error(
+                        "Worker %s exited with code %s, %s workers exited within %s seconds, shutting down",
+                        process.pid,
+                        process.exitcode,
+                        len(self.crashes),
+                        self.restart_window,
+                    )
+                    self.failed = True
+                    self.should_exit.set()
+                    return
+                delay = min(WORKER_RESTART_BACKOFF * 2 ** (len(self.crashes) - 1), WORKER_RESTART_BACKOFF_MAX)
+                logger.warning(
+                    "Worker %s exited with code %s, restarting in %s seconds", process.pid, process.exitcode, delay
+                )
+                self.respawn_at[index] = now + delay
+            if now >= self.respawn_at[index]:
+                del self.respawn_at[index]
+                self.processes[index] = self._spawn()
+
+    def shutdown(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            self._join(process)
+        logger.info("Stopping parent process [%s]", self.pid)
+
+
+def main() -> None:
+    server_config = uvicorn.Config(APP, **get_server_options())
+    server = uvicorn.Server(server_config)
+    # ワーカーが1つの場合もスーパーバイザーを通し、SIGHUPでの入れ替えと異常終了時の再起動を行う
+    sock = server_config.bind_socket()
+    logger.info("Starting %s workers (loop=%s, http=%s)", server_config.workers, server_config.loop, server_config.http)
+    supervisor = GracefulMultiprocess(
+        server_config,
+        target=server.run,
+        sockets=[sock],
+        max_restarts=config("SERVER_MAX_WORKER_RESTARTS", default=5, cast=int),
+        restart_window=config("SERVER_WORKER_RESTART_WINDOW", default=60, cast=float),
+    )
+    supervisor.run()
+    if supervisor.failed:
+        # 起動に失敗し続けるワーカーを再起動し続けず、uvicornの単一プロセスと同じく異常終了として扱う
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
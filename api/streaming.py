@@ -0,0 +1,95 @@
+"""
+一覧APIの結果をストリーミングで返すためのモジュール。
+
+サーバーサイドカーソルから読み出した行を少しずつJSON配列またはNDJSONに書き出すため、
+テーブルの件数に関わらずメモリ使用量と最初の1バイトが返るまでの時間がほぼ一定になる。
+"""
+
+from typing import AsyncIterator
+from typing import Callable
+from typing import Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# NDJSON（改行区切りのJSON）のメディアタイプ
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# サーバーサイドカーソルから一度に読み出す行数、および1回の書き出しにまとめる行数
+STREAM_BATCH_SIZE = 500
+
+
+def accepts_ndjson(accept: Optional[str]) -> bool:
+    """
+    AcceptヘッダーでNDJSONが要求されているかを判定する。
+
+    Args:
+        accept: リクエストのAcceptヘッダーの値
+
+    Returns:
+        NDJSONが要求されている場合はTrue
+    """
+    if not accept:
+        return False
+    return any(media_range.split(";")[0].strip() == NDJSON_MEDIA_TYPE for media_range in accept.split(","))
+
+
+async def _iter_json_array(rows: AsyncIterator, serialize: Callable[[object], bytes]) -> AsyncIterator[bytes]:
+    """
+    行をJSON配列としてSTREAM_BATCH_SIZE行ずつ書き出す（内部関数）。
+    """
+    yield b"["
+    batch = []
+    first = True
+    async for row in rows:
+        batch.append(serialize(row))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield (b"" if first else b",") + b",".join(batch)
+            batch = []
+            first = False
+    if batch:
+        yield (b"" if first else b",") + b",".join(batch)
+    yield b"]"
+
+
+async def _iter_ndjson(rows: AsyncIterator, serialize: Callable[[object], bytes]) -> AsyncIterator[bytes]:
+    """
+    行をNDJSONとしてSTREAM_BATCH_SIZE行ずつ書き出す（内部関数）。
+    """
+    batch = []
+    async for row in rows:
+        batch.append(serialize(row) + b"\n")
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield b"".join(batch)
+            batch = []
+    if batch:
+        yield b"".join(batch)
+
+
+def stream_rows(
+    session_factory: Callable[[], AsyncSession],
+    fetch: Callable[[AsyncSession], AsyncIterator],
+    serialize: Callable[[object], bytes],
+    ndjson: bool = False,
+) -> StreamingResponse:
+    """
+    CRUD関数が返す行をストリーミングで返すレスポンスを作成する。
+
+    Args:
+        session_factory: ストリーミング中に使うセッションを生成するファクトリ
+        fetch: セッションを受け取り、行を順に返す非同期イテレータを返す関数
+        serialize: 1行をJSONのバイト列に変換する関数
+        ndjson: NDJSONで返す場合はTrue、JSON配列で返す場合はFalse
+
+    Returns:
+        StreamingResponse
+    """
+
+    async def rows() -> AsyncIterator:
+        async with session_factory() as db:
+            async for row in fetch(db):
+                yield row
+
+    if ndjson:
+        return StreamingResponse(_iter_ndjson(rows(), serialize), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(_iter_json_array(rows(), serialize), media_type="application/json")
@@ -0,0 +1,17 @@
+"""
+性能を計測するベンチマーク。
+
+api.db の読み込み時に接続先の設定が必要なため、未設定の場合はダミーの値を設定する（実際の接続には使わない）。
+"""
+
+import os
+
+for key, value in {
+    "DB_TYPE": "mysql",
+    "DB_HOST": "localhost",
+    "DB_PORT": "3306",
+    "DB_NAME": "todo",
+    "DB_USER": "todo",
+    "DB_PASSWORD": "todo",
+}.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,127 @@
+"""
+頻繁に実行するSQL文を組み立て済みのもの（api.cruds の GET_BY_ID 等）にしたことで、
+1回の実行あたりに削減できたCPU時間を計測するベンチマーク。
+
+- dynamic: リクエストごとにSQL文を組み立てる従来の方法（コンパイル済みSQLのキャッシュのキーも毎回計算する）
+- prebuilt: モジュールの読み込み時に組み立てたSQL文にバインドパラメータで値を渡す現在の方法
+
+どちらもオンメモリSQLiteに対してセッションから実行し、プロセスのCPU時間（time.process_time）で比較する。
+
+実行方法:
+    $ poetry run python -m benchmarks.bench_statements [--rows 100] [--iterations 2000]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy import and_
+from sqlalchemy import case
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import api.cruds.task_crud as task_crud
+import api.cruds.user_crud as user_crud
+import api.models.task_model as task_model
+import api.models.user_model as user_model
+from api.db import Base
+
+Task = task_model.Task
+User = user_model.User
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _dynamic_stats():
+    status = Task.status
+    return select(
+        func.count().label("total"),
+        _count_if(status == "ToDo").label("todo"),
+        _count_if(status == "Doing").label("doing"),
+        _count_if(status == "Done").label("done"),
+        _count_if(and_(or_(status.is_(None), status != "Done"), Task.due_date < date.today())).label("overdue"),
+    )
+
+
+# (名前, 従来のSQL文を組み立てる関数, 組み立て済みのSQL文, パラメータ)
+SCENARIOS = (
+    ("get task", lambda: select(Task).filter(Task.id == 1), task_crud.GET_BY_ID, {"id": 1}),
+    ("get task version", lambda: select(Task.version).filter(Task.id == 1), task_crud.GET_VERSION_BY_ID, {"id": 1}),
+    (
+        "list tasks page",
+        lambda: select(Task).order_by(*task_crud.ORDER_BY).limit(20),
+        task_crud.LIST_PAGE,
+        {"limit": 20},
+    ),
+    (
+        "list tasks by owner page",
+        lambda: select(Task).filter(Task.owner_id == 1).order_by(*task_crud.ORDER_BY).limit(20),
+        task_crud.LIST_BY_OWNER_PAGE,
+        {"owner_id": 1, "limit": 20},
+    ),
+    (
+        "tasks fingerprint",
+        lambda: select(func.count(), func.max(Task.updated_at), func.sum(Task.version)),
+        task_crud.FINGERPRINT,
+        {},
+    ),
+    ("task stats", _dynamic_stats, task_crud.STATS, {"today": date.today()}),
+    ("get user", lambda: select(User).filter(User.id == 1), user_crud.GET_BY_ID, {"id": 1}),
+)
+
+
+async def _cpu_per_call(session: AsyncSession, iterations: int, build=None, statement=None, params=None) -> float:
+    # 1回あたりのCPU時間（秒）。buildが指定された場合は毎回SQL文を組み立てる
+    # 最初の1回でコンパイル済みSQLのキャッシュに載せてから計測する
+    async def execute():
+        (await session.execute(build() if build is not None else statement, params)).all()
+
+    await execute()
+    start = time.process_time()
+    for _ in range(iterations):
+        await execute()
+    return (time.process_time() - start) / iterations
+
+
+async def main(rows: int, iterations: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"username": f"user{i}", "email": f"user{i}@example.com"} for i in range(10)])
+        await conn.execute(
+            insert(Task),
+            [
+                {"title": f"task{i}", "due_date": date(2025, 1, i % 28 + 1), "status": "ToDo", "owner_id": i % 10}
+                for i in range(rows)
+            ],
+        )
+
+    print(f"rows={rows} iterations={iterations} (CPU time per call)")
+    print(f"{'scenario':>26} {'dynamic':>10} {'prebuilt':>10} {'saved':>10}")
+    async with session_factory() as session:
+        for name, build, statement, params in SCENARIOS:
+            dynamic_cpu = await _cpu_per_call(session, iterations, build=build)
+            prebuilt_cpu = await _cpu_per_call(session, iterations, statement=statement, params=params)
+            saved = dynamic_cpu - prebuilt_cpu
+            print(
+                f"{name:>26} {dynamic_cpu * 1e6:8.1f}us {prebuilt_cpu * 1e6:8.1f}us "
+                f"{saved * 1e6:8.1f}us ({saved / dynamic_cpu:5.1%})"
+            )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations))
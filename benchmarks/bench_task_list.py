@@ -0,0 +1,115 @@
+"""
+GET /tasks のシリアライズ方法による速度の違いを計測するベンチマーク。
+
+- response_model: FastAPIがORMのオブジェクトをresponse_modelで検証してからJSONに変換する従来の方法
+- direct: 行から直接JSONに変換する現在の方法（api.fields.serialize_fields）
+- e2e: オンメモリSQLiteに対する GET /tasks 全体の所要時間
+
+実行方法:
+    $ poetry run python -m benchmarks.bench_task_list [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import api.cruds.task_crud as task_crud
+import api.models.task_model as task_model
+from api.db import Base
+from api.db import get_db
+from api.db import get_read_db
+from api.db import get_read_target
+from api.fields import json_list_response
+from api.main import app
+from api.replica import ReadTarget
+from api.routers.task_router import _serialize_task
+
+
+def _task_list_route():
+    return next(route for route in app.routes if getattr(route, "path", None) == "/tasks" and "GET" in route.methods)
+
+
+async def _timeit(func, repeat: int) -> float:
+    # 最も速かった回の所要時間（秒）
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main(rows: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        statuses = ["ToDo", "Doing", "Done"]
+        await conn.execute(
+            insert(task_model.Task),
+            [
+                {
+                    "title": f"task{i}",
+                    "description": "x" * 200,
+                    "due_date": date(2025, 1, i % 28 + 1),
+                    "status": statuses[i % 3],
+                    "owner_id": i % 100,
+                }
+                for i in range(rows)
+            ],
+        )
+
+    async with session_factory() as db:
+        tasks = await task_crud.get_all(db=db)
+    route = _task_list_route()
+
+    async def response_model_path():
+        content = await serialize_response(field=route.response_field, response_content=tasks, exclude_unset=True)
+        JSONResponse(content)
+
+    async def direct_path():
+        json_list_response(map(_serialize_task, tasks))
+
+    async def get_db_override():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_db_override
+    app.dependency_overrides[get_read_db] = get_db_override
+    app.dependency_overrides[get_read_target] = lambda: ReadTarget(session_factory)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def e2e():
+            response = await client.get("/tasks")
+            response.raise_for_status()
+
+        results = {
+            "response_model": await _timeit(response_model_path, repeat),
+            "direct": await _timeit(direct_path, repeat),
+            "e2e GET /tasks": await _timeit(e2e, repeat),
+        }
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+    print(f"rows={rows} repeat={repeat} (best of)")
+    for name, seconds in results.items():
+        print(f"{name:>16}: {seconds * 1000:8.1f} ms")
+    print(f"{'speedup':>16}: {results['response_model'] / results['direct']:8.1f} x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
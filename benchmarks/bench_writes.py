@@ -0,0 +1,128 @@
+"""
+作成・更新の後の読み直し（db.refresh）をやめたことで削減できたSQL文の数とレイテンシを計測するベンチマーク。
+
+- refresh: 書き込みの後に db.refresh で行を読み直す従来の方法（SELECTが1文増える）
+- returning: サーバー側で設定される列を INSERT/UPDATE ... RETURNING で同じ文から取得する現在の方法
+
+どちらもオンメモリSQLiteに対して api.cruds の関数で書き込み、1回あたりのSQL文の数（COMMITを除く）と
+所要時間を比較する。オンメモリSQLiteにはネットワークの往復がないため、--rtt-ms で指定した
+データベースとの往復時間をSQL文の数に掛けて足した、ネットワーク越しの場合の推定値もあわせて出力する。
+
+実行方法:
+    $ poetry run python -m benchmarks.bench_writes [--iterations 1000] [--rtt-ms 0.5]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import api.cruds.task_crud as task_crud
+import api.cruds.user_crud as user_crud
+import api.models.task_model as task_model
+import api.models.user_model as user_model
+import api.schemas.task_schema as task_schema
+import api.schemas.user_schema as user_schema
+from api.db import Base
+
+
+async def _create_task(db: AsyncSession, i: int):
+    return await task_crud.create(db, task_schema.TaskCreate(title=f"task{i}", status="ToDo", owner_id=1))
+
+
+async def _create_user(db: AsyncSession, i: int):
+    return await user_crud.create(db, user_schema.UserCreate(username=f"user{i}", email=f"user{i}@example.com"))
+
+
+async def _update_task(db: AsyncSession, i: int):
+    return await task_crud.update(db, id=1, task_update=task_schema.TaskUpdate(title=f"task{i}"))
+
+
+# (名前, 書き込みを行い、書き込んだORMのオブジェクトを返す関数)
+SCENARIOS = (
+    ("create task", _create_task),
+    ("create user", _create_user),
+    ("update task", _update_task),
+)
+
+
+async def _measure(session_factory, statements: List[str], write, iterations: int, offset: int, refresh: bool):
+    # 1回あたりのSQL文の数と所要時間（秒）
+    # ユーザー名等が重複しないよう、書き込む値の番号はoffsetからずらす
+    statements.clear()
+    start = time.perf_counter()
+    for i in range(offset, offset + iterations):
+        async with session_factory() as db:
+            obj = await write(db, i)
+            if refresh:
+                await db.refresh(obj)
+    return len(statements) / iterations, (time.perf_counter() - start) / iterations
+
+
+async def run(iterations: int) -> List[Dict]:
+    """
+    各シナリオについて、読み直しあり・なしの1回あたりのSQL文の数と所要時間を計測する。
+
+    Args:
+        iterations: シナリオごと・方法ごとの書き込みの回数
+
+    Returns:
+        シナリオごとの計測結果（name、statements、latency_us に refresh と returning の値）のリスト
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(user_model.User), [{"username": "owner", "email": "owner@example.com"}])
+        await conn.execute(insert(task_model.Task), [{"title": "task", "status": "ToDo", "owner_id": 1}])
+
+    statements: List[str] = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement)
+    )
+
+    results = []
+    for name, write in SCENARIOS:
+        # 最初の数回でコンパイル済みSQLのキャッシュに載せてから計測する
+        await _measure(session_factory, statements, write, 3, offset=0, refresh=True)
+        refresh = await _measure(session_factory, statements, write, iterations, offset=10, refresh=True)
+        returning = await _measure(
+            session_factory, statements, write, iterations, offset=10 + iterations, refresh=False
+        )
+        results.append(
+            {
+                "name": name,
+                "statements": {"refresh": refresh[0], "returning": returning[0]},
+                "latency_us": {"refresh": refresh[1] * 1e6, "returning": returning[1] * 1e6},
+            }
+        )
+    await engine.dispose()
+    return results
+
+
+async def main(iterations: int, rtt_ms: float) -> None:
+    results = await run(iterations)
+
+    print(f"iterations={iterations} rtt={rtt_ms}ms (per write, statements exclude COMMIT)")
+    print(f"{'scenario':>12} {'method':>10} {'statements':>10} {'sqlite':>10} {'with rtt':>10}")
+    for result in results:
+        for method in ("refresh", "returning"):
+            statements = result["statements"][method]
+            latency_us = result["latency_us"][method]
+            estimated_us = latency_us + statements * rtt_ms * 1000
+            print(f"{result['name']:>12} {method:>10} {statements:10.1f} {latency_us:8.1f}us {estimated_us:8.1f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="round trip time to the database (milliseconds)")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.rtt_ms))
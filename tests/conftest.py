@@ -1,20 +1,28 @@
+import pytest
 import pytest_asyncio
 from httpx import AsyncClient
 from httpx._transports.asgi import ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from api.cache import clear_caches
 from api.db import Base
 from api.db import get_db
+from api.db import get_read_db
+from api.db import get_read_target
 from api.main import app
+from api.replica import ReadTarget
 
 # テスト用のオンメモリSQLiteデータベースURL
 ASYNC_DB_URL = "sqlite+aiosqlite:///:memory:"
 
 # エンジンとセッションの設定
 async_engine = create_async_engine(ASYNC_DB_URL, echo=True)
-async_session = sessionmaker(autocommit=False, autoflush=False, bind=async_engine, class_=AsyncSession)
+async_session = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=async_engine, class_=AsyncSession
+)
 
 
 # テスト用DBセッションを返すfixture
@@ -24,6 +32,7 @@ async def async_client() -> AsyncClient:
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+    await clear_caches()
 
     # FastAPIのDB依存をテスト用にオーバーライド
     async def get_test_db():
@@ -31,6 +40,8 @@ async def async_client() -> AsyncClient:
             yield session
 
     app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_read_db] = get_test_db
+    app.dependency_overrides[get_read_target] = lambda: ReadTarget(async_session)
 
     # テスト用HTTPクライアント
     transport = ASGITransport(app=app)
@@ -39,3 +50,16 @@ async def async_client() -> AsyncClient:
 
     # テスト終了時のリソース解放
     await async_engine.dispose()
+
+
+# テスト中にデータベースへ発行されたSQL文を記録するfixture
+@pytest.fixture
+def executed_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
@@ -0,0 +1,73 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "title": "foo",
+    "description": "bar",
+    "due_date": "2025-01-01",
+    "status": "ToDo",
+    "owner_id": 0,
+}
+
+
+@pytest.mark.asyncio
+async def test_get_task_uses_cache(async_client, executed_statements):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+
+    first_response = await async_client.get(f"/tasks/{task_id}")
+    executed_statements.clear()
+
+    # 2回目以降はデータベースに問い合わせずにキャッシュから返す
+    second_response = await async_client.get(f"/tasks/{task_id}")
+    assert second_response.status_code == starlette.status.HTTP_200_OK
+    assert second_response.json() == first_response.json()
+    assert executed_statements == []
+
+
+@pytest.mark.asyncio
+async def test_update_task_invalidates_cache(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+    await async_client.get(f"/tasks/{task_id}")
+
+    await async_client.patch(f"/tasks/{task_id}", json={"title": "baz"})
+
+    response = await async_client.get(f"/tasks/{task_id}")
+    assert response.json()["title"] == "baz"
+
+
+@pytest.mark.asyncio
+async def test_delete_task_invalidates_cache(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+    await async_client.get(f"/tasks/{task_id}")
+
+    await async_client.delete(f"/tasks/{task_id}")
+
+    response = await async_client.get(f"/tasks/{task_id}")
+    assert response.status_code == starlette.status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_delete_owner_invalidates_task_cache(async_client):
+    user = {
+        "username": "foobar",
+        "email": "foobar@example.com",
+        "first_name": "Foo",
+        "last_name": "Bar",
+    }
+    user_response = await async_client.post("/users", json=user)
+    user_id = user_response.json()["id"]
+    create_response = await async_client.post("/tasks", json={**PAYLOAD, "owner_id": user_id})
+    task_id = create_response.json()["id"]
+    await async_client.get(f"/tasks/{task_id}")
+    await async_client.get(f"/users/{user_id}")
+
+    # ユーザーを削除すると、所有者を外したタスクとユーザーのキャッシュも無効化される
+    await async_client.delete(f"/users/{user_id}")
+
+    task_response = await async_client.get(f"/tasks/{task_id}")
+    assert task_response.json()["owner_id"] is None
+    user_get_response = await async_client.get(f"/users/{user_id}")
+    assert user_get_response.status_code == starlette.status.HTTP_404_NOT_FOUND
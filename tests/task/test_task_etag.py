@@ -0,0 +1,134 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "title": "foo",
+    "description": "bar",
+    "due_date": "2025-01-01",
+    "status": "ToDo",
+    "owner_id": 0,
+}
+
+
+@pytest.mark.asyncio
+async def test_get_task_returns_etag(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+
+    response = await async_client.get(f"/tasks/{task_id}")
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.headers["ETag"].startswith('W/"')
+
+
+@pytest.mark.asyncio
+async def test_get_task_not_modified(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+    etag = (await async_client.get(f"/tasks/{task_id}")).headers["ETag"]
+
+    response = await async_client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+@pytest.mark.asyncio
+async def test_get_task_etag_mismatch(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+
+    response = await async_client.get(f"/tasks/{task_id}", headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["id"] == task_id
+
+
+@pytest.mark.asyncio
+async def test_get_task_with_etag_not_found(async_client):
+    response = await async_client.get("/tasks/1", headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == starlette.status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_not_modified(async_client, executed_statements):
+    await async_client.post("/tasks", json=PAYLOAD)
+    etag = (await async_client.get("/tasks")).headers["ETag"]
+    executed_statements.clear()
+
+    # 変更がなければ件数と最大の更新日時だけを問い合わせて304を返す
+    response = await async_client.get("/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert len(executed_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_etag_changes_after_create(async_client):
+    await async_client.post("/tasks", json=PAYLOAD)
+    etag = (await async_client.get("/tasks")).headers["ETag"]
+
+    await async_client.post("/tasks", json=PAYLOAD)
+
+    response = await async_client.get("/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_etag_depends_on_query(async_client):
+    await async_client.post("/tasks", json=PAYLOAD)
+    await async_client.post("/tasks", json=PAYLOAD)
+    etag = (await async_client.get("/tasks")).headers["ETag"]
+
+    # 検索条件が異なれば別の一覧として扱う
+    response = await async_client.get("/tasks", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/tasks", "/users/0/tasks"])
+@pytest.mark.parametrize("headers", [{}, {"If-None-Match": 'W/"stale"'}])
+async def test_get_tasks_page_without_fingerprint(async_client, executed_statements, path, headers):
+    await async_client.post("/tasks", json=PAYLOAD)
+    await async_client.post("/tasks", json=PAYLOAD)
+    executed_statements.clear()
+
+    # ページ単位の一覧は全件の集計を実行せず、1ページ分の行だけを読み出す
+    response = await async_client.get(path, params={"limit": 1}, headers=headers)
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert len(response.json()) == 1
+    assert "ETag" not in response.headers
+    assert len(executed_statements) == 1
+    assert "count(" not in executed_statements[0]
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_by_owner_not_modified(async_client):
+    await async_client.post("/tasks", json=PAYLOAD)
+    etag = (await async_client.get("/users/0/tasks")).headers["ETag"]
+
+    response = await async_client.get("/users/0/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+
+    # 他の所有者のタスクが増えても一覧は変わらない
+    await async_client.post("/tasks", json={**PAYLOAD, "owner_id": 1})
+    response = await async_client.get("/users/0/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_get_task_etag_changes_after_update(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+    etag = (await async_client.get(f"/tasks/{task_id}")).headers["ETag"]
+    list_etag = (await async_client.get("/tasks")).headers["ETag"]
+
+    await async_client.patch(f"/tasks/{task_id}", json={"title": "baz"})
+
+    # 更新日時が同じ秒でも、バージョンが変わるためETagが変わる
+    response = await async_client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["title"] == "baz"
+    response = await async_client.get("/tasks", headers={"If-None-Match": list_etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
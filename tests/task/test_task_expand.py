@@ -0,0 +1,101 @@
+import pytest
+import starlette.status
+
+
+async def _create_users_and_tasks(async_client, count, start=0):
+    # 所有者の異なるタスクを作成
+    owner_ids = []
+    for i in range(start, start + count):
+        user = {"username": f"user{i}", "email": f"user{i}@example.com", "first_name": f"First{i}"}
+        response = await async_client.post("/users", json=user)
+        owner_ids.append(response.json()["id"])
+    for owner_id in owner_ids:
+        await async_client.post("/tasks", json={"title": f"task{owner_id}", "status": "ToDo", "owner_id": owner_id})
+    return owner_ids
+
+
+@pytest.mark.asyncio
+async def test_get_task_expand_owner(async_client):
+    (owner_id,) = await _create_users_and_tasks(async_client, 1)
+    task_id = (await async_client.get("/tasks")).json()[0]["id"]
+
+    response = await async_client.get(f"/tasks/{task_id}", params={"expand": "owner"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    task = response.json()
+    assert task["owner_id"] == owner_id
+    assert task["owner"]["id"] == owner_id
+    assert task["owner"]["username"] == "user0"
+    assert task["owner"]["first_name"] == "First0"
+
+
+@pytest.mark.asyncio
+async def test_get_task_expand_owner_etag(async_client):
+    (owner_id,) = await _create_users_and_tasks(async_client, 1)
+    task_id = (await async_client.get("/tasks")).json()[0]["id"]
+    etag = (await async_client.get(f"/tasks/{task_id}", params={"expand": "owner"})).headers["ETag"]
+
+    response = await async_client.get(f"/tasks/{task_id}", params={"expand": "owner"}, headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+
+    # 所有者が更新されると埋め込んだ結果も変わる
+    await async_client.patch(f"/users/{owner_id}", json={"first_name": "Changed"})
+    response = await async_client.get(f"/tasks/{task_id}", params={"expand": "owner"}, headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["owner"]["first_name"] == "Changed"
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_expand_owner(async_client):
+    owner_ids = await _create_users_and_tasks(async_client, 3)
+    await async_client.post("/tasks", json={"title": "orphan", "status": "ToDo"})
+
+    response = await async_client.get("/tasks", params={"expand": "owner"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    tasks = response.json()
+    assert len(tasks) == 4
+    for task in tasks:
+        if task["owner_id"] is None:
+            assert task["owner"] is None
+        else:
+            assert task["owner"]["id"] == task["owner_id"]
+    assert {task["owner"]["id"] for task in tasks if task["owner"]} == set(owner_ids)
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_expand_owner_statement_count(async_client, executed_statements):
+    # 一覧の件数が増えても発行するSELECTの数は変わらない（N+1にならない）
+    await _create_users_and_tasks(async_client, 2)
+    executed_statements.clear()
+    await async_client.get("/tasks", params={"expand": "owner"})
+    small_count = len(executed_statements)
+
+    await _create_users_and_tasks(async_client, 10, start=100)
+    executed_statements.clear()
+    response = await async_client.get("/tasks", params={"expand": "owner"})
+    assert len(response.json()) == 12
+    assert len(executed_statements) == small_count
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_by_owner_expand_owner(async_client):
+    (owner_id,) = await _create_users_and_tasks(async_client, 1)
+
+    response = await async_client.get(f"/users/{owner_id}/tasks", params={"expand": "owner", "limit": 1})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()[0]["owner"]["username"] == "user0"
+
+
+@pytest.mark.asyncio
+async def test_stream_all_tasks_expand_owner(async_client):
+    await _create_users_and_tasks(async_client, 2)
+
+    response = await async_client.get("/tasks", params={"expand": "owner", "stream": "true"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert {task["owner"]["username"] for task in response.json()} == {"user0", "user1"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", [{"expand": "tasks"}, {"expand": "owner", "fields": "id"}])
+async def test_get_all_tasks_invalid_expand(async_client, params):
+    response = await async_client.get("/tasks", params=params)
+    assert response.status_code == starlette.status.HTTP_400_BAD_REQUEST
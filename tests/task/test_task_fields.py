@@ -0,0 +1,87 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "title": "foo",
+    "description": "bar",
+    "due_date": "2025-01-01",
+    "status": "ToDo",
+    "owner_id": 1,
+}
+
+
+@pytest.mark.asyncio
+async def test_get_task_fields(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+
+    response = await async_client.get(f"/tasks/{task_id}", params={"fields": "id,title,status"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == {"id": task_id, "title": "foo", "status": "ToDo"}
+    assert "ETag" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_fields(async_client, executed_statements):
+    for _ in range(3):
+        await async_client.post("/tasks", json=PAYLOAD)
+    executed_statements.clear()
+
+    response = await async_client.get("/tasks", params={"fields": "id,due_date"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert "ETag" in response.headers
+    tasks = response.json()
+    assert len(tasks) == 3
+    assert all(set(task) == {"id", "due_date"} for task in tasks)
+    assert tasks[0]["due_date"] == "2025-01-01"
+
+    # 指定されていない列（description等）はSELECTしない
+    select_statement = executed_statements[-1]
+    assert "description" not in select_statement
+    assert "updated_at" not in select_statement
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_fields_paginated(async_client):
+    for _ in range(3):
+        await async_client.post("/tasks", json=PAYLOAD)
+    expected = [task["id"] for task in (await async_client.get("/tasks")).json()]
+
+    # 並び順キーの列を指定しなくても次ページのカーソルを作成できる
+    ids = []
+    params = {"fields": "title", "limit": 2}
+    while True:
+        response = await async_client.get("/tasks", params=params)
+        page = response.json()
+        assert all(set(task) == {"title"} for task in page)
+        ids.extend(page)
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params = {**params, "cursor": next_cursor}
+    assert len(ids) == len(expected)
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_by_owner_fields(async_client):
+    await async_client.post("/tasks", json=PAYLOAD)
+
+    response = await async_client.get("/users/1/tasks", params={"fields": "title"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == [{"title": "foo"}]
+
+
+@pytest.mark.asyncio
+async def test_stream_all_tasks_fields(async_client):
+    await async_client.post("/tasks", json=PAYLOAD)
+
+    response = await async_client.get("/tasks", params={"fields": "title,status", "stream": "true"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == [{"title": "foo", "status": "ToDo"}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fields", ["", "id,unknown", "owner"])
+async def test_get_all_tasks_invalid_fields(async_client, fields):
+    response = await async_client.get("/tasks", params={"fields": fields})
+    assert response.status_code == starlette.status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,124 @@
+from datetime import date
+from datetime import timedelta
+
+import pytest
+import starlette.status
+
+TODAY = date.today()
+
+
+async def _create_tasks(async_client):
+    payloads = [
+        {"title": "overdue", "due_date": str(TODAY - timedelta(days=1)), "status": "ToDo", "owner_id": 1},
+        {"title": "overdue_doing", "due_date": str(TODAY - timedelta(days=2)), "status": "Doing", "owner_id": 2},
+        {"title": "done_past", "due_date": str(TODAY - timedelta(days=1)), "status": "Done", "owner_id": 1},
+        {"title": "today", "due_date": str(TODAY), "status": "ToDo", "owner_id": 2},
+        {"title": "future", "due_date": str(TODAY + timedelta(days=10)), "status": "Doing", "owner_id": 1},
+        {"title": "nodue", "due_date": None, "status": "ToDo", "owner_id": 1},
+    ]
+    for payload in payloads:
+        await async_client.post("/tasks", json=payload)
+
+
+async def _get_titles(async_client, url, params):
+    response = await async_client.get(url, params=params)
+    assert response.status_code == starlette.status.HTTP_200_OK
+    return {task["title"] for task in response.json()}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({"status": "Done"}, {"done_past"}),
+        ({"status": ["ToDo", "Doing"]}, {"overdue", "overdue_doing", "today", "future", "nodue"}),
+        ({"status": ["ToDo", "Done"]}, {"overdue", "done_past", "today", "nodue"}),
+        ({"due_before": str(TODAY)}, {"overdue", "overdue_doing", "done_past"}),
+        ({"due_after": str(TODAY)}, {"future"}),
+        ({"due_after": str(TODAY - timedelta(days=2)), "due_before": str(TODAY)}, {"overdue", "done_past"}),
+        ({"owner_id": 2}, {"overdue_doing", "today"}),
+        ({"overdue": "true"}, {"overdue", "overdue_doing"}),
+        ({"overdue": "false"}, {"done_past", "today", "future", "nodue"}),
+        ({"overdue": "true", "owner_id": 1}, {"overdue"}),
+    ],
+)
+async def test_get_all_tasks_filtered(async_client, params, expected):
+    await _create_tasks(async_client)
+
+    assert await _get_titles(async_client, "/tasks", params) == expected
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_all_statuses_excludes_no_status(async_client):
+    await _create_tasks(async_client)
+    await async_client.post("/tasks", json={"title": "nostatus", "owner_id": 1})
+
+    # すべての状態を指定しても、状態が未設定のタスクは含まない
+    titles = await _get_titles(async_client, "/tasks", {"status": ["ToDo", "Doing", "Done"]})
+    assert titles == {"overdue", "overdue_doing", "done_past", "today", "future", "nodue"}
+    titles = await _get_titles(async_client, "/users/1/tasks", {"status": ["ToDo", "Doing", "Done"]})
+    assert titles == {"overdue", "done_past", "future", "nodue"}
+    # 状態を指定しない場合は含む
+    assert "nostatus" in await _get_titles(async_client, "/tasks", {})
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_by_owner_filtered(async_client):
+    await _create_tasks(async_client)
+
+    titles = await _get_titles(async_client, "/users/1/tasks", {"status": ["ToDo", "Doing"]})
+    assert titles == {"overdue", "future", "nodue"}
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_updated_since(async_client):
+    await _create_tasks(async_client)
+    response = await async_client.get("/tasks")
+    latest = max(task["updated_at"] for task in response.json())
+
+    assert len(await _get_titles(async_client, "/tasks", {"updated_since": latest})) > 0
+    assert await _get_titles(async_client, "/tasks", {"updated_since": "2999-01-01T00:00:00"}) == set()
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_filtered_paginated(async_client):
+    await _create_tasks(async_client)
+    params = {"status": ["ToDo", "Doing"], "limit": 2}
+    expected = (await async_client.get("/tasks", params={"status": ["ToDo", "Doing"]})).json()
+
+    # カーソルによるページングでも絞り込み条件が維持される
+    ids = []
+    while True:
+        response = await async_client.get("/tasks", params=params)
+        ids.extend(task["id"] for task in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params = {**params, "cursor": next_cursor}
+    assert ids == [task["id"] for task in expected]
+
+
+@pytest.mark.asyncio
+async def test_stream_all_tasks_filtered(async_client):
+    await _create_tasks(async_client)
+
+    titles = await _get_titles(async_client, "/tasks", {"stream": "true", "overdue": "true"})
+    assert titles == {"overdue", "overdue_doing"}
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_filtered_etag(async_client):
+    await _create_tasks(async_client)
+    etag = (await async_client.get("/tasks", params={"owner_id": 2})).headers["ETag"]
+
+    # 絞り込み対象外のタスクが増えても一覧は変わらない
+    await async_client.post("/tasks", json={"title": "other", "status": "ToDo", "owner_id": 1})
+    response = await async_client.get("/tasks", params={"owner_id": 2}, headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", [{"status": "Unknown"}, {"due_before": "invalid"}, {"overdue": "maybe"}])
+async def test_get_all_tasks_invalid_filter(async_client, params):
+    response = await async_client.get("/tasks", params=params)
+    assert response.status_code == starlette.status.HTTP_422_UNPROCESSABLE_ENTITY
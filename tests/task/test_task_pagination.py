@@ -0,0 +1,104 @@
+import pytest
+import starlette.status
+
+
+async def _create_tasks(async_client, owner_id=0):
+    # 並び順キーが重複・欠損するタスクを作成
+    payloads = [
+        {"title": "done1", "due_date": "2025-01-01", "status": "Done", "owner_id": owner_id},
+        {"title": "todo1", "due_date": "2025-01-02", "status": "ToDo", "owner_id": owner_id},
+        {"title": "todo2", "due_date": "2025-01-01", "status": "ToDo", "owner_id": owner_id},
+        {"title": "todo3", "due_date": "2025-01-01", "status": "Doing", "owner_id": owner_id},
+        {"title": "nodue1", "due_date": None, "status": "ToDo", "owner_id": owner_id},
+        {"title": "nodue2", "due_date": None, "status": "Done", "owner_id": owner_id},
+        {"title": "todo4", "due_date": "2025-01-01", "status": "ToDo", "owner_id": owner_id},
+    ]
+    for payload in payloads:
+        await async_client.post("/tasks", json=payload)
+    return payloads
+
+
+async def _get_all_pages(async_client, url, limit):
+    ids = []
+    params = {"limit": limit}
+    while True:
+        response = await async_client.get(url, params=params)
+        assert response.status_code == starlette.status.HTTP_200_OK
+        page = response.json()
+        assert len(page) <= limit
+        ids.extend(task["id"] for task in page)
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            return ids
+        params = {"limit": limit, "cursor": next_cursor}
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_paginated(async_client):
+    await _create_tasks(async_client)
+
+    # ページングなしの全件取得と同じ順序・件数で取得できることを確認
+    response = await async_client.get("/tasks")
+    expected_ids = [task["id"] for task in response.json()]
+    assert "X-Next-Cursor" not in response.headers
+
+    ids = await _get_all_pages(async_client, "/tasks", limit=2)
+    assert ids == expected_ids
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_sort_order(async_client):
+    await _create_tasks(async_client)
+
+    # 未完了を先に、期限の近い順（期限なしは末尾）で並ぶことを確認
+    response = await async_client.get("/tasks")
+    titles = [task["title"] for task in response.json()]
+    assert titles[-2:] == ["done1", "nodue2"]
+    assert titles[-3] == "nodue1"
+    assert titles[3] == "todo1"
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_last_page_has_no_cursor(async_client):
+    payloads = await _create_tasks(async_client)
+
+    # 件数ちょうどのlimitでは次ページのカーソルを返さない
+    response = await async_client.get("/tasks", params={"limit": len(payloads)})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert len(response.json()) == len(payloads)
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_by_owner_paginated(async_client):
+    user = {
+        "username": "user1",
+        "email": "user1@example.com",
+        "first_name": "First1",
+        "last_name": "Last1",
+    }
+    create_response = await async_client.post("/users", json=user)
+    user_id = create_response.json()["id"]
+    payloads = await _create_tasks(async_client, owner_id=user_id)
+    await _create_tasks(async_client, owner_id=0)
+
+    response = await async_client.get(f"/users/{user_id}/tasks")
+    expected_ids = [task["id"] for task in response.json()]
+    assert len(expected_ids) == len(payloads)
+
+    ids = await _get_all_pages(async_client, f"/users/{user_id}/tasks", limit=3)
+    assert ids == expected_ids
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_invalid_cursor(async_client):
+    response = await async_client.get("/tasks", params={"limit": 2, "cursor": "invalid"})
+    assert response.status_code == starlette.status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_invalid_limit(async_client):
+    response = await async_client.get("/tasks", params={"limit": 0})
+    assert response.status_code == starlette.status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "limit" in response.json()["detail"][0]["loc"]
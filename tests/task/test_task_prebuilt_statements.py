@@ -0,0 +1,46 @@
+import pytest
+
+import api.cruds.task_crud as task_crud
+import api.schemas.task_schema as task_schema
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        ({}, (task_crud.LIST, {})),
+        ({"limit": 10}, (task_crud.LIST_PAGE, {"limit": 10})),
+        ({"task_filter": task_schema.TaskFilter()}, (task_crud.LIST, {})),
+        ({"task_filter": task_schema.TaskFilter(status=[])}, (task_crud.LIST, {})),
+        ({"task_filter": task_schema.TaskFilter(owner_id=1)}, (task_crud.LIST_BY_OWNER, {"owner_id": 1})),
+        (
+            {"task_filter": task_schema.TaskFilter(owner_id=1), "limit": 10},
+            (task_crud.LIST_BY_OWNER_PAGE, {"owner_id": 1, "limit": 10}),
+        ),
+    ],
+)
+def test_prebuilt_list(kwargs, expected):
+    # 絞り込みなし・所有者での絞り込みのみの一覧は組み立て済みのSQL文を使う
+    options = {"limit": None, "after": None, "task_filter": None, "fields": None, "expand": (), **kwargs}
+    statement, params = task_crud._prebuilt_list(**options)
+    assert statement is expected[0]
+    assert params == expected[1]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"task_filter": task_schema.TaskFilter(overdue=False)},
+        {"task_filter": task_schema.TaskFilter(owner_id=1, status=[task_schema.Status.DONE])},
+        {"fields": ["title"]},
+        {"expand": ["owner"]},
+        {"limit": 10, "after": (0, None, None, 1)},
+    ],
+)
+def test_prebuilt_list_not_applicable(kwargs):
+    options = {"limit": None, "after": None, "task_filter": None, "fields": None, "expand": (), **kwargs}
+    assert task_crud._prebuilt_list(**options) is None
+
+
+def test_prebuilt_statements_cache_key_is_reused():
+    # 組み立て済みのSQL文はコンパイル済みSQLのキャッシュのキーを一度だけ計算する
+    assert task_crud.GET_BY_ID._generate_cache_key() is task_crud.GET_BY_ID._generate_cache_key()
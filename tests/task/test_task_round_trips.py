@@ -0,0 +1,95 @@
+import pytest
+import starlette.status
+
+from tests.conftest import async_engine
+
+
+@pytest.mark.asyncio
+async def test_create_task_single_statement(async_client, executed_statements):
+    payload = {
+        "title": "foo",
+        "description": "bar",
+        "due_date": "2025-01-01",
+        "status": "ToDo",
+        "owner_id": 0,
+    }
+    response = await async_client.post("/tasks", json=payload)
+    assert response.status_code == starlette.status.HTTP_201_CREATED
+
+    # サーバー側で設定される列もINSERT ... RETURNINGで取得し、読み直しのSELECTを発行しない
+    assert len(executed_statements) == 1
+    assert executed_statements[0].startswith("INSERT INTO tasks")
+    assert "RETURNING" in executed_statements[0]
+
+
+@pytest.mark.asyncio
+async def test_update_task_single_statement(async_client, executed_statements):
+    payload = {
+        "title": "foo",
+        "description": "bar",
+        "due_date": "2025-01-01",
+        "status": "ToDo",
+        "owner_id": 0,
+    }
+    create_response = await async_client.post("/tasks", json=payload)
+    task_id = create_response.json()["id"]
+    executed_statements.clear()
+
+    response = await async_client.patch(f"/tasks/{task_id}", json={"status": "Done"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["status"] == "Done"
+
+    # 事前のSELECTも読み直しのSELECTも発行せず、UPDATE ... RETURNINGの1文で更新する
+    assert len(executed_statements) == 1
+    assert executed_statements[0].startswith("UPDATE tasks")
+    assert "RETURNING" in executed_statements[0]
+
+
+@pytest.mark.asyncio
+async def test_update_task_not_found_single_statement(async_client, executed_statements):
+    response = await async_client.patch("/tasks/99999", json={"status": "Done"})
+    assert response.status_code == starlette.status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "Task not found"
+    assert len(executed_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_task_without_returning(async_client, executed_statements, monkeypatch):
+    # RETURNINGに対応していないデータベース（MySQL）向けの処理を確認
+    monkeypatch.setattr(async_engine.dialect, "update_returning", False)
+    payload = {
+        "title": "foo",
+        "description": "bar",
+        "due_date": "2025-01-01",
+        "status": "ToDo",
+        "owner_id": 0,
+    }
+    create_response = await async_client.post("/tasks", json=payload)
+    task_id = create_response.json()["id"]
+
+    response = await async_client.patch(f"/tasks/{task_id}", json={"status": "Done"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["status"] == "Done"
+
+    response = await async_client.patch("/tasks/99999", json={"status": "Done"})
+    assert response.status_code == starlette.status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_delete_task_single_statement(async_client, executed_statements):
+    payload = {
+        "title": "foo",
+        "description": "bar",
+        "due_date": "2025-01-01",
+        "status": "ToDo",
+        "owner_id": 0,
+    }
+    create_response = await async_client.post("/tasks", json=payload)
+    task_id = create_response.json()["id"]
+    executed_statements.clear()
+
+    # 事前のSELECTを発行せず、DELETEの1文で削除する
+    response = await async_client.delete(f"/tasks/{task_id}")
+    assert response.status_code == starlette.status.HTTP_204_NO_CONTENT
+    assert len(executed_statements) == 1
+    assert executed_statements[0].startswith("DELETE FROM tasks")
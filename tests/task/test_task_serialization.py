@@ -0,0 +1,41 @@
+import pytest
+import starlette.status
+from sqlalchemy import insert
+
+import api.models.task_model as task_model
+import api.schemas.task_schema as task_schema
+from api.main import app
+from tests.conftest import async_engine
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_matches_response_model(async_client):
+    await async_client.post("/tasks", json={"title": "foo", "description": "bar", "due_date": "2025-01-01"})
+    await async_client.post("/tasks", json={"title": "baz", "status": "Done", "owner_id": 1})
+
+    response = await async_client.get("/tasks")
+    assert response.status_code == starlette.status.HTTP_200_OK
+
+    # レスポンスモデルを経由した場合と同じJSONになる
+    for task in response.json():
+        expected = task_schema.TaskResponse.model_validate(task).model_dump(mode="json")
+        assert task == expected
+        assert list(task) == list(task_schema.TaskResponse.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_get_all_tasks_skips_output_validation(async_client):
+    # 出力時にはmax_length等の検証を行わない（データベースの値をそのまま返す）
+    async with async_engine.begin() as conn:
+        await conn.execute(insert(task_model.Task).values(title="x" * 40, status="ToDo"))
+
+    response = await async_client.get("/tasks")
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()[0]["title"] == "x" * 40
+
+
+def test_get_all_tasks_openapi_schema():
+    # 直接JSONを返しても、OpenAPIのスキーマはresponse_modelのまま
+    schema = app.openapi()["paths"]["/tasks"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema["type"] == "array"
+    assert schema["items"] == {"$ref": "#/components/schemas/TaskResponse"}
@@ -0,0 +1,95 @@
+from datetime import date
+from datetime import timedelta
+
+import pytest
+import starlette.status
+
+TODAY = date.today()
+
+
+async def _create_tasks(async_client):
+    payloads = [
+        {"title": "overdue", "due_date": str(TODAY - timedelta(days=1)), "status": "ToDo", "owner_id": 1},
+        {"title": "doing", "due_date": str(TODAY + timedelta(days=1)), "status": "Doing", "owner_id": 1},
+        {"title": "done_past", "due_date": str(TODAY - timedelta(days=1)), "status": "Done", "owner_id": 1},
+        {"title": "overdue_doing", "due_date": str(TODAY - timedelta(days=3)), "status": "Doing", "owner_id": 2},
+        {"title": "nodue", "due_date": None, "status": "ToDo", "owner_id": 2},
+        {"title": "orphan", "due_date": None, "status": "Done"},
+    ]
+    for payload in payloads:
+        await async_client.post("/tasks", json=payload)
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats(async_client):
+    await _create_tasks(async_client)
+
+    response = await async_client.get("/tasks/stats")
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == [{"total": 6, "todo": 2, "doing": 2, "done": 2, "overdue": 2}]
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats_empty(async_client):
+    response = await async_client.get("/tasks/stats")
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == [{"total": 0, "todo": 0, "doing": 0, "done": 0, "overdue": 0}]
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats_group_by_owner(async_client):
+    await _create_tasks(async_client)
+
+    response = await async_client.get("/tasks/stats", params={"group_by": "owner"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    stats = {group["owner_id"]: group for group in response.json()}
+    assert stats[1] == {"owner_id": 1, "total": 3, "todo": 1, "doing": 1, "done": 1, "overdue": 1}
+    assert stats[2] == {"owner_id": 2, "total": 2, "todo": 1, "doing": 1, "done": 0, "overdue": 1}
+    assert stats[None] == {"owner_id": None, "total": 1, "todo": 0, "doing": 0, "done": 1, "overdue": 0}
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats_filtered(async_client):
+    await _create_tasks(async_client)
+
+    response = await async_client.get("/tasks/stats", params={"due_before": str(TODAY)})
+    assert response.json() == [{"total": 3, "todo": 1, "doing": 1, "done": 1, "overdue": 2}]
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats_by_owner(async_client, executed_statements):
+    await async_client.post("/users", json={"username": "owner", "email": "owner@example.com"})
+    await _create_tasks(async_client)
+    executed_statements.clear()
+
+    response = await async_client.get("/users/1/tasks/stats")
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == {"owner_id": 1, "total": 3, "todo": 1, "doing": 1, "done": 1, "overdue": 1}
+    # 行を読み出さずに1回の集計で求める（所有者が存在するかも同じSQL文で判定する）
+    assert len(executed_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats_by_owner_without_tasks(async_client):
+    await async_client.post("/users", json={"username": "owner", "email": "owner@example.com"})
+
+    # タスクがない所有者は件数0を返す
+    response = await async_client.get("/users/1/tasks/stats")
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == {"owner_id": 1, "total": 0, "todo": 0, "doing": 0, "done": 0, "overdue": 0}
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats_by_owner_not_found(async_client):
+    # 存在しない所有者は、タスクが残っていても404を返す
+    await _create_tasks(async_client)
+
+    response = await async_client.get("/users/2/tasks/stats")
+    assert response.status_code == starlette.status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "User not found"}
+
+
+@pytest.mark.asyncio
+async def test_get_task_stats_invalid_group_by(async_client):
+    response = await async_client.get("/tasks/stats", params={"group_by": "status"})
+    assert response.status_code == starlette.status.HTTP_422_UNPROCESSABLE_ENTITY
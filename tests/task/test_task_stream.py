@@ -0,0 +1,63 @@
+import json
+
+import pytest
+import starlette.status
+
+import api.streaming
+
+
+async def _create_tasks(async_client, count):
+    for i in range(count):
+        payload = {
+            "title": f"task{i}",
+            "description": f"task{i} description",
+            "due_date": f"2025-01-{i % 28 + 1:02d}",
+            "status": "Done" if i % 3 == 0 else "ToDo",
+            "owner_id": 0,
+        }
+        await async_client.post("/tasks", json=payload)
+
+
+@pytest.mark.asyncio
+async def test_stream_all_tasks_json_array(async_client, monkeypatch):
+    # 複数回に分けて書き出されるようにバッチサイズを小さくする
+    monkeypatch.setattr(api.streaming, "STREAM_BATCH_SIZE", 2)
+    await _create_tasks(async_client, 5)
+
+    response = await async_client.get("/tasks")
+    stream_response = await async_client.get("/tasks", params={"stream": "true"})
+
+    # ストリーミングしない場合と同じJSON配列が返ることを確認
+    assert stream_response.status_code == starlette.status.HTTP_200_OK
+    assert stream_response.headers["content-type"] == "application/json"
+    assert stream_response.json() == response.json()
+
+
+@pytest.mark.asyncio
+async def test_stream_all_tasks_ndjson(async_client, monkeypatch):
+    monkeypatch.setattr(api.streaming, "STREAM_BATCH_SIZE", 2)
+    await _create_tasks(async_client, 5)
+
+    response = await async_client.get("/tasks")
+    stream_response = await async_client.get(
+        "/tasks", params={"stream": "true"}, headers={"Accept": "application/x-ndjson"}
+    )
+
+    # 1行に1タスクずつ返ることを確認
+    assert stream_response.status_code == starlette.status.HTTP_200_OK
+    assert stream_response.headers["content-type"] == "application/x-ndjson"
+    lines = stream_response.text.splitlines()
+    assert [json.loads(line) for line in lines] == response.json()
+
+
+@pytest.mark.asyncio
+async def test_stream_all_tasks_empty(async_client):
+    response = await async_client.get("/tasks", params={"stream": "true"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_stream_all_tasks_with_limit(async_client):
+    response = await async_client.get("/tasks", params={"stream": "true", "limit": 10})
+    assert response.status_code == starlette.status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,85 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "title": "foo",
+    "description": "bar",
+    "due_date": "2025-01-01",
+    "status": "ToDo",
+    "owner_id": 0,
+}
+
+
+@pytest.mark.asyncio
+async def test_update_task_increments_version(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task = create_response.json()
+    assert task["version"] == 1
+
+    response = await async_client.patch(f"/tasks/{task['id']}", json={"title": "baz"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] == f'W/"{task["id"]}-2"'
+
+
+@pytest.mark.asyncio
+async def test_update_task_if_match_success(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+    etag = (await async_client.get(f"/tasks/{task_id}")).headers["ETag"]
+
+    response = await async_client.patch(f"/tasks/{task_id}", json={"title": "baz"}, headers={"If-Match": etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["title"] == "baz"
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_update_task_if_match_prevents_lost_update(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+    etag = (await async_client.get(f"/tasks/{task_id}")).headers["ETag"]
+
+    # 同じバージョンを読み出した2つのリクエストのうち、後から更新した方は412になる
+    first_response = await async_client.patch(f"/tasks/{task_id}", json={"title": "baz"}, headers={"If-Match": etag})
+    assert first_response.status_code == starlette.status.HTTP_200_OK
+    second_response = await async_client.patch(f"/tasks/{task_id}", json={"title": "qux"}, headers={"If-Match": etag})
+    assert second_response.status_code == starlette.status.HTTP_412_PRECONDITION_FAILED
+
+    response = await async_client.get(f"/tasks/{task_id}")
+    assert response.json()["title"] == "baz"
+
+
+@pytest.mark.asyncio
+async def test_update_task_if_match_without_changes(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+
+    response = await async_client.patch(f"/tasks/{task_id}", json={}, headers={"If-Match": f'W/"{task_id}-0"'})
+    assert response.status_code == starlette.status.HTTP_412_PRECONDITION_FAILED
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("if_match", ['W/"999-1"', '"invalid"'])
+async def test_update_task_if_match_mismatch(async_client, if_match):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+
+    # 別のリソースのETagや解釈できないETagは一致しないものとして扱う
+    response = await async_client.patch(f"/tasks/{task_id}", json={"title": "baz"}, headers={"If-Match": if_match})
+    assert response.status_code == starlette.status.HTTP_412_PRECONDITION_FAILED
+
+
+@pytest.mark.asyncio
+async def test_update_task_if_match_any(async_client):
+    create_response = await async_client.post("/tasks", json=PAYLOAD)
+    task_id = create_response.json()["id"]
+
+    response = await async_client.patch(f"/tasks/{task_id}", json={"title": "baz"}, headers={"If-Match": "*"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_update_task_if_match_not_found(async_client):
+    response = await async_client.patch("/tasks/1", json={"title": "baz"}, headers={"If-Match": 'W/"1-1"'})
+    assert response.status_code == starlette.status.HTTP_404_NOT_FOUND
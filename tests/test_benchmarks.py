@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks.bench_endpoints import build_scenarios
+from benchmarks.bench_endpoints import find_uncovered_routes
+from benchmarks.bench_endpoints import percentile
+from benchmarks.bench_endpoints import run
+from benchmarks.bench_writes import run as run_writes
+
+
+def test_scenarios_cover_all_routes():
+    # エンドポイントを追加した場合はベンチマークのシナリオも追加する
+    assert find_uncovered_routes(build_scenarios(users=1, tasks=1)) == []
+
+
+@pytest.mark.parametrize("p, expected", [(0, 1), (50, 5), (95, 10), (99, 10), (100, 10)])
+def test_percentile(p, expected):
+    assert percentile(list(range(1, 11)), p) == expected
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark():
+    report = await run(users=3, tasks=20, requests=4, concurrency=2)
+
+    assert report["meta"]["database"] == "sqlite"
+    assert len(report["results"]) == len(build_scenarios(users=3, tasks=20))
+    for result in report["results"]:
+        assert result["errors"] == 0, result["name"]
+        assert result["requests_per_second"] > 0
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+        assert result["statements_per_request"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_run_write_benchmark():
+    results = await run_writes(iterations=3)
+
+    # 読み直しをやめたことで、書き込み1回あたりのSQL文が1文（読み直しのSELECT）減る
+    assert [result["name"] for result in results] == ["create task", "create user", "update task"]
+    for result in results:
+        assert result["statements"] == {"refresh": 2, "returning": 1}, result["name"]
+        assert result["latency_us"]["returning"] > 0
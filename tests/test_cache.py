@@ -0,0 +1,136 @@
+import gc
+import pickle
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+
+import pytest
+
+import api.cache
+from api.cache import CACHE_EVICTIONS
+from api.cache import CACHE_HITS
+from api.cache import CACHE_MISSES
+from api.cache import Cache
+from api.cache import LRUCacheBackend
+from api.cache import NullCacheBackend
+from api.cache import RedisCacheBackend
+from api.cache import create_backend
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_evicts_least_recently_used():
+    cache = Cache("test-lru", backend=LRUCacheBackend("test-lru", max_size=2, ttl=60))
+    evictions = CACHE_EVICTIONS._child(("test-lru",)).value
+
+    await cache.set(1, {"id": 1})
+    await cache.set(2, {"id": 2})
+    # 1を参照してから3を追加すると、最も古く参照された2が追い出される
+    assert await cache.get(1) == {"id": 1}
+    await cache.set(3, {"id": 3})
+
+    assert await cache.get(2) is None
+    assert await cache.get(1) == {"id": 1}
+    assert await cache.get(3) == {"id": 3}
+    assert CACHE_EVICTIONS._child(("test-lru",)).value == evictions + 1
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_expires_after_ttl(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(api.cache.time, "monotonic", lambda: now)
+    cache = Cache("test-ttl", backend=LRUCacheBackend("test-ttl", max_size=10, ttl=5))
+
+    await cache.set(1, {"id": 1})
+    now = 1004.0
+    assert await cache.get(1) == {"id": 1}
+    now = 1006.0
+    assert await cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_counts_hits_and_misses():
+    cache = Cache("test-counter", backend=LRUCacheBackend("test-counter", max_size=10, ttl=60))
+
+    await cache.get(1)
+    await cache.set(1, {"id": 1})
+    await cache.get(1)
+    await cache.get(1)
+
+    assert CACHE_MISSES._child(("test-counter",)).value == 1
+    assert CACHE_HITS._child(("test-counter",)).value == 2
+
+
+@pytest.mark.parametrize(
+    "backend, expected",
+    [("memory", LRUCacheBackend), ("none", NullCacheBackend)],
+)
+def test_create_backend(monkeypatch, backend, expected):
+    monkeypatch.setenv("CACHE_BACKEND", backend)
+    assert isinstance(create_backend("test"), expected)
+
+
+def test_create_backend_invalid(monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "memcached")
+    with pytest.raises(ValueError, match="CACHE_BACKEND"):
+        create_backend("test")
+
+
+class FakeRedis:
+    # redis.asyncio.Redis の get/set のみを持つダミーのクライアント
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, px=None):
+        self.values[key] = value
+
+
+def _redis_backend(client):
+    # redisパッケージがなくてもシリアライズを確認できるよう、__init__を通さずに作成する
+    backend = RedisCacheBackend.__new__(RedisCacheBackend)
+    backend._client = client
+    backend._prefix = "todo-api:test:"
+    backend._ttl_ms = 5000
+    return backend
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_round_trips_json():
+    client = FakeRedis()
+    backend = _redis_backend(client)
+    values = {
+        "id": 1,
+        "title": "タスク",
+        "description": None,
+        "due_date": date(2024, 1, 2),
+        "created_at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "updated_at": datetime(2024, 1, 2, 3, 4, 5, 678000),
+    }
+
+    await backend.set("1", values)
+    # pickleではなくJSONで保存し、日付・日時は型も含めて復元する
+    assert client.values["todo-api:test:1"].startswith(b"{")
+    restored = await backend.get("1")
+    assert restored == values
+    assert type(restored["due_date"]) is date
+    assert restored["created_at"].tzinfo == timezone.utc
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_ignores_undecodable_values():
+    client = FakeRedis()
+    backend = _redis_backend(client)
+    # 以前のバージョンが書き込んだpickleの値は読み込まず、キャッシュがないものとして扱う
+    client.values["todo-api:test:1"] = pickle.dumps({"id": 1})
+    assert await backend.get("1") is None
+
+
+@pytest.mark.asyncio
+async def test_clear_caches_does_not_keep_caches_alive():
+    cache = Cache("test-weak", backend=LRUCacheBackend("test-weak", max_size=10, ttl=60))
+    assert cache in api.cache._caches
+    del cache
+    gc.collect()
+    assert all(cache.namespace != "test-weak" for cache in api.cache._caches)
@@ -0,0 +1,185 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+import starlette.status
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.responses import Response
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+import api.compression
+from api.compression import CompressionMiddleware
+from api.compression import get_compression_algorithms
+from api.compression import select_encoding
+
+LARGE_BODY = "x" * 2000
+CHUNKS = [f"line{i}\n" * 50 for i in range(3)]
+
+
+def _create_app(**options):
+    async def large(request):
+        return PlainTextResponse(LARGE_BODY)
+
+    async def small(request):
+        return PlainTextResponse("small")
+
+    async def encoded(request):
+        return Response(gzip.compress(LARGE_BODY.encode()), headers={"Content-Encoding": "gzip"})
+
+    async def stream(request):
+        async def chunks():
+            for chunk in CHUNKS:
+                yield chunk.encode()
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    app = Starlette(
+        routes=[Route("/large", large), Route("/small", small), Route("/encoded", encoded), Route("/stream", stream)]
+    )
+    return CompressionMiddleware(app, algorithms=("gzip",), minimum_size=1024, **options)
+
+
+async def _get(app, path, accept_encoding):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        # 圧縮されたバイト列を確認するため、httpxによる展開を行わずに読み出す
+        async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+            chunks = [chunk async for chunk in response.aiter_raw()]
+            return response, chunks
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "br"),
+        ("*, br;q=0", "gzip"),
+        ("GZIP;q=0.5", "gzip"),
+    ],
+)
+def test_select_encoding(accept_encoding, expected):
+    assert select_encoding(accept_encoding, ("br", "gzip")) == expected
+
+
+@pytest.mark.asyncio
+async def test_compress_large_response():
+    response, chunks = await _get(_create_app(), "/large", "gzip")
+    body = b"".join(chunks)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Length"] == str(len(body))
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(body).decode() == LARGE_BODY
+
+
+@pytest.mark.asyncio
+async def test_skip_small_response():
+    response, chunks = await _get(_create_app(), "/small", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert b"".join(chunks) == b"small"
+
+
+@pytest.mark.asyncio
+async def test_skip_without_accept_encoding():
+    response, chunks = await _get(_create_app(), "/large", "identity")
+    assert "Content-Encoding" not in response.headers
+    assert b"".join(chunks).decode() == LARGE_BODY
+
+
+@pytest.mark.asyncio
+async def test_skip_already_encoded_response():
+    response, chunks = await _get(_create_app(), "/encoded", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(b"".join(chunks)).decode() == LARGE_BODY
+
+
+@pytest.mark.asyncio
+async def test_compress_streaming_response_per_chunk():
+    # httpxのASGITransportは本文をまとめて返すため、ミドルウェアが送信するメッセージを直接確認する
+    messages = []
+
+    async def receive():
+        # StreamingResponseは切断を待ち受けるため、送信が終わるまで待たせる
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "server": ("test", 80),
+    }
+    await _create_app()(scope, receive, send)
+
+    headers = Headers(raw=messages[0]["headers"])
+    assert headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in headers
+
+    # チャンクごとに展開でき、後続のチャンクを待たずに内容を読み出せる
+    decompressor = zlib.decompressobj(31)
+    bodies = [message["body"] for message in messages[1:]]
+    received = [decompressor.decompress(body).decode() for body in bodies]
+    assert received[: len(CHUNKS)] == CHUNKS
+    assert "".join(received) == "".join(CHUNKS)
+    assert decompressor.eof
+
+
+@pytest.mark.asyncio
+async def test_compress_brotli():
+    brotli = pytest.importorskip("brotli")
+    app = _create_app()
+    app.algorithms = ("br", "gzip")
+
+    response, chunks = await _get(app, "/large", "gzip, br")
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(b"".join(chunks)).decode() == LARGE_BODY
+
+
+@pytest.mark.asyncio
+async def test_compress_task_list(async_client):
+    for i in range(20):
+        await async_client.post("/tasks", json={"title": f"task{i}", "description": "x" * 100})
+
+    response = await async_client.get("/tasks", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == 20
+
+
+@pytest.mark.parametrize(
+    "configured, expected",
+    [("gzip", ["gzip"]), ("GZIP, gzip", ["gzip", "gzip"]), ("", [])],
+)
+def test_get_compression_algorithms(monkeypatch, configured, expected):
+    monkeypatch.setenv("COMPRESSION_ALGORITHMS", configured)
+    assert get_compression_algorithms() == expected
+
+
+def test_get_compression_algorithms_auto(monkeypatch):
+    monkeypatch.setenv("COMPRESSION_ALGORITHMS", "auto")
+    monkeypatch.setattr(api.compression, "brotli", None)
+    assert get_compression_algorithms() == ["gzip"]
+
+
+@pytest.mark.parametrize("configured", ["deflate", "br"])
+def test_get_compression_algorithms_invalid(monkeypatch, configured):
+    monkeypatch.setenv("COMPRESSION_ALGORITHMS", configured)
+    monkeypatch.setattr(api.compression, "brotli", None)
+    with pytest.raises(ValueError, match="COMPRESSION_ALGORITHMS"):
+        get_compression_algorithms()
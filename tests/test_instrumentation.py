@@ -0,0 +1,122 @@
+import logging
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import api.instrumentation
+from api.instrumentation import HTTP_REQUEST_DB_STATEMENTS
+from api.instrumentation import HTTP_REQUEST_DURATION_SECONDS
+from api.instrumentation import HTTP_REQUESTS
+from api.instrumentation import HTTP_REQUESTS_IN_FLIGHT
+from api.instrumentation import RequestStats
+from api.instrumentation import format_server_timing
+from api.instrumentation import get_request_stats
+from tests.conftest import async_engine
+
+
+def _parse_server_timing(value):
+    return {
+        name: (description, float(duration))
+        for name, description, duration in re.findall(r'([\w-]+)(?:;desc="([^"]*)")?;dur=([\d.]+)', value)
+    }
+
+
+def test_format_server_timing():
+    stats = RequestStats()
+    stats.add("SELECT 1", 0.002)
+    stats.add("SELECT 2", 0.003)
+
+    assert format_server_timing(stats, 0.01) == 'db;desc="2 queries";dur=5.000, db-slowest;dur=3.000, app;dur=10.000'
+    assert stats.slowest_statement == "SELECT 2"
+
+
+@pytest.mark.asyncio
+async def test_server_timing_counts_request_statements(async_client, executed_statements):
+    await async_client.post("/tasks", json={"title": "テストタスク"})
+    executed_statements.clear()
+
+    response = await async_client.get("/tasks")
+    server_timing = _parse_server_timing(response.headers["Server-Timing"])
+
+    # リクエスト中に実行したSQL文の数と所要時間が出力される
+    assert server_timing["db"][0] == f"{len(executed_statements)} queries"
+    assert server_timing["db-slowest"][1] <= server_timing["db"][1] <= server_timing["app"][1]
+
+
+@pytest.mark.asyncio
+async def test_request_log(async_client, caplog):
+    with caplog.at_level(logging.INFO, logger="api.instrumentation"):
+        await async_client.post("/tasks", json={"title": "テストタスク"})
+
+    (record,) = [record for record in caplog.records if record.message == "Request completed"]
+    assert record.method == "POST"
+    assert record.path == "/tasks"
+    assert record.status_code == 201
+    assert record.db_statements >= 1
+    assert "INSERT INTO tasks" in record.db_slowest_statement
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log(async_client, caplog, monkeypatch):
+    monkeypatch.setattr(api.instrumentation, "_slow_query_threshold", 0.0)
+    with caplog.at_level(logging.WARNING, logger="api.instrumentation"):
+        await async_client.get("/tasks/1")
+
+    records = [record for record in caplog.records if record.message == "Slow SQL statement"]
+    assert records
+    assert "FROM tasks" in records[0].statement
+    assert records[0].duration_ms >= 0
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log_disabled(async_client, caplog, monkeypatch):
+    monkeypatch.setattr(api.instrumentation, "_slow_query_threshold", None)
+    with caplog.at_level(logging.WARNING, logger="api.instrumentation"):
+        await async_client.get("/tasks/1")
+
+    assert not [record for record in caplog.records if record.message == "Slow SQL statement"]
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_outside_request():
+    # リクエストの外では集計せず、失敗したSQL文の開始時刻も残さない
+    assert get_request_stats() is None
+    async with async_engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            await conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.sync_connection.info["query_start_time"] == []
+
+
+@pytest.mark.asyncio
+async def test_route_metrics(async_client):
+    duration = HTTP_REQUEST_DURATION_SECONDS.labels("GET", "/tasks/{id}")
+    db_statements = HTTP_REQUEST_DB_STATEMENTS.labels("GET", "/tasks/{id}")
+    not_found = HTTP_REQUESTS.labels("GET", "/tasks/{id}", "404")
+    before = (duration.count, db_statements.count, not_found.value)
+
+    await async_client.get("/tasks/1")
+    await async_client.get("/tasks/2")
+
+    # 生のパスではなくルートのテンプレートごとに記録する
+    assert (duration.count, db_statements.count, not_found.value) == (before[0] + 2, before[1] + 2, before[2] + 2)
+    assert db_statements.sum >= 2
+
+    response = await async_client.get("/metrics")
+    assert 'http_request_duration_seconds_count{method="GET",route="/tasks/{id}"}' in response.text
+    assert 'http_requests_total{method="GET",route="/tasks/{id}",status="404"}' in response.text
+    assert "/tasks/1" not in response.text
+    # /metrics の処理中は自身が処理中のリクエストとして数えられる
+    assert "http_requests_in_flight 1" in response.text
+
+
+@pytest.mark.asyncio
+async def test_unmatched_route_metrics(async_client):
+    requests = HTTP_REQUESTS.labels("GET", "unmatched", "404")
+    before = requests.value
+
+    await async_client.get("/not-found/123")
+
+    assert requests.value == before + 1
+    assert HTTP_REQUESTS_IN_FLIGHT.labels().value == 0
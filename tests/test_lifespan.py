@@ -0,0 +1,173 @@
+import logging
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.pool import NullPool
+
+import api.db
+from api.cache import clear_caches
+from api.db import Base
+from api.db import get_db
+from api.db import get_read_db
+from api.lifespan import create_lifespan
+from api.lifespan import get_warmup_connections
+from api.lifespan import warm_up_engine
+from api.main import app
+
+POOL_SIZE = 3
+
+# 接続を開く処理にかかる時間（TCP・TLSのハンドシェイクの代わり）
+CONNECT_DELAY = 0.2
+
+
+class ConnectionEvents:
+    def __init__(self, engine):
+        self.connects = 0
+        self.closes = 0
+        self.checkins = 0
+        self.statements = []
+        event.listen(engine.sync_engine, "connect", self.on_connect)
+        event.listen(engine.sync_engine, "close", self.on_close)
+        event.listen(engine.sync_engine, "checkin", self.on_checkin)
+        event.listen(engine.sync_engine, "before_cursor_execute", self.on_execute)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+        time.sleep(CONNECT_DELAY)
+
+    def on_close(self, dbapi_connection, connection_record):
+        self.closes += 1
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest_asyncio.fixture
+async def slow_engine(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'warmup.db'}", poolclass=AsyncAdaptedQueuePool, pool_size=POOL_SIZE
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # テーブルの作成で開いた接続を閉じ、起動直後の状態にする
+    await engine.dispose()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.parametrize("configured, expected", [("auto", None), ("0", 0), ("4", 4)])
+def test_get_warmup_connections(monkeypatch, configured, expected):
+    monkeypatch.setenv("DB_WARMUP_CONNECTIONS", configured)
+    assert get_warmup_connections() == expected
+
+
+@pytest.mark.parametrize("configured", ["-1", "all"])
+def test_get_warmup_connections_invalid(monkeypatch, configured):
+    monkeypatch.setenv("DB_WARMUP_CONNECTIONS", configured)
+    with pytest.raises(ValueError, match="DB_WARMUP_CONNECTIONS"):
+        get_warmup_connections()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_engine(slow_engine):
+    events = ConnectionEvents(slow_engine)
+    opened = await warm_up_engine(slow_engine)
+
+    # 接続プールのサイズの数だけ接続を開き、各接続で頻繁に実行するSQL文を一度ずつ実行する
+    assert opened == POOL_SIZE
+    assert events.connects == POOL_SIZE
+    assert len(events.statements) == POOL_SIZE * 3
+    # 開いた接続は閉じずに接続プールに返却される
+    assert slow_engine.pool.checkedin() == POOL_SIZE
+    assert events.closes == 0
+
+
+@pytest.mark.asyncio
+async def test_warm_up_engine_limited_to_pool_size(slow_engine):
+    events = ConnectionEvents(slow_engine)
+    # 接続プールのサイズを超える分は返却時に閉じられるため開かない
+    assert await warm_up_engine(slow_engine, connections=10) == POOL_SIZE
+    assert events.connects == POOL_SIZE
+
+
+@pytest.mark.asyncio
+async def test_warm_up_engine_null_pool(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'warmup.db'}", poolclass=NullPool)
+    # 接続を保持しない接続プールでは何もしない
+    assert await warm_up_engine(engine) == 0
+
+
+@pytest.mark.asyncio
+async def test_lifespan_first_request_latency(slow_engine, monkeypatch):
+    events = ConnectionEvents(slow_engine)
+    # api.main.app のlifespanは api.db.engines のエンジンをウォームアップする
+    monkeypatch.setitem(api.db.engines, "primary", slow_engine)
+    await clear_caches()
+
+    session_factory = sessionmaker(bind=slow_engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, get_test_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, get_test_db)
+
+    async with app.router.lifespan_context(app):
+        # 起動時に接続プールのサイズの数だけ接続を開いている
+        assert events.connects == POOL_SIZE
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            start = time.perf_counter()
+            response = await client.get("/tasks/1")
+            first_request_latency = time.perf_counter() - start
+        assert response.status_code == 404
+        # 最初のリクエストで接続を開かない
+        assert events.connects == POOL_SIZE
+        assert first_request_latency < CONNECT_DELAY
+
+    # 終了時に接続プールの接続をすべて閉じる
+    assert events.closes == POOL_SIZE
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warm_up_failure(tmp_path, caplog):
+    # 存在しないディレクトリのため接続できない
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'warmup.db'}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=POOL_SIZE,
+    )
+    lifespan = create_lifespan({"primary": engine})
+    with caplog.at_level(logging.WARNING, logger="api.lifespan"):
+        # ウォームアップに失敗しても起動を続ける
+        async with lifespan(app):
+            pass
+    (record,) = [record for record in caplog.records if record.message == "Failed to warm up database connections"]
+    assert record.engine == "primary"
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warm_up_timeout(slow_engine, monkeypatch, caplog):
+    events = ConnectionEvents(slow_engine)
+    # 接続プールのサイズの数の接続を開き終える前にタイムアウトさせる
+    monkeypatch.setenv("DB_WARMUP_TIMEOUT", str(CONNECT_DELAY * 1.5))
+    lifespan = create_lifespan({"primary": slow_engine})
+    with caplog.at_level(logging.WARNING, logger="api.lifespan"):
+        async with lifespan(app):
+            # 中断までに開いた接続は接続プールに返却される（返却されずにガベージコレクションで破棄されない）
+            assert 0 < events.connects
+            assert events.checkins == events.connects
+    (record,) = [record for record in caplog.records if record.message == "Failed to warm up database connections"]
+    assert record.engine == "primary"
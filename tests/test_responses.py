@@ -0,0 +1,83 @@
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import pytest
+import starlette.status
+from fastapi.responses import JSONResponse
+
+import api.responses
+import api.schemas.task_schema as task_schema
+from api.responses import FastJSONResponse
+from api.responses import get_encoder
+
+CONTENT = [
+    {
+        "title": "日本語のタイトル",
+        "description": None,
+        "due_date": "2025-01-01",
+        "status": "ToDo",
+        "owner_id": 1,
+        "id": 1,
+        "created_at": "2025-01-01T00:00:00",
+        "version": 1,
+        "escaped": 'quote " backslash \\ newline \n control \x01',
+    },
+    {"detail": [{"loc": ["body", 0, "title"], "msg": "Field required", "ctx": {"limit": 1.5}}]},
+]
+
+
+@pytest.mark.parametrize("encoder", ["json", "pydantic", "orjson"])
+def test_encoder_matches_json_response(monkeypatch, encoder):
+    if encoder == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setenv("JSON_ENCODER", encoder)
+
+    # 標準のJSONResponseと同じバイト列を出力する
+    assert get_encoder()(CONTENT) == JSONResponse(CONTENT).body
+
+
+@pytest.mark.parametrize("encoder", ["json", "pydantic", "orjson"])
+def test_encoder_native_types(monkeypatch, encoder):
+    if encoder == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setenv("JSON_ENCODER", encoder)
+    dumps = get_encoder()
+
+    # 日付・日時・Enumをpydanticと同じ形式で変換する
+    assert dumps(date(2025, 1, 1)) == b'"2025-01-01"'
+    assert dumps(datetime(2025, 1, 1, 1, 2, 3)) == b'"2025-01-01T01:02:03"'
+    assert dumps(datetime(2025, 1, 1, tzinfo=timezone.utc)) == b'"2025-01-01T00:00:00Z"'
+    assert dumps(datetime(2025, 1, 1, tzinfo=timezone(timedelta(hours=9)))) == b'"2025-01-01T00:00:00+09:00"'
+    assert dumps(task_schema.Status.DONE) == b'"Done"'
+
+
+def test_encoder_invalid(monkeypatch):
+    monkeypatch.setenv("JSON_ENCODER", "simplejson")
+    with pytest.raises(ValueError):
+        get_encoder()
+
+
+def test_encoder_orjson_not_installed(monkeypatch):
+    monkeypatch.setenv("JSON_ENCODER", "orjson")
+    monkeypatch.setattr(api.responses, "orjson", None)
+    with pytest.raises(ValueError):
+        get_encoder()
+
+
+def test_fast_json_response_content_type():
+    response = FastJSONResponse(CONTENT)
+    assert response.media_type == "application/json"
+    assert response.body == JSONResponse(CONTENT).body
+
+
+@pytest.mark.asyncio
+async def test_endpoint_uses_fast_json_response(async_client):
+    create_response = await async_client.post("/tasks", json={"title": "foo", "due_date": "2025-01-01"})
+    assert create_response.status_code == starlette.status.HTTP_201_CREATED
+
+    # 既存のレスポンスと同じバイト列になる
+    task_id = create_response.json()["id"]
+    response = await async_client.get(f"/tasks/{task_id}")
+    assert response.content == JSONResponse(response.json()).body
@@ -0,0 +1,206 @@
+import time
+
+import pytest
+import uvicorn
+
+import api.server
+from api.server import GracefulMultiprocess
+from api.server import get_cpu_limit
+from api.server import get_http
+from api.server import get_loop
+from api.server import get_server_options
+from api.server import get_worker_count
+
+SERVER_ENV_KEYS = (
+    "PORT",
+    "SERVER_HOST",
+    "WEB_CONCURRENCY",
+    "SERVER_LOOP",
+    "SERVER_HTTP",
+    "SERVER_KEEP_ALIVE",
+    "SERVER_BACKLOG",
+    "SERVER_LIMIT_CONCURRENCY",
+    "SERVER_GRACEFUL_TIMEOUT",
+    "SERVER_MAX_WORKER_RESTARTS",
+    "SERVER_WORKER_RESTART_WINDOW",
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_server_env(monkeypatch, tmp_path):
+    for key in SERVER_ENV_KEYS:
+        monkeypatch.delenv(key, raising=False)
+    # 実行環境のcgroupの設定に依存しないようにする（存在しないファイルはCPUクォータなし）
+    for name in ("CGROUP_CPU_MAX", "CGROUP_V1_CPU_QUOTA", "CGROUP_V1_CPU_PERIOD"):
+        monkeypatch.setattr(api.server, name, str(tmp_path / name))
+
+
+def _sleep_worker(sockets):
+    # 子プロセスで実行するダミーのワーカー（SIGTERMで終了する）
+    time.sleep(60)
+
+
+def _crash_worker(sockets):
+    # 起動時に失敗するワーカー（環境変数の不足やimportの失敗を想定）
+    raise SystemExit(3)
+
+
+def _wait_dead(processes):
+    for process in processes:
+        process.join(10)
+
+
+def test_get_server_options_default(monkeypatch):
+    monkeypatch.setattr(api.server.os, "sched_getaffinity", lambda pid: {0, 1, 2}, raising=False)
+    options = get_server_options()
+    assert options["host"] == "0.0.0.0"
+    assert options["port"] == 8000
+    # autoの場合は利用できるCPUコア数
+    assert options["workers"] == 3
+    assert options["timeout_keep_alive"] == 5
+    assert options["backlog"] == 2048
+    assert options["limit_concurrency"] is None
+    assert options["timeout_graceful_shutdown"] == 30
+    # uvicorn.Config がすべてのキーワード引数を受け付ける
+    uvicorn.Config(api.server.APP, log_config=None, **options)
+
+
+def test_get_server_options_from_env(monkeypatch):
+    monkeypatch.setenv("PORT", "5000")
+    monkeypatch.setenv("SERVER_HOST", "127.0.0.1")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setenv("SERVER_LIMIT_CONCURRENCY", "100")
+    monkeypatch.setenv("SERVER_GRACEFUL_TIMEOUT", "10")
+    options = get_server_options()
+    assert options["host"] == "127.0.0.1"
+    assert options["port"] == 5000
+    assert options["workers"] == 4
+    assert options["limit_concurrency"] == 100
+    assert options["timeout_graceful_shutdown"] == 10
+
+
+@pytest.mark.parametrize(
+    "cpu_max, expected", [("max 100000", 4), ("200000 100000", 2), ("150000 100000", 2), ("50000 100000", 1)]
+)
+def test_get_cpu_limit_cgroup_v2(monkeypatch, tmp_path, cpu_max, expected):
+    monkeypatch.setattr(api.server.os, "sched_getaffinity", lambda pid: {0, 1, 2, 3}, raising=False)
+    (tmp_path / "cpu.max").write_text(f"{cpu_max}\n")
+    monkeypatch.setattr(api.server, "CGROUP_CPU_MAX", str(tmp_path / "cpu.max"))
+    # CPUクォータをコア数に切り上げ、利用できるコア数を超えない
+    assert get_cpu_limit() == expected
+
+
+@pytest.mark.parametrize("quota, expected", [("-1", 4), ("300000", 3)])
+def test_get_cpu_limit_cgroup_v1(monkeypatch, tmp_path, quota, expected):
+    monkeypatch.setattr(api.server.os, "sched_getaffinity", lambda pid: {0, 1, 2, 3}, raising=False)
+    (tmp_path / "cpu.cfs_quota_us").write_text(f"{quota}\n")
+    (tmp_path / "cpu.cfs_period_us").write_text("100000\n")
+    monkeypatch.setattr(api.server, "CGROUP_V1_CPU_QUOTA", str(tmp_path / "cpu.cfs_quota_us"))
+    monkeypatch.setattr(api.server, "CGROUP_V1_CPU_PERIOD", str(tmp_path / "cpu.cfs_period_us"))
+    assert get_cpu_limit() == expected
+
+
+@pytest.mark.parametrize("configured", ["0", "-1", "many"])
+def test_get_worker_count_invalid(monkeypatch, configured):
+    monkeypatch.setenv("WEB_CONCURRENCY", configured)
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+        get_worker_count()
+
+
+def test_get_loop_and_http_auto_without_packages(monkeypatch):
+    # uvloopとhttptoolsがない場合は標準の実装を使う
+    monkeypatch.setattr(api.server, "uvloop", None)
+    monkeypatch.setattr(api.server, "httptools", None)
+    assert get_loop() == "asyncio"
+    assert get_http() == "h11"
+
+
+def test_get_loop_and_http_explicit(monkeypatch):
+    monkeypatch.setenv("SERVER_LOOP", "asyncio")
+    monkeypatch.setenv("SERVER_HTTP", "h11")
+    assert get_loop() == "asyncio"
+    assert get_http() == "h11"
+
+
+@pytest.mark.parametrize("configured", ["uvloop", "tokio"])
+def test_get_loop_invalid(monkeypatch, configured):
+    monkeypatch.setenv("SERVER_LOOP", configured)
+    monkeypatch.setattr(api.server, "uvloop", None)
+    with pytest.raises(ValueError, match="SERVER_LOOP"):
+        get_loop()
+
+
+@pytest.mark.parametrize("configured", ["httptools", "h2"])
+def test_get_http_invalid(monkeypatch, configured):
+    monkeypatch.setenv("SERVER_HTTP", configured)
+    monkeypatch.setattr(api.server, "httptools", None)
+    with pytest.raises(ValueError, match="SERVER_HTTP"):
+        get_http()
+
+
+def test_restart_and_replace_workers(monkeypatch):
+    monkeypatch.setattr(api.server, "WORKER_RESTART_BACKOFF", 0)
+    server_config = uvicorn.Config(api.server.APP, workers=2, log_config=None, timeout_graceful_shutdown=5)
+    supervisor = GracefulMultiprocess(server_config, target=_sleep_worker, sockets=[])
+    supervisor.processes = [supervisor._spawn() for _ in range(server_config.workers)]
+    try:
+        old_processes = list(supervisor.processes)
+        supervisor.restart_workers()
+        # 古いワーカーはすべて終了し、同じ数の新しいワーカーに入れ替わる
+        assert all(not process.is_alive() for process in old_processes)
+        assert len(supervisor.processes) == 2
+        assert all(process.is_alive() for process in supervisor.processes)
+        assert {process.pid for process in supervisor.processes}.isdisjoint(p.pid for p in old_processes)
+
+        # 異常終了したワーカーは起動し直す
+        dead = supervisor.processes[0]
+        dead.kill()
+        dead.join()
+        supervisor.replace_dead_workers()
+        assert supervisor.processes[0] is not dead
+        assert supervisor.processes[0].is_alive()
+    finally:
+        supervisor.shutdown()
+    assert all(not process.is_alive() for process in supervisor.processes)
+
+
+def test_replace_dead_workers_backoff(monkeypatch):
+    server_config = uvicorn.Config(api.server.APP, workers=1, log_config=None, timeout_graceful_shutdown=5)
+    supervisor = GracefulMultiprocess(server_config, target=_crash_worker, sockets=[])
+    supervisor.processes = [supervisor._spawn()]
+    try:
+        dead = supervisor.processes[0]
+        _wait_dead([dead])
+        # 待つ時間が過ぎるまでは起動し直さない
+        monkeypatch.setattr(api.server, "WORKER_RESTART_BACKOFF", 60)
+        supervisor.replace_dead_workers()
+        assert supervisor.processes[0] is dead
+        assert 0 in supervisor.respawn_at
+        # 待つ時間が過ぎたら起動し直す
+        supervisor.respawn_at[0] = 0
+        supervisor.replace_dead_workers()
+        assert supervisor.processes[0] is not dead
+        assert not supervisor.respawn_at
+        assert not supervisor.failed
+    finally:
+        supervisor.shutdown()
+
+
+def test_replace_dead_workers_gives_up_on_crash_loop(monkeypatch):
+    monkeypatch.setattr(api.server, "WORKER_RESTART_BACKOFF", 0)
+    server_config = uvicorn.Config(api.server.APP, workers=2, log_config=None, timeout_graceful_shutdown=5)
+    supervisor = GracefulMultiprocess(server_config, target=_crash_worker, sockets=[], max_restarts=3)
+    supervisor.processes = [supervisor._spawn() for _ in range(server_config.workers)]
+    try:
+        spawned = 2
+        while not supervisor.should_exit.is_set():
+            _wait_dead(supervisor.processes)
+            before = list(supervisor.processes)
+            supervisor.replace_dead_workers()
+            spawned += sum(1 for old, new in zip(before, supervisor.processes, strict=True) if old is not new)
+            assert spawned <= 2 + 3
+        # 期間内の異常終了が上限を超えたら、起動し直さずにスーパーバイザーを終了させる
+        assert supervisor.failed
+        assert spawned == 2 + 3
+    finally:
+        supervisor.shutdown()
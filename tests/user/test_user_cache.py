@@ -0,0 +1,36 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "username": "foobar",
+    "email": "foobar@example.com",
+    "first_name": "Foo",
+    "last_name": "Bar",
+}
+
+
+@pytest.mark.asyncio
+async def test_get_user_uses_cache(async_client, executed_statements):
+    create_response = await async_client.post("/users", json=PAYLOAD)
+    user_id = create_response.json()["id"]
+
+    first_response = await async_client.get(f"/users/{user_id}")
+    executed_statements.clear()
+
+    # 2回目以降はデータベースに問い合わせずにキャッシュから返す
+    second_response = await async_client.get(f"/users/{user_id}")
+    assert second_response.status_code == starlette.status.HTTP_200_OK
+    assert second_response.json() == first_response.json()
+    assert executed_statements == []
+
+
+@pytest.mark.asyncio
+async def test_update_user_invalidates_cache(async_client):
+    create_response = await async_client.post("/users", json=PAYLOAD)
+    user_id = create_response.json()["id"]
+    await async_client.get(f"/users/{user_id}")
+
+    await async_client.patch(f"/users/{user_id}", json={"first_name": "Baz"})
+
+    response = await async_client.get(f"/users/{user_id}")
+    assert response.json()["first_name"] == "Baz"
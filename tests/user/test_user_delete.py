@@ -29,3 +29,25 @@ async def test_delete_user_not_found(async_client):
     response = await async_client.delete("/users/99999")
     assert response.status_code == starlette.status.HTTP_404_NOT_FOUND
     assert response.json()["detail"] == "User not found"
+
+
+@pytest.mark.asyncio
+async def test_delete_user_invalidates_task_etags(async_client):
+    user_payload = {"username": "owner", "email": "owner@example.com"}
+    user_id = (await async_client.post("/users", json=user_payload)).json()["id"]
+    task_payload = {"title": "foo", "due_date": "2025-01-01", "status": "ToDo", "owner_id": user_id}
+    task_id = (await async_client.post("/tasks", json=task_payload)).json()["id"]
+    etag = (await async_client.get(f"/tasks/{task_id}")).headers["ETag"]
+
+    delete_response = await async_client.delete(f"/users/{user_id}")
+    assert delete_response.status_code == starlette.status.HTTP_204_NO_CONTENT
+
+    # 所有者を外したタスクはバージョンが上がり、古いETagでは304にならない
+    get_response = await async_client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert get_response.status_code == starlette.status.HTTP_200_OK
+    assert get_response.json()["owner_id"] is None
+    assert get_response.headers["ETag"] != etag
+
+    # 古いETagを指定した更新は失敗する
+    patch_response = await async_client.patch(f"/tasks/{task_id}", json={"title": "bar"}, headers={"If-Match": etag})
+    assert patch_response.status_code == starlette.status.HTTP_412_PRECONDITION_FAILED
@@ -0,0 +1,55 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "username": "foobar",
+    "email": "foobar@example.com",
+    "first_name": "Foo",
+    "last_name": "Bar",
+}
+
+
+@pytest.mark.asyncio
+async def test_get_user_not_modified(async_client):
+    create_response = await async_client.post("/users", json=PAYLOAD)
+    user_id = create_response.json()["id"]
+    etag = (await async_client.get(f"/users/{user_id}")).headers["ETag"]
+
+    response = await async_client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+@pytest.mark.asyncio
+async def test_get_user_etag_mismatch(async_client):
+    create_response = await async_client.post("/users", json=PAYLOAD)
+    user_id = create_response.json()["id"]
+
+    response = await async_client.get(f"/users/{user_id}", headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["id"] == user_id
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_username_not_modified(async_client):
+    await async_client.post("/users", json=PAYLOAD)
+    etag = (await async_client.get("/users/username/foobar")).headers["ETag"]
+
+    response = await async_client.get("/users/username/foobar", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_etag_changes_after_delete(async_client):
+    create_response = await async_client.post("/users", json=PAYLOAD)
+    etag = (await async_client.get("/users")).headers["ETag"]
+
+    response = await async_client.get("/users", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+
+    await async_client.delete(f"/users/{create_response.json()['id']}")
+
+    response = await async_client.get("/users", headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == []
@@ -0,0 +1,80 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "username": "foobar",
+    "email": "foobar@example.com",
+    "first_name": "Foo",
+    "last_name": "Bar",
+}
+
+
+async def _create_user_with_tasks(async_client, username, count):
+    user = {**PAYLOAD, "username": username, "email": f"{username}@example.com"}
+    user_id = (await async_client.post("/users", json=user)).json()["id"]
+    for i in range(count):
+        await async_client.post("/tasks", json={"title": f"task{i}", "status": "ToDo", "owner_id": user_id})
+    return user_id
+
+
+@pytest.mark.asyncio
+async def test_get_user_expand_tasks(async_client):
+    user_id = await _create_user_with_tasks(async_client, "foobar", 2)
+
+    response = await async_client.get(f"/users/{user_id}", params={"expand": "tasks"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    user = response.json()
+    assert user["username"] == "foobar"
+    assert sorted(task["title"] for task in user["tasks"]) == ["task0", "task1"]
+    assert all(task["owner_id"] == user_id for task in user["tasks"])
+
+    response = await async_client.get("/users/username/foobar", params={"expand": "tasks"})
+    assert len(response.json()["tasks"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_user_expand_tasks_etag(async_client):
+    user_id = await _create_user_with_tasks(async_client, "foobar", 1)
+    etag = (await async_client.get(f"/users/{user_id}", params={"expand": "tasks"})).headers["ETag"]
+
+    response = await async_client.get(f"/users/{user_id}", params={"expand": "tasks"}, headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_304_NOT_MODIFIED
+
+    # タスクが追加されると埋め込んだ結果も変わる
+    await async_client.post("/tasks", json={"title": "new", "status": "ToDo", "owner_id": user_id})
+    response = await async_client.get(f"/users/{user_id}", params={"expand": "tasks"}, headers={"If-None-Match": etag})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert len(response.json()["tasks"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_expand_tasks_statement_count(async_client, executed_statements):
+    # ユーザー数が増えても発行するSELECTの数は変わらない（N+1にならない）
+    await _create_user_with_tasks(async_client, "user0", 2)
+    executed_statements.clear()
+    await async_client.get("/users", params={"expand": "tasks"})
+    small_count = len(executed_statements)
+
+    for i in range(1, 10):
+        await _create_user_with_tasks(async_client, f"user{i}", 2)
+    executed_statements.clear()
+    response = await async_client.get("/users", params={"expand": "tasks"})
+    users = response.json()
+    assert len(users) == 10
+    assert all(len(user["tasks"]) == 2 for user in users)
+    assert len(executed_statements) == small_count
+
+
+@pytest.mark.asyncio
+async def test_stream_all_users_expand_tasks(async_client):
+    await _create_user_with_tasks(async_client, "foobar", 3)
+
+    response = await async_client.get("/users", params={"expand": "tasks", "stream": "true"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert len(response.json()[0]["tasks"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_invalid_expand(async_client):
+    response = await async_client.get("/users", params={"expand": "owner"})
+    assert response.status_code == starlette.status.HTTP_400_BAD_REQUEST
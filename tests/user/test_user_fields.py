@@ -0,0 +1,47 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "username": "foobar",
+    "email": "foobar@example.com",
+    "first_name": "Foo",
+    "last_name": "Bar",
+}
+
+
+@pytest.mark.asyncio
+async def test_get_user_fields(async_client):
+    create_response = await async_client.post("/users", json=PAYLOAD)
+    user_id = create_response.json()["id"]
+
+    response = await async_client.get(f"/users/{user_id}", params={"fields": "id,username"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == {"id": user_id, "username": "foobar"}
+
+    response = await async_client.get("/users/username/foobar", params={"fields": "email"})
+    assert response.json() == {"email": "foobar@example.com"}
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_fields(async_client, executed_statements):
+    await async_client.post("/users", json=PAYLOAD)
+    executed_statements.clear()
+
+    response = await async_client.get("/users", params={"fields": "username"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json() == [{"username": "foobar"}]
+    assert "email" not in executed_statements[-1]
+
+
+@pytest.mark.asyncio
+async def test_stream_all_users_fields(async_client):
+    await async_client.post("/users", json=PAYLOAD)
+
+    response = await async_client.get("/users", params={"fields": "username", "stream": "true"})
+    assert response.json() == [{"username": "foobar"}]
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_invalid_fields(async_client):
+    response = await async_client.get("/users", params={"fields": "password"})
+    assert response.status_code == starlette.status.HTTP_400_BAD_REQUEST
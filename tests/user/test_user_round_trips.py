@@ -0,0 +1,68 @@
+import pytest
+import starlette.status
+
+
+@pytest.mark.asyncio
+async def test_create_user_single_statement(async_client, executed_statements):
+    payload = {
+        "username": "foobar",
+        "email": "foobar@example.com",
+        "first_name": "Foo",
+        "last_name": "Bar",
+    }
+    response = await async_client.post("/users", json=payload)
+    assert response.status_code == starlette.status.HTTP_201_CREATED
+
+    # サーバー側で設定される列もINSERT ... RETURNINGで取得し、読み直しのSELECTを発行しない
+    assert len(executed_statements) == 1
+    assert executed_statements[0].startswith("INSERT INTO users")
+    assert "RETURNING" in executed_statements[0]
+
+
+@pytest.mark.asyncio
+async def test_update_user_single_statement(async_client, executed_statements):
+    payload = {
+        "username": "foobar",
+        "email": "foobar@example.com",
+        "first_name": "Foo",
+        "last_name": "Bar",
+    }
+    create_response = await async_client.post("/users", json=payload)
+    user_id = create_response.json()["id"]
+    executed_statements.clear()
+
+    response = await async_client.patch(f"/users/{user_id}", json={"first_name": "Baz"})
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["first_name"] == "Baz"
+
+    # 事前のSELECTも読み直しのSELECTも発行せず、UPDATE ... RETURNINGの1文で更新する
+    assert len(executed_statements) == 1
+    assert executed_statements[0].startswith("UPDATE users")
+    assert "RETURNING" in executed_statements[0]
+
+
+@pytest.mark.asyncio
+async def test_delete_user_without_select(async_client, executed_statements):
+    payload = {
+        "username": "foobar",
+        "email": "foobar@example.com",
+        "first_name": "Foo",
+        "last_name": "Bar",
+    }
+    create_response = await async_client.post("/users", json=payload)
+    user_id = create_response.json()["id"]
+    task = {"title": "foo", "owner_id": user_id}
+    task_response = await async_client.post("/tasks", json=task)
+    task_id = task_response.json()["id"]
+    executed_statements.clear()
+
+    # 事前のSELECTを発行せず、タスクの所有者を外してからユーザーを削除する
+    response = await async_client.delete(f"/users/{user_id}")
+    assert response.status_code == starlette.status.HTTP_204_NO_CONTENT
+    assert len(executed_statements) == 2
+    assert executed_statements[0].startswith("UPDATE tasks")
+    assert executed_statements[1].startswith("DELETE FROM users")
+
+    # タスクは残り、所有者だけが外れていることを確認
+    get_response = await async_client.get(f"/tasks/{task_id}")
+    assert get_response.json()["owner_id"] is None
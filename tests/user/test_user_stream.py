@@ -0,0 +1,48 @@
+import json
+
+import pytest
+import starlette.status
+
+import api.streaming
+
+
+async def _create_users(async_client, count):
+    for i in range(count):
+        payload = {
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+        }
+        await async_client.post("/users", json=payload)
+
+
+@pytest.mark.asyncio
+async def test_stream_all_users_json_array(async_client, monkeypatch):
+    # 複数回に分けて書き出されるようにバッチサイズを小さくする
+    monkeypatch.setattr(api.streaming, "STREAM_BATCH_SIZE", 2)
+    await _create_users(async_client, 5)
+
+    response = await async_client.get("/users")
+    stream_response = await async_client.get("/users", params={"stream": "true"})
+
+    # ストリーミングしない場合と同じJSON配列が返ることを確認
+    assert stream_response.status_code == starlette.status.HTTP_200_OK
+    assert stream_response.headers["content-type"] == "application/json"
+    assert stream_response.json() == response.json()
+
+
+@pytest.mark.asyncio
+async def test_stream_all_users_ndjson(async_client):
+    await _create_users(async_client, 3)
+
+    response = await async_client.get("/users")
+    stream_response = await async_client.get(
+        "/users", params={"stream": "true"}, headers={"Accept": "application/x-ndjson"}
+    )
+
+    # 1行に1ユーザーずつ返ることを確認
+    assert stream_response.status_code == starlette.status.HTTP_200_OK
+    assert stream_response.headers["content-type"] == "application/x-ndjson"
+    lines = stream_response.text.splitlines()
+    assert [json.loads(line) for line in lines] == response.json()
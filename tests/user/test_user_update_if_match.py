@@ -0,0 +1,40 @@
+import pytest
+import starlette.status
+
+PAYLOAD = {
+    "username": "foobar",
+    "email": "foobar@example.com",
+    "first_name": "Foo",
+    "last_name": "Bar",
+}
+
+
+@pytest.mark.asyncio
+async def test_update_user_if_match_prevents_lost_update(async_client):
+    create_response = await async_client.post("/users", json=PAYLOAD)
+    user_id = create_response.json()["id"]
+    etag = (await async_client.get(f"/users/{user_id}")).headers["ETag"]
+
+    # 同じバージョンを読み出した2つのリクエストのうち、後から更新した方は412になる
+    first_response = await async_client.patch(
+        f"/users/{user_id}", json={"first_name": "Baz"}, headers={"If-Match": etag}
+    )
+    assert first_response.status_code == starlette.status.HTTP_200_OK
+    assert first_response.json()["version"] == 2
+    second_response = await async_client.patch(
+        f"/users/{user_id}", json={"first_name": "Qux"}, headers={"If-Match": etag}
+    )
+    assert second_response.status_code == starlette.status.HTTP_412_PRECONDITION_FAILED
+
+    # 最新のETagを指定すれば更新できる
+    response = await async_client.patch(
+        f"/users/{user_id}", json={"first_name": "Qux"}, headers={"If-Match": first_response.headers["ETag"]}
+    )
+    assert response.status_code == starlette.status.HTTP_200_OK
+    assert response.json()["first_name"] == "Qux"
+
+
+@pytest.mark.asyncio
+async def test_update_user_if_match_not_found(async_client):
+    response = await async_client.patch("/users/1", json={"first_name": "Baz"}, headers={"If-Match": 'W/"1-1"'})
+    assert response.status_code == starlette.status.HTTP_404_NOT_FOUND